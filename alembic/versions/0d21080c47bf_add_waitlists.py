@@ -0,0 +1,49 @@
+"""add waitlists
+
+Revision ID: 0d21080c47bf
+Revises: 58d58af4e92b
+Create Date: 2026-10-19 15:06:33.255081
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0d21080c47bf'
+down_revision: Union[str, Sequence[str], None] = '58d58af4e92b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('course_waitlists',
+    sa.Column('course_id', sa.UUID(), nullable=False),
+    sa.Column('head', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('tail', sa.BigInteger(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('course_id')
+    )
+    op.create_table('waitlist_entries',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('course_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('position', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_waitlist_entries_course_id_position', 'waitlist_entries', ['course_id', 'position'], unique=False)
+    op.create_index('uq_waitlist_entries_user_id_course_id', 'waitlist_entries', ['user_id', 'course_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_waitlist_entries_user_id_course_id', table_name='waitlist_entries')
+    op.drop_index('ix_waitlist_entries_course_id_position', table_name='waitlist_entries')
+    op.drop_table('waitlist_entries')
+    op.drop_table('course_waitlists')
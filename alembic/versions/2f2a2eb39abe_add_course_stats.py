@@ -0,0 +1,42 @@
+"""add course stats
+
+Revision ID: 2f2a2eb39abe
+Revises: 909ba9dceedf
+Create Date: 2026-10-19 15:23:20.337664
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f2a2eb39abe'
+down_revision: Union[str, Sequence[str], None] = '909ba9dceedf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows are filled in by the full refresh every worker runs at startup.
+    op.create_table('course_stats',
+    sa.Column('course_id', sa.UUID(), nullable=False),
+    sa.Column('enrollment_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('active_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('completed_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('reactivation_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('course_id')
+    )
+    for table in ('enrollments', 'enrollments_archive'):
+        op.add_column(table, sa.Column('reactivation_count', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('enrollments', 'enrollments_archive'):
+        op.drop_column(table, 'reactivation_count')
+    op.drop_table('course_stats')
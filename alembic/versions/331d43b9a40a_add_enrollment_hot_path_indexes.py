@@ -0,0 +1,101 @@
+"""add enrollment hot path indexes
+
+Revision ID: 331d43b9a40a
+Revises: c9d1b5e77aaf
+Create Date: 2026-10-19 11:03:27.716402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.backfill import (
+    backfill,
+    create_index_concurrently,
+    drop_index_concurrently,
+    move_rows,
+    reset_backfill,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = '331d43b9a40a'
+down_revision: Union[str, Sequence[str], None] = 'c9d1b5e77aaf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COMPLETED_BACKFILL = "331d43b9a40a_enrollments_duplicate_completed"
+DUPLICATES_MOVE = "331d43b9a40a_enrollments_duplicates"
+
+# Another enrollment of the same pair, and one that outranks this row.
+_DUPLICATE = (
+    "SELECT 1 FROM enrollments d WHERE d.user_id = enrollments.user_id "
+    "AND d.course_id = enrollments.course_id AND d.id <> enrollments.id"
+)
+_OUTRANKED = (
+    f"{_DUPLICATE} AND (enrollments.is_active, enrollments.created_at, enrollments.id) "
+    "< (d.is_active, d.created_at, d.id)"
+)
+
+
+def _enrollment_partitions() -> list[str]:
+    return op.get_bind().execute(
+        sa.text("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'enrollments'::regclass")
+    ).scalars().all()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Duplicates left behind by the enroll() race would block the unique
+    # index: keep the active (then newest) row of each (user, course) pair,
+    # carry a completion over to it and move the others to the archive.
+    backfill(
+        "enrollments",
+        "completed = true",
+        where=f"NOT completed AND NOT EXISTS ({_OUTRANKED}) AND EXISTS ({_DUPLICATE} AND d.completed)",
+        name=COMPLETED_BACKFILL,
+    )
+    move_rows(
+        "enrollments",
+        "enrollments_archive",
+        {
+            "id": "id",
+            "user_id": "user_id",
+            "course_id": "course_id",
+            "created_at": "created_at",
+            "completed": "completed",
+            "is_active": "false",
+            "archived_at": "now()",
+        },
+        where=f"EXISTS ({_OUTRANKED})",
+        name=DUPLICATES_MOVE,
+    )
+
+    # A partitioned parent cannot carry a unique index without the partition
+    # key, so (user_id, course_id) is enforced per monthly partition instead.
+    partitions = _enrollment_partitions()
+    if partitions:
+        for partition in partitions:
+            create_index_concurrently(f"{partition}_user_id_course_id_key", partition, ["user_id", "course_id"], unique=True)
+    else:
+        create_index_concurrently("uq_enrollments_user_id_course_id", "enrollments", ["user_id", "course_id"], unique=True)
+
+    create_index_concurrently("ix_enrollments_course_id_active", "enrollments", ["course_id"], where="is_active")
+    create_index_concurrently("ix_courses_code_active", "courses", ["code"], where="is_active")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently("ix_courses_code_active")
+    drop_index_concurrently("ix_enrollments_course_id_active")
+    partitions = _enrollment_partitions()
+    if partitions:
+        for partition in partitions:
+            drop_index_concurrently(f"{partition}_user_id_course_id_key")
+    else:
+        drop_index_concurrently("uq_enrollments_user_id_course_id")
+    # Archived duplicates stay archived; a re-upgrade looks for new ones.
+    reset_backfill(DUPLICATES_MOVE)
+    reset_backfill(COMPLETED_BACKFILL)
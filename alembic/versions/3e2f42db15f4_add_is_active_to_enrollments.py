@@ -10,6 +10,8 @@ from typing import Sequence, Union
 from alembic import op
 import sqlalchemy as sa
 
+from app.db.backfill import alter_column_not_null, backfill, reset_backfill
+
 
 # revision identifiers, used by Alembic.
 revision: str = '3e2f42db15f4'
@@ -20,10 +22,17 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Upgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    # 1. Add the column as nullable first OR provide a server_default
-#op.add_column('enrollments', sa.Column('is_active', sa.Boolean(), nullable=False, server_default='true'))
-    # ### end Alembic commands ###
+    # 1. Add the column as nullable with no default (a metadata-only change),
+    # 2. fill it in batches, 3. only then make it NOT NULL with a default.
+    op.execute("ALTER TABLE enrollments ADD COLUMN IF NOT EXISTS is_active BOOLEAN")
+    backfill(
+        "enrollments",
+        "is_active = true",
+        where="is_active IS NULL",
+        name="3e2f42db15f4_enrollments_is_active",
+    )
+    op.alter_column('enrollments', 'is_active', server_default=sa.true())
+    alter_column_not_null("enrollments", "is_active")
 
 
 def downgrade() -> None:
@@ -31,3 +40,4 @@ def downgrade() -> None:
     # ### commands auto generated by Alembic - please adjust! ###
     op.drop_column('enrollments', 'is_active')
     # ### end Alembic commands ###
+    reset_backfill("3e2f42db15f4_enrollments_is_active")
@@ -0,0 +1,27 @@
+"""add enrollments_archive updated_at index
+
+Revision ID: 4dbb3d0f8226
+Revises: 2f2a2eb39abe
+Create Date: 2026-10-19 15:31:02.722712
+
+"""
+from typing import Sequence, Union
+
+from app.db.backfill import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4dbb3d0f8226'
+down_revision: Union[str, Sequence[str], None] = '2f2a2eb39abe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    create_index_concurrently("ix_enrollments_archive_updated_at", "enrollments_archive", ["updated_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently("ix_enrollments_archive_updated_at")
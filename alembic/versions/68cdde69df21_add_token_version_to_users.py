@@ -0,0 +1,29 @@
+"""add token_version to users
+
+Revision ID: 68cdde69df21
+Revises: 331d43b9a40a
+Create Date: 2026-10-19 12:20:41.362590
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '68cdde69df21'
+down_revision: Union[str, Sequence[str], None] = '331d43b9a40a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A constant default makes this a metadata-only change on Postgres 11+.
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,35 @@
+"""add enrollment suspension flags
+
+Revision ID: 909ba9dceedf
+Revises: 0d21080c47bf
+Create Date: 2026-10-19 15:10:57.029047
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '909ba9dceedf'
+down_revision: Union[str, Sequence[str], None] = '0d21080c47bf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = ("course_suspended", "user_suspended")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A constant default is stored in the catalog, so this does not rewrite
+    # the enrollment partitions.
+    for column in COLUMNS:
+        op.add_column('enrollments', sa.Column(column, sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in COLUMNS:
+        op.drop_column('enrollments', column)
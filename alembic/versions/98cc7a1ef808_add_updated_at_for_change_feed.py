@@ -0,0 +1,61 @@
+"""add updated_at for change feed
+
+Revision ID: 98cc7a1ef808
+Revises: ca9ec7d8645d
+Create Date: 2026-10-19 15:02:36.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.backfill import (
+    alter_column_not_null,
+    backfill,
+    create_index_concurrently,
+    drop_index_concurrently,
+    reset_backfill,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = '98cc7a1ef808'
+down_revision: Union[str, Sequence[str], None] = 'ca9ec7d8645d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UTC_NOW = "timezone('utc', now())"
+
+# table -> value for rows written before the column existed
+BACKFILLS = {
+    "courses": UTC_NOW,
+    "enrollments": "created_at",
+    "enrollments_archive": "created_at",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, value in BACKFILLS.items():
+        op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP")
+        op.alter_column(table, 'updated_at', server_default=sa.text(UTC_NOW))
+        backfill(
+            table,
+            f"updated_at = {value}",
+            where="updated_at IS NULL",
+            name=f"98cc7a1ef808_{table}_updated_at",
+        )
+        alter_column_not_null(table, "updated_at")
+
+    create_index_concurrently("ix_enrollments_updated_at_id", "enrollments", ["updated_at", "id"])
+    create_index_concurrently("ix_courses_updated_at_id", "courses", ["updated_at", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently("ix_courses_updated_at_id")
+    drop_index_concurrently("ix_enrollments_updated_at_id")
+    for table in BACKFILLS:
+        op.drop_column(table, 'updated_at')
+        reset_backfill(f"98cc7a1ef808_{table}_updated_at")
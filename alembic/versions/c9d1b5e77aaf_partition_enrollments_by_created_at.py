@@ -0,0 +1,117 @@
+"""partition enrollments by created_at
+
+Revision ID: c9d1b5e77aaf
+Revises: 592acc821bb0
+Create Date: 2026-10-19 09:12:44.508113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d1b5e77aaf'
+down_revision: Union[str, Sequence[str], None] = '592acc821bb0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, user_id, course_id, created_at, completed, is_active"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Postgres requires the partition key in the primary key, so the
+    # partitioned table is keyed on (id, created_at).
+    op.execute("ALTER TABLE enrollments RENAME TO enrollments_unpartitioned")
+    op.execute("ALTER TABLE enrollments_unpartitioned RENAME CONSTRAINT enrollments_pkey TO enrollments_unpartitioned_pkey")
+    op.execute("ALTER TABLE enrollments_unpartitioned RENAME CONSTRAINT enrollments_user_id_fkey TO enrollments_unpartitioned_user_id_fkey")
+    op.execute("ALTER TABLE enrollments_unpartitioned RENAME CONSTRAINT enrollments_course_id_fkey TO enrollments_unpartitioned_course_id_fkey")
+    op.execute("ALTER INDEX ix_enrollments_user_id RENAME TO ix_enrollments_unpartitioned_user_id")
+    op.execute("ALTER INDEX ix_enrollments_course_id RENAME TO ix_enrollments_unpartitioned_course_id")
+
+    op.execute(
+        """
+        CREATE TABLE enrollments (
+            id UUID NOT NULL,
+            user_id UUID NOT NULL REFERENCES users (id),
+            course_id UUID NOT NULL REFERENCES courses (id) ON DELETE CASCADE,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            completed BOOLEAN NOT NULL,
+            is_active BOOLEAN NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.create_index(op.f('ix_enrollments_user_id'), 'enrollments', ['user_id'], unique=False)
+    op.create_index(op.f('ix_enrollments_course_id'), 'enrollments', ['course_id'], unique=False)
+    op.execute("CREATE TABLE enrollments_default PARTITION OF enrollments DEFAULT")
+
+    # One partition per month from the oldest row up to three months ahead;
+    # later months are created by `python -m app.db.partitions create-partitions`.
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month DATE := date_trunc('month', COALESCE((SELECT min(created_at) FROM enrollments_unpartitioned), now()));
+            last_month DATE := date_trunc('month', now()) + INTERVAL '3 months';
+        BEGIN
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF enrollments FOR VALUES FROM (%L) TO (%L)',
+                    'enrollments_p' || to_char(month, 'YYYYMM'),
+                    month,
+                    month + INTERVAL '1 month'
+                );
+                month := month + INTERVAL '1 month';
+            END LOOP;
+        END $$
+        """
+    )
+
+    op.execute(f"INSERT INTO enrollments ({COLUMNS}) SELECT {COLUMNS} FROM enrollments_unpartitioned")
+    op.drop_table('enrollments_unpartitioned')
+
+    op.create_table('enrollments_archive',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('course_id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('completed', sa.Boolean(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_enrollments_archive_course_id'), 'enrollments_archive', ['course_id'], unique=False)
+    op.create_index(op.f('ix_enrollments_archive_user_id'), 'enrollments_archive', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_enrollments_archive_user_id'), table_name='enrollments_archive')
+    op.drop_index(op.f('ix_enrollments_archive_course_id'), table_name='enrollments_archive')
+    op.drop_table('enrollments_archive')
+
+    op.execute("ALTER TABLE enrollments RENAME TO enrollments_partitioned")
+    op.execute("ALTER TABLE enrollments_partitioned RENAME CONSTRAINT enrollments_pkey TO enrollments_partitioned_pkey")
+    op.execute("ALTER TABLE enrollments_partitioned RENAME CONSTRAINT enrollments_user_id_fkey TO enrollments_partitioned_user_id_fkey")
+    op.execute("ALTER TABLE enrollments_partitioned RENAME CONSTRAINT enrollments_course_id_fkey TO enrollments_partitioned_course_id_fkey")
+    op.execute("ALTER INDEX ix_enrollments_user_id RENAME TO ix_enrollments_partitioned_user_id")
+    op.execute("ALTER INDEX ix_enrollments_course_id RENAME TO ix_enrollments_partitioned_course_id")
+
+    op.create_table('enrollments',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('course_id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('completed', sa.Boolean(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], name='enrollments_course_id_fkey', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='enrollments_user_id_fkey'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(f"INSERT INTO enrollments ({COLUMNS}) SELECT {COLUMNS} FROM enrollments_partitioned")
+    op.execute("DROP TABLE enrollments_partitioned CASCADE")
+    op.create_index(op.f('ix_enrollments_course_id'), 'enrollments', ['course_id'], unique=False)
+    op.create_index(op.f('ix_enrollments_user_id'), 'enrollments', ['user_id'], unique=False)
@@ -0,0 +1,80 @@
+"""Shared plumbing for bulk endpoints: JSON/CSV bodies and id lists in,
+NDJSON out."""
+import csv
+import io
+import json
+from typing import Any, Iterable
+from uuid import UUID
+
+from fastapi import HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+
+
+async def read_rows(request: Request) -> list[dict[str, Any]]:
+    """Parse the body as a JSON array of objects or as CSV with a header row.
+
+    Empty CSV cells are dropped so that schema defaults apply to them.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    body = await request.body()
+
+    if content_type in ("text/csv", "application/csv"):
+        try:
+            reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+            return [
+                {key.strip(): value.strip() for key, value in row.items() if key and value not in (None, "")}
+                for row in reader
+            ]
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid CSV: {exc}")
+
+    if content_type in ("", "application/json"):
+        try:
+            rows = json.loads(body)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid JSON: {exc}")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expected a JSON array of objects",
+            )
+        return rows
+
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Send application/json or text/csv",
+    )
+
+
+def id_list(
+    ids: list[str] = Query(..., description="Comma-separated and/or repeated ids"),
+) -> list[UUID]:
+    """Parse ``?ids=a,b&ids=c`` into unique UUIDs, capped at BATCH_LOOKUP_MAX_IDS."""
+    parsed: dict[UUID, None] = {}
+    for value in ids:
+        for part in value.split(","):
+            if not part.strip():
+                continue
+            try:
+                parsed[UUID(part.strip())] = None
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                    detail=f"Invalid id: {part.strip()}",
+                )
+    if len(parsed) > settings.BATCH_LOOKUP_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"At most {settings.BATCH_LOOKUP_MAX_IDS} ids per request",
+        )
+    return list(parsed)
+
+
+def ndjson_response(results: Iterable[dict[str, Any]]) -> StreamingResponse:
+    """Stream one JSON document per line as results become available."""
+    return StreamingResponse(
+        (json.dumps(result, default=str) + "\n" for result in results),
+        media_type="application/x-ndjson",
+    )
@@ -1,12 +1,15 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
+from typing import NamedTuple
 from uuid import UUID
 
 from app.core.config import settings
 from app.core.security import ALGORITHM
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, primary_pins, replica_router
+from app.db.shards import close_shard_sessions
 from app.models.user import User
 from app.crud.user import crud_user
 
@@ -14,24 +17,61 @@ from app.crud.user import crud_user
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    # Callers are identified by their bearer token so that a commit here keeps
+    # their follow-up reads on the primary (see get_read_db).
+    db.info["pin_key"] = request.headers.get("Authorization")
     try:
         yield db
     finally:
+        close_shard_sessions(db)
         db.close()
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
-) -> User:
-    credentials_exception = HTTPException(
+def get_read_db(request: Request):
+    db = None
+    if not primary_pins.is_pinned(request.headers.get("Authorization")):
+        db = replica_router.session()
+    if db is not None:
+        # Check a connection out now, so that a replica that went down since
+        # its last check costs this request a fallback rather than an error.
+        try:
+            db.connection()
+        except DBAPIError:
+            replica_router.mark_failed(db)
+            db.close()
+            db = None
+    if db is None:
+        db = SessionLocal()
+    try:
+        yield db
+    except DBAPIError as exc:
+        # Lost mid-request: this request fails, later ones avoid the replica.
+        if exc.connection_invalidated:
+            replica_router.mark_failed(db)
+        raise
+    finally:
+        close_shard_sessions(db)
+        db.close()
+
+
+class TokenUser(NamedTuple):
+    """The caller as described by a signed access token's claims."""
+
+    id: UUID
+    role: str
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+def _decode_access_token(token: str) -> dict:
     try:
         payload = jwt.decode(
             token,
@@ -39,14 +79,25 @@ def get_current_user(
             algorithms=[ALGORITHM],
         )
         user_id: str | None = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        if user_id is None or payload.get("type", "access") != "access":
+            raise _credentials_exception()
+        payload["sub"] = UUID(user_id)
+    except (JWTError, ValueError):
+        raise _credentials_exception()
+    return payload
+
 
-    user = crud_user.get(db, id=UUID(user_id))
+def get_current_user(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme),
+) -> User:
+    payload = _decode_access_token(token)
+
+    user = crud_user.get(db, id=payload["sub"])
     if not user:
-        raise credentials_exception
+        raise _credentials_exception()
+    if "ver" in payload and payload["ver"] != user.token_version:
+        raise _credentials_exception()
 
     return user
 
@@ -62,10 +113,35 @@ def get_current_active_user(
     return current_user
 
 
+def get_token_user(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme),
+) -> TokenUser | User:
+    """Identify an active caller from the token's ``role``/``ver`` claims.
+
+    Only the cached token version is checked, so the users row is read at
+    most once per cache TTL. Tokens issued without claims fall back to
+    loading the user.
+    """
+    payload = _decode_access_token(token)
+    if "role" not in payload or "ver" not in payload:
+        return get_current_active_user(get_current_user(db, token))
+
+    state = crud_user.get_token_state(db, payload["sub"])
+    if state is None or state.token_version != payload["ver"]:
+        raise _credentials_exception()
+    if not state.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Inactive user",
+        )
+    return TokenUser(id=payload["sub"], role=payload["role"])
+
+
 def require_role(required_role: str):
     def role_checker(
-        current_user: User = Depends(get_current_active_user),
-    ) -> User:
+        current_user: TokenUser | User = Depends(get_token_user),
+    ) -> TokenUser | User:
         if current_user.role != required_role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,50 @@
+"""Sparse fieldsets: ``?fields=id,is_active`` on list endpoints.
+
+The requested fields narrow both the SELECT list (``load_only``) and the
+JSON output. Only fields of the read schema that map to table columns can
+be requested.
+"""
+from functools import lru_cache
+from typing import Any, Callable, Iterable
+
+from fastapi import HTTPException, Query, Response, status
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+
+
+def fields_param(schema: type[BaseModel], model: Any) -> Callable[..., tuple[str, ...] | None]:
+    allowed = [name for name in schema.model_fields if name in model.__table__.columns]
+
+    def parse(
+        fields: str | None = Query(None, description=f"Comma-separated subset of: {', '.join(allowed)}"),
+    ) -> tuple[str, ...] | None:
+        if fields is None:
+            return None
+        requested = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        unknown = [name for name in requested if name not in allowed]
+        if unknown or not requested:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail=f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields requested",
+            )
+        return requested
+
+    return parse
+
+
+@lru_cache(maxsize=256)
+def _projection(schema: type[BaseModel], fields: tuple[str, ...]) -> TypeAdapter:
+    projected = create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (schema.model_fields[name].annotation, ...) for name in fields},
+    )
+    return TypeAdapter(list[projected])
+
+
+def project(schema: type[BaseModel], fields: tuple[str, ...], objects: Iterable[Any]) -> Response:
+    """Serialize ``objects`` with only ``fields`` of ``schema``."""
+    adapter = _projection(schema, fields)
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(list(objects), from_attributes=True)),
+        media_type="application/json",
+    )
@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_read_db, require_role
+from app.crud.analytics import MAX_HOURS, CohortPeriod, enrollment_snapshot
+from app.models.course import Course
+from app.models.user import User
+from app.schemas.analytics import CompletionCohorts, CourseFillPage, EnrollmentHourly
+
+router = APIRouter()
+
+
+def _as_of() -> datetime:
+    as_of = enrollment_snapshot.as_of()
+    if as_of is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analytics snapshot is not ready yet",
+        )
+    return as_of
+
+
+def _utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@router.get("/enrollments/hourly", response_model=EnrollmentHourly)
+def get_enrollments_hourly(
+    start: datetime,
+    end: datetime,
+    course_id: UUID | None = None,
+    _: User = Depends(require_role("admin")),
+):
+    """Enrollments created per hour between ``start`` and ``end`` (UTC),
+    e.g. across a registration window, from the analytics snapshot."""
+    start, end = _utc(start), _utc(end)
+    if end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end must be after start")
+    if (end - start).total_seconds() > MAX_HOURS * 3600:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_HOURS} hours per request",
+        )
+    as_of = _as_of()
+    return {
+        "as_of": as_of,
+        "course_id": course_id,
+        "hours": enrollment_snapshot.hourly(start, end, course_id),
+    }
+
+
+@router.get("/courses/time-to-fill", response_model=CourseFillPage)
+def get_courses_time_to_fill(
+    db: Session = Depends(get_read_db),
+    _: User = Depends(require_role("admin")),
+):
+    """How long each course took from its first enrollment to as many
+    enrollments as it has seats, from the analytics snapshot."""
+    as_of = _as_of()
+    courses = db.query(Course.id, Course.code, Course.capacity).order_by(Course.code).all()
+    fills = enrollment_snapshot.time_to_fill({course.id: course.capacity for course in courses})
+    return {
+        "as_of": as_of,
+        "items": [{**fill, "code": course.code} for course, fill in zip(courses, fills)],
+    }
+
+
+@router.get("/completion-cohorts", response_model=CompletionCohorts)
+def get_completion_cohorts(
+    period: CohortPeriod = "month",
+    course_id: UUID | None = None,
+    _: User = Depends(require_role("admin")),
+):
+    """Completion rate of the enrollments created in each week or month,
+    from the analytics snapshot."""
+    as_of = _as_of()
+    return {
+        "as_of": as_of,
+        "period": period,
+        "course_id": course_id,
+        "cohorts": enrollment_snapshot.completion_cohorts(period, course_id),
+    }
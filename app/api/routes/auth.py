@@ -1,25 +1,54 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db
 from app.core import security
 from app.core.config import settings
+from app.core.rate_limit import TokenBucketLimiter, retry_after_header
+from app.core.revocation import revoked_tokens
 from app.crud.user import crud_user
 from app.schemas.token import Token, TokenRefreshRequest
 
 router = APIRouter()
 
+account_login_limiter = TokenBucketLimiter(
+    rate=settings.LOGIN_ATTEMPTS_PER_ACCOUNT_PER_MINUTE / 60,
+    burst=settings.LOGIN_ACCOUNT_BURST,
+    max_entries=settings.LOGIN_RATE_LIMIT_MAX_KEYS,
+)
+ip_login_limiter = TokenBucketLimiter(
+    rate=settings.LOGIN_ATTEMPTS_PER_IP_PER_MINUTE / 60,
+    burst=settings.LOGIN_IP_BURST,
+    max_entries=settings.LOGIN_RATE_LIMIT_MAX_KEYS,
+)
+
 
 @router.post("/login", response_model=Token)
 def login(
+    request: Request,
     db: Session = Depends(get_db),
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
+    # Throttle before touching the database or bcrypt, so a credential
+    # stuffing burst is turned away cheaply.
+    client_ip = request.client.host if request.client else None
+    wait = ip_login_limiter.acquire(client_ip) or account_login_limiter.acquire(
+        form_data.username.strip().lower()
+    )
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers=retry_after_header(wait),
+        )
+
     user = crud_user.get_by_email(db, email=form_data.username)
 
+    if not user:
+        security.dummy_verify(form_data.password)
     if not user or not security.verify_password(
         form_data.password, user.hashed_password
     ):
@@ -39,10 +68,12 @@ def login(
         expires_delta=timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         ),
+        claims=security.user_claims(user),
     )
 
     refresh_token = security.create_refresh_token(
-        subject=str(user.id)
+        subject=str(user.id),
+        claims=security.user_claims(user),
     )
 
     return {
@@ -52,25 +83,65 @@ def login(
     }
 
 
-@router.post("/refresh", response_model=Token)
-def refresh_token(request: TokenRefreshRequest):
-    user_id = security.decode_token(request.refresh_token)
+def _invalid_refresh_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+    )
 
-    if not user_id:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid refresh token",
-        )
 
+@router.post("/refresh", response_model=Token)
+def refresh_token(
+    request: TokenRefreshRequest,
+    db: Session = Depends(get_db),
+):
+    payload = security.decode_refresh_token(request.refresh_token)
+    if not payload or revoked_tokens.is_revoked(payload["jti"]):
+        raise _invalid_refresh_token()
+
+    # Deactivation and role changes bump token_version, which also retires
+    # refresh tokens issued before them.
+    state = crud_user.get_token_state(db, payload["sub"])
+    if state is None or not state.is_active or state.token_version != payload.get("ver"):
+        raise _invalid_refresh_token()
+
+    # Rotation: each refresh token is good for exactly one exchange. The
+    # insert loses if a concurrent request already spent the same token.
+    if not revoked_tokens.revoke(
+        db,
+        payload["jti"],
+        expires_at=datetime.utcfromtimestamp(payload["exp"]),
+    ):
+        raise _invalid_refresh_token()
+
+    user_id = str(payload["sub"])
+    claims = {"role": payload["role"], "ver": payload["ver"]}
     access_token = security.create_access_token(
         subject=user_id,
-        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        claims=claims,
     )
 
-    new_refresh_token = security.create_refresh_token(subject=user_id)
+    new_refresh_token = security.create_refresh_token(subject=user_id, claims=claims)
 
     return {
         "access_token": access_token,
         "refresh_token": new_refresh_token,
         "token_type": "bearer",
     }
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    request: TokenRefreshRequest,
+    db: Session = Depends(get_db),
+):
+    payload = security.decode_refresh_token(request.refresh_token)
+    if not payload:
+        raise _invalid_refresh_token()
+
+    revoked_tokens.revoke(
+        db,
+        payload["jti"],
+        expires_at=datetime.utcfromtimestamp(payload["exp"]),
+    )
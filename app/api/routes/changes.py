@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_read_db, require_role
+from app.crud.changes import decode_cursor, encode_cursor, get_changes
+from app.models.course import Course
+from app.models.user import User
+from app.schemas.change import Change, ChangePage
+from app.schemas.course import CourseRead
+from app.schemas.enrollment import EnrollmentRead
+
+router = APIRouter()
+
+
+@router.get("/", response_model=ChangePage)
+def list_changes(
+    db: Session = Depends(get_read_db),
+    since: str | None = Query(None, description="next_cursor from the previous page; omit to start from the beginning"),
+    limit: int = Query(100, ge=1, le=1000),
+    _: User = Depends(require_role("admin")),
+):
+    """Courses and enrollments created or modified after ``since``.
+
+    Sync jobs keep the last ``next_cursor`` and poll with it, so each poll
+    costs in proportion to what changed.
+    """
+    try:
+        after = decode_cursor(since) if since else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    rows, has_more = get_changes(db, after=after, limit=limit)
+    changes = [
+        Change(type="course", data=CourseRead.model_validate(row))
+        if isinstance(row, Course)
+        else Change(type="enrollment", data=EnrollmentRead.model_validate(row))
+        for row in rows
+    ]
+    next_cursor = encode_cursor((rows[-1].updated_at, rows[-1].id)) if rows else since or ""
+    return {"changes": changes, "next_cursor": next_cursor, "has_more": has_more}
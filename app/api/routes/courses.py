@@ -1,12 +1,30 @@
+from typing import AsyncIterator
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, require_role, get_current_active_user
+from app.api.bulk import id_list, ndjson_response, read_rows
+from app.api.deps import get_db, get_read_db, require_role, get_current_active_user
 from app.models.user import User
-from app.schemas.course import CourseCreate, CourseUpdate, CourseRead, CourseStatusUpdate
-
+from app.schemas.course import (
+    CourseAvailability,
+    CourseAvailabilityBatch,
+    CourseBatch,
+    CourseCreate,
+    CourseRead,
+    CourseStatsRead,
+    CourseStatusBatchUpdate,
+    CourseStatusRead,
+    CourseStatusUpdate,
+    CourseUpdate,
+)
+
+from app.crud.availability import availability, seat_counters
 from app.crud.course import crud_course
+from app.crud.enrollment import enrollment_crud as crud_enrollment
+from app.crud.stats import StatsSort, course_statistics
 from fastapi import Query
 from typing import List
 
@@ -16,7 +34,7 @@ router = APIRouter()
 
 @router.get("/public", response_model=List[CourseRead])
 def list_active_courses(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
 ):
@@ -26,10 +44,58 @@ def list_active_courses(
         limit=limit,
     )
 
+@router.get("/batch", response_model=CourseBatch)
+def get_courses_batch(
+    db: Session = Depends(get_read_db),
+    ids: list[UUID] = Depends(id_list),
+):
+    courses = crud_course.get_many_read(db, ids)
+    items = {course_id: course for course_id, course in courses.items() if course.is_active}
+    return {
+        "items": items,
+        "missing": [course_id for course_id in ids if course_id not in items],
+    }
+
+@router.get("/stats", response_model=list[CourseStatsRead])
+def get_courses_stats(
+    db: Session = Depends(get_read_db),
+    sort: StatsSort = "code",
+    _: User = Depends(require_role("admin")),
+):
+    """Fill rate, active and completed counts and reactivations of every
+    course, read from the precomputed course_stats table in one query."""
+    return course_statistics.get_all(db, sort=sort)
+
+@router.get("/availability", response_model=CourseAvailabilityBatch)
+def get_courses_availability(
+    db: Session = Depends(get_db),
+    ids: list[UUID] = Depends(id_list),
+):
+    """Seats left in many courses, served from in-memory counters."""
+    seats = seat_counters.get_many(db, ids)
+    items = {course_id: course for course_id, course in seats.items() if course.is_active}
+    return {
+        "items": items,
+        "missing": [course_id for course_id in ids if course_id not in items],
+    }
+
+@router.get("/{course_id}/availability", response_model=CourseAvailability)
+def get_course_availability(
+    course_id: UUID,
+    db: Session = Depends(get_db),
+):
+    seats = seat_counters.get_many(db, [course_id]).get(course_id)
+    if not seats or not seats.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found",
+        )
+    return seats
+
 @router.get("/{course_id}", response_model=CourseRead)
 def get_course(
     course_id: UUID,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     course = crud_course.get(db, id=course_id)
 
@@ -41,6 +107,33 @@ def get_course(
 
     return course
 
+async def _sse_events(course_id: UUID) -> AsyncIterator[str]:
+    async for snapshot in availability.subscribe(course_id):
+        if snapshot is None:
+            yield ": keepalive\n\n"
+        else:
+            yield f"event: availability\ndata: {snapshot.model_dump_json()}\n\n"
+
+@router.get("/{course_id}/availability/stream")
+async def stream_course_availability(
+    course_id: UUID,
+    # Released before streaming starts, so open streams hold no connection.
+    db: Session = Depends(get_read_db, scope="function"),
+):
+    """Server-sent ``availability`` events: the current seat counts, then
+    one event per change (coalesced), with comment heartbeats in between."""
+    course = await run_in_threadpool(crud_course.get, db, course_id)
+    if not course or not course.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found",
+        )
+    return StreamingResponse(
+        _sse_events(course_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.post("/", response_model=CourseRead, status_code=status.HTTP_201_CREATED)
 def create_course(
     *,
@@ -50,6 +143,34 @@ def create_course(
 ):
     return crud_course.create(db, obj_in=course_in)
 
+@router.post("/bulk")
+def import_courses(
+    *,
+    db: Session = Depends(get_db),
+    rows: list[dict] = Depends(read_rows),
+    _: User = Depends(require_role("admin")),
+):
+    """Create courses from a JSON array or CSV (title,code,capacity).
+
+    Streams one NDJSON result per input row, tagged with its row index.
+    """
+    return ndjson_response(crud_course.create_many(db, rows=rows))
+
+@router.patch("/status")
+def update_courses_status(
+    *,
+    db: Session = Depends(get_db),
+    status_in: CourseStatusBatchUpdate,
+    _: User = Depends(require_role("admin")),
+):
+    """Activate or deactivate many courses, by id and/or code, in one
+    statement. Streams one NDJSON result per id and code. With ``cascade``
+    their enrollments follow, as for a single course's status."""
+    update_status_many = crud_enrollment.update_course_status_many if status_in.cascade else crud_course.update_status_many
+    return ndjson_response(
+        update_status_many(db, is_active=status_in.is_active, ids=status_in.ids, codes=status_in.codes)
+    )
+
 @router.put("/{course_id}", response_model=CourseRead)
 def update_course(
     *,
@@ -62,10 +183,10 @@ def update_course(
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
 
-    return crud_course.update(db, db_obj=course, obj_in=course_in)
+    return crud_enrollment.update_course(db, course=course, obj_in=course_in)
 
 
-@router.patch("/{course_id}/status", response_model=CourseRead)
+@router.patch("/{course_id}/status", response_model=CourseStatusRead)
 def update_course_status(
     *,
     db: Session = Depends(get_db),
@@ -83,8 +204,8 @@ def update_course_status(
             detail="Course already in requested state",
         )
 
-    course.is_active = status_in.is_active
-    db.commit()
-    db.refresh(course)
-    return course
+    if status_in.cascade:
+        course, changed = crud_enrollment.update_course_status(db, course=course, is_active=status_in.is_active)
+        return CourseStatusRead(**CourseRead.model_validate(course).model_dump(), enrollments_changed=changed)
+    return crud_course.update_status(db, course=course, is_active=status_in.is_active)
 
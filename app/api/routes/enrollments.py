@@ -1,41 +1,97 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from uuid import UUID
 
 from app import crud
-from app.api.deps import get_db, get_current_active_user, require_role
+from app.api.bulk import ndjson_response
+from app.api.fieldsets import fields_param, project
+from app.api.deps import get_db, get_read_db, get_token_user, require_role
+from app.models.enrollment import Enrollment
 from app.models.user import User
-from app.schemas.enrollment import EnrollmentCreate, EnrollmentRead, EnrollmentCreateAdmin
+from app.schemas.enrollment import EnrollmentCompletion, EnrollmentCreate, EnrollmentRead, EnrollmentCreateAdmin
+from app.schemas.waitlist import WaitlistRead
 
 
 
-from app.crud.enrollment import enrollment_crud as crud_enrollment
+from app.core.config import settings
+from app.core.admission import KeyClosed, QueueFull
+from app.core.rate_limit import retry_after_header
+from app.crud.enrollment import enrollment_admission, enrollment_batcher, enrollment_crud as crud_enrollment
+from app.db.session import primary_pins
 from app.crud.course import crud_course
 from app.crud.user import crud_user
+from app.crud.waitlist import waitlist_crud
 from app.api import deps
 
 
 router = APIRouter()
 
+EXPANSIONS = {"course", "user"}
 
-@router.post("/", response_model=EnrollmentRead, status_code=status.HTTP_201_CREATED)
+
+def expand_param(
+    expand: str = Query("", description="Comma-separated related objects to embed: course, user"),
+) -> frozenset[str]:
+    requested = frozenset(name.strip() for name in expand.split(",") if name.strip())
+    unknown = requested - EXPANSIONS
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"Unknown expansion: {', '.join(sorted(unknown))}",
+        )
+    return requested
+
+
+def _enroll(db: Session, user_id: UUID, course_id: UUID) -> Enrollment:
+    if settings.ENROLLMENT_ADMISSION_QUEUE:
+        try:
+            enrollment = enrollment_admission.submit(course_id, (db, user_id, course_id))
+        except KeyClosed:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Course is full")
+        except QueueFull:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many pending enrollments for this course, try again shortly",
+                headers=retry_after_header(1),
+            )
+    elif settings.ENROLLMENT_GROUP_COMMIT:
+        enrollment = enrollment_batcher.submit(db, (user_id, course_id))
+    else:
+        return crud_enrollment.enroll(db=db, user_id=user_id, course_id=course_id)
+    # The batch may have been committed through another request's session.
+    primary_pins.pin(db.info.get("pin_key"))
+    return enrollment
+
+
+@router.post(
+    "/",
+    response_model=EnrollmentRead,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"model": WaitlistRead, "description": "Queued on the waitlist"}},
+)
 def enroll_in_course(
     *,
     db: Session = Depends(get_db),
     enrollment_in: EnrollmentCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: User = Depends(get_token_user),
 ):
+    """Enroll the caller. With ``waitlist`` set, a full course queues them
+    instead (202 with their place), and the seat is theirs once promoted."""
     if current_user.role != "student":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only students can enroll in courses",
         )
 
-    return crud_enrollment.enroll(
-        db=db,
-        user_id=current_user.id,
-        course_id=enrollment_in.course_id,
-    )
+    try:
+        return _enroll(db, current_user.id, enrollment_in.course_id)
+    except HTTPException as error:
+        if not enrollment_in.waitlist or error.detail != "Course is full":
+            raise
+    place = waitlist_crud.join(db, user_id=current_user.id, course_id=enrollment_in.course_id)
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=jsonable_encoder(place))
 
 
 @router.post("/admin", response_model=EnrollmentRead)
@@ -45,16 +101,35 @@ def enroll_user_as_admin(
     enrollment_in: EnrollmentCreateAdmin,
     _: User = Depends(require_role("admin")),
 ):
-    return crud_enrollment.enroll(
-        db=db,
-        user_id=enrollment_in.user_id,
-        course_id=enrollment_in.course_id,
+    return _enroll(db, enrollment_in.user_id, enrollment_in.course_id)
+
+@router.post("/complete")
+def complete_enrollments(
+    *,
+    db: Session = Depends(get_db),
+    completion_in: EnrollmentCompletion,
+    _: User = Depends(require_role("admin")),
+):
+    """Mark enrollments completed, e.g. from a grading export.
+
+    Streams one NDJSON result per id: ``completed``, ``already_completed``,
+    ``inactive`` or ``not_found``.
+    """
+    return ndjson_response(
+        crud_enrollment.complete_many(
+            db,
+            enrollment_ids=completion_in.enrollment_ids,
+            course_id=completion_in.course_id,
+            user_ids=completion_in.user_ids,
+        )
     )
 
 @router.get("/me", response_model=list[EnrollmentRead])
 def my_enrollments(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_token_user),
+    include_archived: bool = False,
+    expand: frozenset[str] = Depends(expand_param),
 ):
     if current_user.role != "student":
         raise HTTPException(
@@ -65,14 +140,18 @@ def my_enrollments(
     return crud_enrollment.get_by_user(
         db,
         user_id=current_user.id,
+        include_archived=include_archived,
+        expand=expand,
     )
 
 
 @router.get("/user/{user_id}", response_model=list[EnrollmentRead])
 def enrollments_by_user_id(
     user_id: UUID,
-    db: Session = Depends(get_db),
-    current_admin: User = Depends(deps.require_role("admin")) # Only Admins can look up others
+    db: Session = Depends(get_read_db),
+    current_admin: User = Depends(deps.require_role("admin")), # Only Admins can look up others
+    include_archived: bool = False,
+    expand: frozenset[str] = Depends(expand_param),
 ):
     # 1. Fetch the user first to check their role
     target_user = crud_user.get(db, id=user_id)
@@ -88,7 +167,12 @@ def enrollments_by_user_id(
         )
 
     # 3. If they are a student, proceed to get enrollments
-    return crud_enrollment.get_by_user(db, user_id=user_id)
+    return crud_enrollment.get_by_user(
+        db,
+        user_id=user_id,
+        include_archived=include_archived,
+        expand=expand,
+    )
 
 @router.get(
     "/{enrollment_id}",
@@ -96,8 +180,8 @@ def enrollments_by_user_id(
 )
 def get_enrollment_by_id(
     enrollment_id: UUID,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_token_user),
 ):
     enrollment = crud_enrollment.get(db, enrollment_id)
 
@@ -115,32 +199,43 @@ def get_enrollment_by_id(
 )
 def get_enrollments_by_course_id(
     course_id: UUID,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_token_user),
+    expand: frozenset[str] = Depends(expand_param),
 ):
     if current_user.role != "admin":
 
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    return crud_enrollment.get_by_course_id(db, course_id=course_id)
+    return crud_enrollment.get_by_course_id(db, course_id=course_id, expand=expand)
 
 
 
 @router.get("/", response_model=list[EnrollmentRead])
 def list_all_enrollments(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: User = Depends(require_role("admin")),
     skip: int = 0,
     limit: int = 10,
+    expand: frozenset[str] = Depends(expand_param),
+    fields: tuple[str, ...] | None = Depends(fields_param(EnrollmentRead, Enrollment)),
 ):
-    return crud_enrollment.get_multi(db, skip=skip, limit=limit)
+    if fields and expand:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="fields and expand cannot be combined",
+        )
+    enrollments = crud_enrollment.get_multi(db, skip=skip, limit=limit, expand=expand, fields=fields)
+    if fields:
+        return project(EnrollmentRead, fields, enrollments)
+    return enrollments
 
 @router.patch("/{enrollment_id}", status_code=status.HTTP_204_NO_CONTENT)
 def deregister_enrollment(
     *,
     db: Session = Depends(get_db),
     enrollment_id: UUID,
-    current_user: User = Depends(get_current_active_user),
+    current_user: User = Depends(get_token_user),
 ):
     crud_enrollment.deregister(
         db=db,
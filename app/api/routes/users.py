@@ -2,10 +2,15 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from uuid import UUID
 
-from app.api.deps import get_db, get_current_active_user, require_role
+from app.api.bulk import id_list, ndjson_response, read_rows
+from app.api.fieldsets import fields_param, project
+from app.api.deps import get_db, get_read_db, get_current_active_user, get_token_user, require_role
 from app.models.user import User
-from app.schemas.user import UserCreate, UserUpdateMe, UserUpdateAdmin, UserRead, UserStatusUpdate
+from app.schemas.user import UserBatch, UserCreate, UserUpdateMe, UserUpdateAdmin, UserRead, UserStatusRead, UserStatusUpdate
+from app.crud.dashboard import get_dashboard
+from app.crud.enrollment import enrollment_crud as crud_enrollment
 from app.crud.user import crud_user
+from app.schemas.dashboard import Dashboard
 
 from app.core.security import get_password_hash
 
@@ -24,28 +29,73 @@ def register_user(
     user = crud_user.create(db, obj_in=user_in)
     return user
 
+@router.post("/bulk")
+def import_users(
+    *,
+    db: Session = Depends(get_db),
+    rows: list[dict] = Depends(read_rows),
+    _: User = Depends(require_role("admin")),
+):
+    """Create users from a JSON array or CSV (name,email,password[,role]).
+
+    Streams one NDJSON result per input row, tagged with its row index.
+    """
+    return ndjson_response(crud_user.create_many(db, rows=rows))
+
 @router.get("/me", response_model=UserRead)
 def read_current_user(
     current_user: User = Depends(get_current_active_user),
 ):
     return current_user
 
+@router.get("/me/dashboard", response_model=Dashboard)
+def read_dashboard(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_token_user),
+):
+    """Everything the student home screen needs, in one response.
+
+    Served from a per-user cache that the user's own enrollment and profile
+    changes invalidate.
+    """
+    dashboard = get_dashboard(db, current_user.id)
+    if dashboard is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return dashboard
+
 @router.get("/", response_model=list[UserRead])
 def list_users(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     skip: int = 0,
     limit: int = 10,
     _: User = Depends(require_role("admin")),
+    fields: tuple[str, ...] | None = Depends(fields_param(UserRead, User)),
 ):
     limit = min(limit, 100)  
-    return crud_user.get_multi(db, skip=skip, limit=limit)
+    users = crud_user.get_multi(db, skip=skip, limit=limit, fields=fields)
+    if fields:
+        return project(UserRead, fields, users)
+    return users
+
+
+@router.get("/batch", response_model=UserBatch)
+def get_users_batch(
+    db: Session = Depends(get_read_db),
+    ids: list[UUID] = Depends(id_list),
+    _: User = Depends(require_role("admin")),
+):
+    users = crud_user.get_many_read(db, ids)
+    return {
+        "items": users,
+        "missing": [user_id for user_id in ids if user_id not in users],
+    }
 
 
 @router.get("/{user_id}", response_model=UserRead)
 def get_user_by_id(
     user_id: UUID,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: User = Depends(require_role("admin")),
 ):
     user = crud_user.get(db, id=user_id)
@@ -95,7 +145,7 @@ def admin_update_user(
     )
 
 
-@router.patch("/{user_id}/status", response_model=UserRead, status_code=status.HTTP_200_OK,)
+@router.patch("/{user_id}/status", response_model=UserStatusRead, status_code=status.HTTP_200_OK,)
 def update_user_status(
     *,
     db: Session = Depends(get_db),
@@ -107,6 +157,9 @@ def update_user_status(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    if status_in.cascade:
+        user, changed = crud_enrollment.update_user_status(db, user=user, is_active=status_in.is_active)
+        return UserStatusRead(**UserRead.model_validate(user).model_dump(), enrollments_changed=changed)
     return crud_user.update_status(
         db,
         user=user,
@@ -0,0 +1,45 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_db, get_read_db, get_token_user
+from app.crud.waitlist import waitlist_crud
+from app.models.user import User
+from app.schemas.waitlist import WaitlistCreate, WaitlistRead
+
+router = APIRouter()
+
+
+@router.post("/", response_model=WaitlistRead, status_code=status.HTTP_201_CREATED)
+def join_waitlist(
+    *,
+    db: Session = Depends(get_db),
+    waitlist_in: WaitlistCreate,
+    current_user: User = Depends(get_token_user),
+):
+    """Queue for a full course; the student is enrolled automatically when
+    a seat frees up, so there is no need to retry or poll."""
+    if current_user.role != "student":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only students can join waitlists",
+        )
+    return waitlist_crud.join(db, user_id=current_user.id, course_id=waitlist_in.course_id)
+
+
+@router.get("/me", response_model=list[WaitlistRead])
+def my_waitlists(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_token_user),
+):
+    return waitlist_crud.get_by_user(db, user_id=current_user.id)
+
+
+@router.delete("/{course_id}", status_code=status.HTTP_204_NO_CONTENT)
+def leave_waitlist(
+    course_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_token_user),
+):
+    waitlist_crud.leave(db, user_id=current_user.id, course_id=course_id)
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable
+
+
+class AdmissionRejected(Exception):
+    pass
+
+
+class QueueFull(AdmissionRejected):
+    """The key already has ``depth`` requests waiting."""
+
+
+class KeyClosed(AdmissionRejected):
+    """The key was closed by ``close`` and has not reopened yet."""
+
+
+@dataclass(eq=False)
+class _Entry:
+    item: Any
+    future: Future = field(default_factory=Future)
+    # Set once the entry is processed or its caller must lead the lane.
+    wake: threading.Event = field(default_factory=threading.Event)
+
+
+@dataclass(eq=False)
+class _Lane:
+    queue: deque = field(default_factory=deque)
+    active: bool = False
+    closed_until: float = 0.0
+
+
+class AdmissionQueue:
+    """Serializes work per key inside one process, keys in parallel.
+
+    Requests for a key queue up in arrival order and are processed by one
+    caller at a time: the caller at the head of an idle lane drains up to
+    ``max_batch`` entries through ``execute`` (one result or exception per
+    item, as with ``GroupCommitter``), then hands the lane to the next
+    waiter. No extra threads are started.
+
+    A lane holding ``depth`` waiting requests rejects more with
+    ``QueueFull``. ``close`` makes a key reject new and queued requests with
+    ``KeyClosed`` for a while, e.g. once a course is known to be full.
+    """
+
+    def __init__(
+        self,
+        execute: Callable[[list[Any]], list[Any]],
+        *,
+        depth: int,
+        max_batch: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.execute = execute
+        self.depth = depth
+        self.max_batch = max_batch
+        self.clock = clock
+        self._lanes: dict[Hashable, _Lane] = {}
+        self._lock = threading.Lock()
+
+    def close(self, key: Hashable, seconds: float) -> None:
+        with self._lock:
+            lane = self._lanes.setdefault(key, _Lane())
+            lane.closed_until = self.clock() + seconds
+
+    def reopen(self, key: Hashable) -> None:
+        with self._lock:
+            lane = self._lanes.get(key)
+            if lane is None:
+                return
+            lane.closed_until = 0.0
+            if not lane.active and not lane.queue:
+                del self._lanes[key]
+
+    def submit(self, key: Hashable, item: Any) -> Any:
+        entry = _Entry(item)
+        with self._lock:
+            lane = self._lanes.setdefault(key, _Lane())
+            if lane.closed_until > self.clock():
+                raise KeyClosed(key)
+            if len(lane.queue) >= self.depth:
+                raise QueueFull(key)
+            lane.queue.append(entry)
+            if not lane.active:
+                lane.active = True
+                entry.wake.set()
+
+        entry.wake.wait()
+        if not entry.future.done():
+            self._drain(key, lane)
+        return entry.future.result()
+
+    def _drain(self, key: Hashable, lane: _Lane) -> None:
+        with self._lock:
+            if lane.closed_until > self.clock():
+                batch, rejected = [], list(lane.queue)
+                lane.queue.clear()
+            else:
+                batch = [lane.queue.popleft() for _ in range(min(self.max_batch, len(lane.queue)))]
+                rejected = []
+
+        for entry in rejected:
+            entry.future.set_exception(KeyClosed(key))
+            entry.wake.set()
+        if batch:
+            self._run(batch)
+
+        with self._lock:
+            if lane.queue:
+                lane.queue[0].wake.set()
+            else:
+                lane.active = False
+                if lane.closed_until <= self.clock() and self._lanes.get(key) is lane:
+                    del self._lanes[key]
+
+    def _run(self, batch: list[_Entry]) -> None:
+        try:
+            results = self.execute([entry.item for entry in batch])
+        except BaseException as exc:
+            results = [exc] * len(batch)
+        for entry, result in zip(batch, results):
+            if isinstance(result, BaseException):
+                entry.future.set_exception(result)
+            else:
+                entry.future.set_result(result)
+            entry.wake.set()
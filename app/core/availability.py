@@ -0,0 +1,143 @@
+"""Fan-out of live seat availability to streaming subscribers.
+
+Writers call ``notify(course_id)`` from any thread. A single flusher task
+reloads every notified course that has subscribers in one ``load`` call, at
+most ``max_rate`` times a second, and hands the result to all of that
+course's subscribers at once. Bursts of writes inside one interval are
+coalesced into a single update.
+
+Subscribers only wait on an ``asyncio.Event`` shared by their course, so an
+idle connection costs no queries and no buffer of its own; a slow client
+skips straight to the latest snapshot.
+"""
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Generic, TypeVar
+from uuid import UUID
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Channel(Generic[T]):
+    __slots__ = ("subscribers", "snapshot", "changed")
+
+    def __init__(self):
+        self.subscribers = 0
+        self.snapshot: T | None = None
+        self.changed = asyncio.Event()
+
+    def publish(self, snapshot: T) -> None:
+        self.snapshot = snapshot
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class AvailabilityBroadcaster(Generic[T]):
+    def __init__(
+        self,
+        load: Callable[[list[UUID]], dict[UUID, T]],
+        *,
+        max_rate: float,
+        heartbeat: float,
+        refresh_interval: float,
+    ):
+        self.load = load
+        self.max_rate = max_rate
+        self.heartbeat = heartbeat
+        self.refresh_interval = refresh_interval
+        self._channels: dict[UUID, _Channel[T]] = {}
+        self._dirty: set[UUID] = set()
+        self._wake: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(channel.subscribers for channel in self._channels.values())
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task, self._loop = self._task, None, None
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def notify(self, course_id: UUID) -> None:
+        """Mark ``course_id`` as changed. Safe to call from any thread."""
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._mark, course_id)
+        except RuntimeError:
+            # The loop shut down between the check and the call.
+            pass
+
+    def _mark(self, course_id: UUID) -> None:
+        if course_id in self._channels:
+            self._dirty.add(course_id)
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.refresh_interval)
+            except asyncio.TimeoutError:
+                self._dirty.update(self._channels)
+            self._wake.clear()
+            dirty = [course_id for course_id in self._dirty if course_id in self._channels]
+            self._dirty.clear()
+            if dirty:
+                try:
+                    snapshots = await run_in_threadpool(self.load, dirty)
+                except Exception:
+                    logger.exception("Loading availability for %s courses failed", len(dirty))
+                    self._dirty.update(dirty)
+                    snapshots = {}
+                for course_id, snapshot in snapshots.items():
+                    channel = self._channels.get(course_id)
+                    if channel:
+                        channel.publish(snapshot)
+            await asyncio.sleep(1 / self.max_rate)
+
+    async def subscribe(self, course_id: UUID) -> AsyncIterator[T | None]:
+        """Yield the current snapshot, then every update.
+
+        Yields None when nothing changed for ``heartbeat`` seconds, so the
+        caller can keep the connection alive.
+        """
+        channel = self._channels.get(course_id)
+        if channel is None:
+            channel = self._channels[course_id] = _Channel()
+        channel.subscribers += 1
+        try:
+            changed = channel.changed
+            if channel.snapshot is None:
+                # The first subscriber has the flusher load the snapshot;
+                # everyone arriving meanwhile waits for the same load.
+                self._mark(course_id)
+            else:
+                yield channel.snapshot
+            while True:
+                try:
+                    await asyncio.wait_for(changed.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                changed = channel.changed
+                yield channel.snapshot
+        finally:
+            channel.subscribers -= 1
+            if not channel.subscribers:
+                del self._channels[course_id]
@@ -0,0 +1,97 @@
+"""Append-only column files on local disk, memory-mapped for reading.
+
+Each column is a raw ``<name>.bin`` file of fixed-width values. ``meta.json``
+records how many rows are valid, plus whatever state the owner keeps next
+to them (e.g. refresh watermarks). It is replaced atomically after the
+column files are written, so readers never see a partial append. Writers,
+possibly in several processes, serialize on an exclusive ``flock``.
+"""
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import numpy as np
+
+
+class ColumnarStore:
+    def __init__(self, path: str, columns: dict[str, str]):
+        self.path = path
+        self.columns = {name: np.dtype(dtype) for name, dtype in columns.items()}
+        self._loaded: tuple[int, dict[str, np.ndarray], dict[str, Any]] | None = None
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file(".lock"), "w") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _read_meta(self) -> tuple[int, dict[str, Any]]:
+        try:
+            with open(self._file("meta.json")) as handle:
+                meta = json.load(handle)
+        except FileNotFoundError:
+            return 0, {}
+        return meta["rows"], meta["state"]
+
+    def _write_meta(self, rows: int, state: dict[str, Any]) -> None:
+        temporary = self._file("meta.json.tmp")
+        with open(temporary, "w") as handle:
+            json.dump({"rows": rows, "state": state}, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temporary, self._file("meta.json"))
+
+    def read(self) -> tuple[dict[str, np.ndarray], dict[str, Any]]:
+        """Read-only views of the valid rows of every column, and the
+        state. Re-mapped only when ``meta.json`` changed."""
+        try:
+            version = os.stat(self._file("meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            version = 0
+        if self._loaded is None or self._loaded[0] != version:
+            rows, state = self._read_meta()
+            arrays = {
+                name: (
+                    np.memmap(self._file(f"{name}.bin"), dtype=dtype, mode="r", shape=(rows,))
+                    if rows
+                    else np.empty(0, dtype=dtype)
+                )
+                for name, dtype in self.columns.items()
+            }
+            self._loaded = (version, arrays, state)
+        return self._loaded[1], self._loaded[2]
+
+    def append(self, arrays: dict[str, np.ndarray], state: dict[str, Any]) -> int:
+        """Append equally long ``arrays`` (one per column) and replace the
+        state. Must be called under ``lock``. Returns the new row count."""
+        rows, _ = self._read_meta()
+        added = len(next(iter(arrays.values()))) if arrays else 0
+        os.makedirs(self.path, exist_ok=True)
+        for name, dtype in self.columns.items():
+            with open(self._file(f"{name}.bin"), "ab") as handle:
+                # Drops whatever an append that died before its meta write left.
+                handle.truncate(rows * dtype.itemsize)
+                if added:
+                    handle.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+                handle.flush()
+                os.fsync(handle.fileno())
+        self._write_meta(rows + added, state)
+        return rows + added
+
+    def update(self, name: str, indices: np.ndarray, values: np.ndarray) -> None:
+        """Overwrite rows of one column in place. Must be called under ``lock``."""
+        if not len(indices):
+            return
+        rows, _ = self._read_meta()
+        column = np.memmap(self._file(f"{name}.bin"), dtype=self.columns[name], mode="r+", shape=(rows,))
+        column[indices] = values
+        column.flush()
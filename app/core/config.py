@@ -9,15 +9,98 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str
+    DATABASE_REPLICA_URLS: str = ""  # comma-separated read replica URLs
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_CHECK_INTERVAL_SECONDS: float = 10.0
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    # Ordered, comma-separated shard map for the enrollments table. Rows are
+    # placed by user_id, so the order must never change once data is written.
+    ENROLLMENT_SHARD_URLS: str = ""
+    ENROLLMENT_PARTITION_MONTHS_AHEAD: int = 3
+    ENROLLMENT_ARCHIVE_AFTER_DAYS: int = 365
 
     # Security
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # How long a process may serve a cached token_version/role/is_active for
+    # a user; revocations made by other processes take effect within this.
+    TOKEN_VERSION_CACHE_TTL_SECONDS: float = 30.0
+    TOKEN_VERSION_CACHE_SIZE: int = 10_000
+    REVOCATION_SYNC_INTERVAL_SECONDS: float = 5.0
+    # Login throttling, checked before any password hashing.
+    LOGIN_ATTEMPTS_PER_ACCOUNT_PER_MINUTE: float = 5
+    LOGIN_ACCOUNT_BURST: int = 5
+    LOGIN_ATTEMPTS_PER_IP_PER_MINUTE: float = 60
+    LOGIN_IP_BURST: int = 20
+    LOGIN_RATE_LIMIT_MAX_KEYS: int = 100_000
+    # Processes used to hash passwords in bulk imports; 0 means one per CPU.
+    PASSWORD_HASH_WORKERS: int = 0
+    BULK_BATCH_SIZE: int = 500
+    # Ids per UPDATE when marking enrollments completed in bulk.
+    BULK_COMPLETE_BATCH_SIZE: int = 5000
+    BATCH_LOOKUP_MAX_IDS: int = 500
+    # Course/user snapshots served by the batch lookup endpoints.
+    CATALOG_CACHE_TTL_SECONDS: float = 60.0
+    CATALOG_CACHE_SIZE: int = 10_000
+    # A user's own enrollment changes invalidate their dashboard at once; seat
+    # counts moved by other students can lag by up to this long.
+    DASHBOARD_CACHE_TTL_SECONDS: float = 15.0
+    # The change feed only serves rows older than this, so that writes whose
+    # transactions commit late are not skipped by a cursor that moved past.
+    CHANGE_FEED_SAFETY_SECONDS: float = 5.0
+    # Per-course cap on availability stream events; bursts of enrollments
+    # inside one interval are coalesced into a single event.
+    AVAILABILITY_MAX_EVENTS_PER_SECOND: float = 2.0
+    AVAILABILITY_HEARTBEAT_SECONDS: float = 15.0
+    # Streams re-send their course's counts at least this often.
+    AVAILABILITY_REFRESH_SECONDS: float = 30.0
+    # Seat counters are rebuilt from the database this often, which picks up
+    # enrollments made through other worker processes.
+    SEAT_COUNTER_RECONCILE_SECONDS: float = 10.0
+    # Course statistics: courses changed in this process are recomputed this
+    # often, and every course at the slower full interval.
+    COURSE_STATS_REFRESH_SECONDS: float = 5.0
+    COURSE_STATS_FULL_REFRESH_SECONDS: float = 3600.0
+    # Columnar enrollment snapshot behind the analytics endpoints. Keep it on
+    # local disk; it survives restarts and only fetches what changed since.
+    ANALYTICS_SNAPSHOT_DIR: str = "var/analytics"
+    ANALYTICS_REFRESH_SECONDS: float = 60.0
+    # Each refresh re-reads rows this much older than the last one it saw,
+    # so that transactions committing late are not missed.
+    ANALYTICS_OVERLAP_SECONDS: float = 60.0
+    # Responses to keyed POSTs are replayed for this long.
+    IDEMPOTENCY_KEY_TTL_SECONDS: float = 86400.0
+    # A claim left by a worker that died mid-request lapses after this long.
+    IDEMPOTENCY_LOCK_TIMEOUT_SECONDS: float = 60.0
+    # How long a duplicate waits for the first request before getting a 409.
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_CACHE_SIZE: int = 10_000
+    # Coalesce concurrent enrollments into one transaction per worker. Each
+    # request then waits up to the window for others to join its batch.
+    ENROLLMENT_GROUP_COMMIT: bool = False
+    ENROLLMENT_GROUP_COMMIT_WINDOW_MS: float = 5.0
+    ENROLLMENT_GROUP_COMMIT_MAX_BATCH: int = 64
+    # Process enrollments for each course one batch at a time per worker.
+    # Beyond ADMISSION_QUEUE_DEPTH waiting requests a course answers 429.
+    ENROLLMENT_ADMISSION_QUEUE: bool = False
+    ADMISSION_QUEUE_DEPTH: int = 200
+    # Once a course fills up, reject enrollments without queueing them for
+    # this long, or until a seat frees up on this worker.
+    ADMISSION_FULL_SECONDS: float = 2.0
+    REVOCATION_PURGE_INTERVAL_SECONDS: float = 3600.0
 
     ALGORITHM: str = "HS256"
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
+    @property
+    def replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+    @property
+    def enrollment_shard_urls(self) -> list[str]:
+        return [url.strip() for url in self.ENROLLMENT_SHARD_URLS.split(",") if url.strip()]
+
 
 settings = Settings()
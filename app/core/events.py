@@ -0,0 +1,44 @@
+"""In-process publish/subscribe for domain events.
+
+Writers publish after their commit; subscribers keep derived state such as
+caches in step::
+
+    @events.subscribe(events.ENROLLMENT_CHANGED)
+    def _forget(*, user_id, course_id, **_):
+        ...
+
+Handlers run synchronously in the publishing thread and must be quick. A
+failing handler is logged and does not affect the writer or other handlers.
+Events do not cross process boundaries.
+"""
+import logging
+from collections import defaultdict
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+ENROLLMENT_CHANGED = "enrollment_changed"
+# Set-based writes: one event with ``user_ids`` and per-course ``deltas``.
+ENROLLMENTS_CHANGED = "enrollments_changed"
+COURSE_CHANGED = "course_changed"
+USER_CHANGED = "user_changed"
+
+Handler = Callable[..., Any]
+
+_handlers: defaultdict[str, list[Handler]] = defaultdict(list)
+
+
+def subscribe(event: str) -> Callable[[Handler], Handler]:
+    def register(handler: Handler) -> Handler:
+        _handlers[event].append(handler)
+        return handler
+
+    return register
+
+
+def publish(event: str, **payload: Any) -> None:
+    for handler in list(_handlers[event]):
+        try:
+            handler(**payload)
+        except Exception:
+            logger.exception("Handler %r for %s failed", handler, event)
@@ -0,0 +1,70 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Generic, TypeVar
+
+from sqlalchemy.orm import Session
+
+T = TypeVar("T")
+
+
+class GroupCommitter(Generic[T]):
+    """Coalesces concurrent writes into one transaction.
+
+    The first caller to ``submit`` becomes the leader of a new batch: it
+    waits up to ``window`` seconds (less if ``max_batch`` items arrive),
+    then runs ``execute`` on its own session for every item in the batch
+    and hands each follower its result. ``execute`` returns one entry per
+    item, either the result or the exception to raise for that item alone.
+
+    Callers block in their own (threadpool) thread, so this suits the
+    synchronous route handlers.
+    """
+
+    def __init__(
+        self,
+        execute: Callable[[Session, list[T]], list[Any]],
+        *,
+        window: float,
+        max_batch: int,
+    ):
+        self.execute = execute
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._batch: list[tuple[T, Future]] | None = None
+        self._full: threading.Event | None = None
+
+    def submit(self, db: Session, item: T) -> Any:
+        future: Future = Future()
+        with self._lock:
+            batch, full = self._batch, self._full
+            leader = batch is None
+            if leader:
+                batch = self._batch = []
+                full = self._full = threading.Event()
+            batch.append((item, future))
+            if len(batch) >= self.max_batch:
+                # Later callers start the next batch.
+                self._batch = None
+                full.set()
+
+        if leader:
+            full.wait(self.window)
+            with self._lock:
+                if self._batch is batch:
+                    self._batch = None
+            self._run(db, batch)
+        return future.result()
+
+    def _run(self, db: Session, batch: list[tuple[T, Future]]) -> None:
+        try:
+            results = self.execute(db, [item for item, _ in batch])
+        except BaseException as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,345 @@
+"""Replay of the first response to POSTs sent with an ``Idempotency-Key``.
+
+Keys are scoped to the caller's Authorization header and the route. The
+first request with a key claims it in ``idempotency_keys`` and runs
+normally; its status and body are stored once it finishes. A retry with the
+same key and body gets that stored response without reaching the route, and
+a retry arriving while the first request still runs waits for it. Reusing a
+key for a different body is rejected with 422.
+
+5xx, 409 and 429 responses and exceptions release the claim so that the
+client can try again (a conflict or backpressure is transient, and 429's
+Retry-After is not stored), and a claim left behind by a crashed worker lapses after
+``lock_timeout`` seconds. Finished responses are also kept in a bounded
+in-process cache, so replays on the same worker cost no query.
+"""
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Row, delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.base_class import UTC_NOW
+from app.db.session import SessionLocal
+from app.models.idempotency import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+# Responses worth retrying under the same key: a conflict with a concurrent
+# write, or backpressure such as the enrollment admission queue's.
+RELEASED_STATUSES = frozenset({409, 429})
+
+
+class IdempotencyError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: bytes
+    status_code: int
+    content_type: str | None
+    body: bytes
+
+
+class IdempotencyStore:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        ttl: float,
+        lock_timeout: float,
+        wait_timeout: float,
+        cache_size: int,
+        poll_interval: float = 0.1,
+    ):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._cache = TTLCache(ttl=ttl, max_entries=cache_size)
+        self._inflight: dict[bytes, asyncio.Future] = {}
+
+    def _claim(self, key: bytes, fingerprint: bytes) -> tuple[bool, Row | None]:
+        """Insert the claim, taking over a lapsed one. Returns ``(True, None)``
+        when claimed, otherwise ``(False, row)`` with the existing row (None
+        if it just vanished)."""
+        db = self.session_factory()
+        try:
+            statement = insert(IdempotencyKey).values(
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=UTC_NOW + timedelta(seconds=self.lock_timeout),
+            )
+            claimed = db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[IdempotencyKey.key],
+                    set_={
+                        "fingerprint": statement.excluded.fingerprint,
+                        "status_code": None,
+                        "content_type": None,
+                        "body": None,
+                        "expires_at": statement.excluded.expires_at,
+                    },
+                    where=IdempotencyKey.expires_at < UTC_NOW,
+                ).returning(IdempotencyKey.key)
+            ).first()
+            db.commit()
+            if claimed:
+                return True, None
+            existing = db.execute(
+                select(
+                    IdempotencyKey.fingerprint,
+                    IdempotencyKey.status_code,
+                    IdempotencyKey.content_type,
+                    IdempotencyKey.body,
+                ).where(IdempotencyKey.key == key)
+            ).first()
+            return False, existing
+        finally:
+            db.close()
+
+    def _save(self, key: bytes, response: StoredResponse) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key)
+                .values(
+                    status_code=response.status_code,
+                    content_type=response.content_type,
+                    body=response.body,
+                    expires_at=UTC_NOW + timedelta(seconds=self.ttl),
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _delete_claim(self, key: bytes) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.status_code.is_(None),
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _check(stored: StoredResponse, fingerprint: bytes) -> StoredResponse:
+        if stored.fingerprint != fingerprint:
+            raise IdempotencyError(422, f"{HEADER} was already used for a different request")
+        return stored
+
+    async def begin(self, key: bytes, fingerprint: bytes) -> StoredResponse | None:
+        """Claim ``key`` or wait for whoever holds it.
+
+        Returns None when the caller now owns the key and must run the
+        request, then call ``finish`` or ``release``. Otherwise returns the
+        stored response of the first request.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+        while True:
+            stored = self._cache.get(key)
+            if stored is not None:
+                return self._check(stored, fingerprint)
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                # Registered before the claim so that concurrent duplicates
+                # on this worker wait here instead of polling the table.
+                pending = self._inflight[key] = loop.create_future()
+                try:
+                    claimed, existing = await run_in_threadpool(self._claim, key, fingerprint)
+                except BaseException:
+                    self._resolve(key)
+                    raise
+                if claimed:
+                    return None
+                self._resolve(key)
+                pending = None
+                if existing is not None and existing.status_code is not None:
+                    stored = StoredResponse(
+                        fingerprint=existing.fingerprint,
+                        status_code=existing.status_code,
+                        content_type=existing.content_type,
+                        body=existing.body,
+                    )
+                    self._cache.set(key, stored)
+                    return self._check(stored, fingerprint)
+                if existing is not None and existing.fingerprint != fingerprint:
+                    raise IdempotencyError(422, f"{HEADER} was already used for a different request")
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise IdempotencyError(409, f"A request with this {HEADER} is still in progress")
+            if pending is None:
+                # Held by another worker: poll the table.
+                await asyncio.sleep(min(self.poll_interval, remaining))
+            else:
+                try:
+                    await asyncio.wait_for(asyncio.shield(pending), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _resolve(self, key: bytes) -> None:
+        pending = self._inflight.pop(key, None)
+        if pending is not None and not pending.done():
+            pending.set_result(None)
+
+    async def finish(self, key: bytes, response: StoredResponse) -> None:
+        try:
+            await run_in_threadpool(self._save, key, response)
+        except Exception:
+            logger.exception("Storing an idempotent response failed")
+            await self.release(key)
+            return
+        self._cache.set(key, response)
+        self._resolve(key)
+
+    async def release(self, key: bytes) -> None:
+        try:
+            await run_in_threadpool(self._delete_claim, key)
+        except Exception:
+            # The claim lapses after lock_timeout anyway.
+            logger.exception("Releasing an idempotency key failed")
+        finally:
+            self._resolve(key)
+
+    def purge_expired(self, db: Session) -> int:
+        result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < UTC_NOW))
+        db.commit()
+        return result.rowcount
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+idempotency_store = IdempotencyStore(
+    SessionLocal,
+    ttl=settings.IDEMPOTENCY_KEY_TTL_SECONDS,
+    lock_timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS,
+    wait_timeout=settings.IDEMPOTENCY_WAIT_SECONDS,
+    cache_size=settings.IDEMPOTENCY_CACHE_SIZE,
+)
+
+
+def _route_path(scope: Scope) -> str:
+    path, root_path = scope["path"], scope.get("root_path", "")
+    return path[len(root_path):] if root_path and path.startswith(root_path) else path
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+class IdempotencyMiddleware:
+    """Applies ``store`` to POSTs to ``paths`` that carry the header;
+    everything else passes straight through."""
+
+    def __init__(self, app: ASGIApp, *, store: IdempotencyStore, paths: set[str]):
+        self.app = app
+        self.store = store
+        self.paths = paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or _route_path(scope) not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        client_key = headers.get(HEADER)
+        if client_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not client_key or len(client_key) > MAX_KEY_LENGTH:
+            response = JSONResponse(
+                {"detail": f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters"},
+                status_code=400,
+            )
+            await response(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        key = hashlib.sha256(
+            "\n".join((headers.get("authorization", ""), _route_path(scope), client_key)).encode()
+        ).digest()
+        fingerprint = hashlib.sha256(body).digest()
+        try:
+            stored = await self.store.begin(key, fingerprint)
+        except IdempotencyError as exc:
+            await JSONResponse({"detail": exc.detail}, status_code=exc.status_code)(scope, receive, send)
+            return
+        if stored is not None:
+            response = Response(
+                stored.body,
+                status_code=stored.status_code,
+                media_type=stored.content_type,
+                headers={"Idempotent-Replayed": "true"},
+            )
+            await response(scope, receive, send)
+            return
+
+        replayed = False
+
+        async def receive_body() -> Message:
+            nonlocal replayed
+            if replayed:
+                return await receive()
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        start: Message | None = None
+        chunks: list[bytes] = []
+
+        async def capture(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, capture)
+        except BaseException:
+            await self.store.release(key)
+            raise
+        if start is None or start["status"] >= 500 or start["status"] in RELEASED_STATUSES:
+            await self.store.release(key)
+            return
+        await self.store.finish(
+            key,
+            StoredResponse(
+                fingerprint=fingerprint,
+                status_code=start["status"],
+                content_type=Headers(raw=start["headers"]).get("content-type"),
+                body=b"".join(chunks),
+            ),
+        )
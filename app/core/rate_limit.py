@@ -0,0 +1,61 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets holding up to ``burst`` tokens, refilled at
+    ``rate`` tokens per second.
+
+    Buckets live in a bounded LRU table: once ``max_entries`` keys are
+    tracked the least recently seen one is evicted, which at worst hands that
+    key a fresh, full bucket.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float,
+        burst: int,
+        max_entries: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_entries = max_entries
+        self.clock = clock
+        self._buckets: OrderedDict[Hashable, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: Hashable) -> float:
+        """Take one token for ``key``.
+
+        Returns 0 on success, otherwise the seconds until a token is available.
+        """
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now]
+                if len(self._buckets) > self.max_entries:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                tokens, updated = bucket
+                bucket[0] = min(float(self.burst), tokens + (now - updated) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / self.rate
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+def retry_after_header(seconds: float) -> dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
@@ -0,0 +1,82 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationStore:
+    """In-memory mirror of ``revoked_tokens`` for O(1) refresh-token checks.
+
+    ``load`` reads every live row at startup and ``sync`` then only fetches
+    rows revoked since the last one seen (re-reading an ``overlap`` window to
+    catch transactions that committed late). The table stays authoritative:
+    ``revoke`` relies on its primary key, so a token revoked by another
+    process that has not been synced here yet still cannot be rotated twice.
+    """
+
+    def __init__(self, overlap: timedelta = timedelta(seconds=60)):
+        self.overlap = overlap
+        self._expires: dict[UUID, datetime] = {}
+        self._watermark: datetime | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def is_revoked(self, jti: UUID) -> bool:
+        return jti in self._expires
+
+    def _remember(self, rows) -> None:
+        with self._lock:
+            for jti, expires_at, revoked_at in rows:
+                self._expires[jti] = expires_at
+                if self._watermark is None or revoked_at > self._watermark:
+                    self._watermark = revoked_at
+
+    def load(self, db: Session) -> None:
+        with self._lock:
+            self._expires.clear()
+            self._watermark = None
+        self.sync(db)
+        logger.info("Loaded %s revoked refresh tokens", len(self))
+
+    def sync(self, db: Session) -> None:
+        query = select(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at)
+        if self._watermark is None:
+            query = query.where(RevokedToken.expires_at > datetime.utcnow())
+        else:
+            query = query.where(RevokedToken.revoked_at > self._watermark - self.overlap)
+        self._remember(db.execute(query).all())
+
+    def revoke(self, db: Session, jti: UUID, *, expires_at: datetime) -> bool:
+        """Record ``jti`` as revoked; False if it already was."""
+        inserted = db.execute(
+            insert(RevokedToken)
+            .values(jti=jti, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+            .returning(RevokedToken.revoked_at)
+        ).first()
+        db.commit()
+        with self._lock:
+            self._expires[jti] = expires_at
+        return inserted is not None
+
+    def purge_expired(self, db: Session) -> int:
+        now = datetime.utcnow()
+        result = db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+        db.commit()
+        with self._lock:
+            for jti in [jti for jti, expires_at in self._expires.items() if expires_at <= now]:
+                del self._expires[jti]
+        return result.rowcount
+
+
+revoked_tokens = RevocationStore()
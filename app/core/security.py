@@ -1,5 +1,8 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Iterable, Iterator
+from uuid import UUID, uuid4
 
 from jose import jwt, JWTError
 from passlib.context import CryptContext
@@ -15,13 +18,48 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+_hash_pool: ProcessPoolExecutor | None = None
+
+
+def hash_passwords(passwords: Iterable[str]) -> Iterator[str]:
+    """Hash ``passwords`` across a process pool, yielding in input order.
+
+    bcrypt is CPU-bound, so bulk imports scale with cores rather than with
+    one hash per request thread.
+    """
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS or None,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hash_pool.map(get_password_hash, passwords, chunksize=4)
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+# Verified against when the account does not exist, so an unknown email costs
+# the same bcrypt work as a wrong password and timing does not reveal it.
+DUMMY_PASSWORD_HASH = pwd_context.hash("dummy-password-for-timing")
+
+
+def dummy_verify(plain_password: str) -> None:
+    pwd_context.verify(plain_password, DUMMY_PASSWORD_HASH)
+
+
 def create_access_token(
     subject: str | Any,
     expires_delta: timedelta | None = None,
+    claims: dict[str, Any] | None = None,
 ) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -30,7 +68,7 @@ def create_access_token(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
 
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {**(claims or {}), "exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(
         to_encode,
         settings.SECRET_KEY,
@@ -38,10 +76,19 @@ def create_access_token(
     )
     return encoded_jwt
 
-def create_refresh_token(subject: str) -> str:
+def user_claims(user: Any) -> dict[str, Any]:
+    """Claims that let role checks skip loading the user; ``ver`` ties the
+    token to ``user.token_version`` so bumping it revokes the token."""
+    return {"role": user.role, "ver": user.token_version}
+
+
+def create_refresh_token(subject: str, claims: dict[str, Any] | None = None) -> str:
+    # A distinct type and a unique jti keep refresh tokens out of the access
+    # path and let each one be revoked once it has been rotated.
     return create_access_token(
         subject=subject,
         expires_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        claims={**(claims or {}), "type": "refresh", "jti": str(uuid4())},
     )
 
 
@@ -54,4 +101,20 @@ def decode_token(token: str) -> str:
         )
         return payload.get("sub")
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+
+def decode_refresh_token(token: str) -> dict | None:
+    try:
+        payload = jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM],
+        )
+        if payload.get("type") != "refresh":
+            return None
+        payload["sub"] = UUID(payload["sub"])
+        payload["jti"] = UUID(payload["jti"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        return None
+    return payload
@@ -0,0 +1,278 @@
+import io
+import threading
+from datetime import date, datetime, timedelta
+from typing import Literal
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.columnar import ColumnarStore
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.db.shards import close_shard_sessions, shard_map
+
+CohortPeriod = Literal["week", "month"]
+
+# Widest range served by ``hourly``, to bound the response size.
+MAX_HOURS = 24 * 92
+
+EPOCH = datetime(1970, 1, 1)
+# Postgres binary timestamps count microseconds from 2000-01-01.
+PG_EPOCH_OFFSET_US = 946_684_800_000_000
+HOUR_US = 3_600_000_000
+
+COLUMNS = {
+    "id": "S16",
+    # Index into the snapshot's ``courses`` list.
+    "course": "<i4",
+    "created_at": "<M8[us]",
+    "completed": "?",
+    "is_active": "?",
+}
+
+EXPORT_FIELDS = "id, course_id, created_at, updated_at, completed, is_active"
+EXPORT_QUERY = (
+    "COPY (SELECT {fields} FROM enrollments WHERE updated_at > %(since)s "
+    "UNION ALL SELECT {fields} FROM enrollments_archive WHERE updated_at > %(since)s) "
+    "TO STDOUT (FORMAT binary)"
+).format(fields=EXPORT_FIELDS)
+
+# One tuple of EXPORT_QUERY in COPY's binary format: a field count, then a
+# length and a big-endian value per field. None of the fields is nullable,
+# so every tuple has the same width and the whole body parses in one call.
+EXPORT_ROW = np.dtype([
+    ("fields", ">i2"),
+    ("id_length", ">i4"), ("id", "S16"),
+    ("course_length", ">i4"), ("course_id", "S16"),
+    ("created_length", ">i4"), ("created_at", ">i8"),
+    ("updated_length", ">i4"), ("updated_at", ">i8"),
+    ("completed_length", ">i4"), ("completed", "?"),
+    ("active_length", ">i4"), ("is_active", "?"),
+])
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\0"
+
+
+def parse_copy(data: bytes) -> np.ndarray:
+    """Rows of a binary COPY of EXPORT_QUERY, as an EXPORT_ROW array."""
+    if not data.startswith(COPY_SIGNATURE):
+        raise ValueError("Not a binary COPY stream")
+    header = len(COPY_SIGNATURE) + 8 + int.from_bytes(data[len(COPY_SIGNATURE) + 4:len(COPY_SIGNATURE) + 8], "big")
+    # The stream ends with a field count of -1.
+    body = memoryview(data)[header:-2]
+    if len(body) % EXPORT_ROW.itemsize:
+        raise ValueError("Unexpected COPY tuple layout")
+    return np.frombuffer(body, dtype=EXPORT_ROW)
+
+
+def _to_datetime(microseconds: int) -> datetime:
+    return EPOCH + timedelta(microseconds=int(microseconds))
+
+
+class EnrollmentSnapshot:
+    """A columnar copy of every enrollment, for vectorized analytics.
+
+    ``refresh`` exports the rows written since the last refresh with one
+    binary COPY per database and appends them to memory-mapped column
+    files; rows already in the snapshot (completions, deregistrations) are
+    patched in place. The watermark is ``updated_at``, which moves on every
+    change, minus ANALYTICS_OVERLAP_SECONDS for transactions that commit
+    late. Several processes can share one directory: refreshes take a file
+    lock, and a process only re-exports what another has not already.
+    Enrollments deleted outright stay in the snapshot until its directory
+    is removed.
+    """
+
+    def __init__(self, path: str):
+        self.store = ColumnarStore(path, COLUMNS)
+        # (rows, ids in sorted order, their row numbers) for patching.
+        self._index: tuple[int, np.ndarray, np.ndarray] | None = None
+        self._lock = threading.Lock()
+
+    def _sorted_ids(self, ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        if self._index is None or self._index[0] != len(ids):
+            order = np.argsort(ids, kind="stable")
+            self._index = (len(ids), ids[order], order)
+        return self._index[1], self._index[2]
+
+    def _export(self, session: Session, since: int | None) -> np.ndarray:
+        cursor = session.connection().connection.cursor()
+        try:
+            watermark = EPOCH if since is None else _to_datetime(since - settings.ANALYTICS_OVERLAP_SECONDS * 1_000_000)
+            buffer = io.BytesIO()
+            cursor.copy_expert(cursor.mogrify(EXPORT_QUERY, {"since": watermark}).decode(), buffer)
+        finally:
+            cursor.close()
+        return parse_copy(buffer.getvalue())
+
+    def refresh(self, db: Session) -> int:
+        """Bring the snapshot up to date; returns how many rows were added."""
+        with self._lock, self.store.lock():
+            arrays, state = self.store.read()
+            courses = list(state.get("courses", []))
+            watermarks = dict(state.get("watermarks", {}))
+
+            batches = []
+            for index, session in enumerate(shard_map.all_sessions(db)):
+                batch = self._export(session, watermarks.get(str(index)))
+                if len(batch):
+                    watermarks[str(index)] = int(batch["updated_at"].max()) + PG_EPOCH_OFFSET_US
+                    batches.append(batch)
+            batch = np.concatenate(batches) if batches else np.empty(0, dtype=EXPORT_ROW)
+
+            # An id seen twice (mid-archive, or overlapping exports) keeps its latest version.
+            latest = np.argsort(-batch["updated_at"], kind="stable")
+            _, first = np.unique(batch["id"][latest], return_index=True)
+            batch = batch[latest[first]]
+
+            codes = {bytes.fromhex(course): code for code, course in enumerate(courses)}
+            unique_courses, course_index = np.unique(batch["course_id"], return_inverse=True)
+            for course in unique_courses:
+                course = course.ljust(16, b"\0")
+                if course not in codes:
+                    codes[course] = len(courses)
+                    courses.append(course.hex())
+            course_codes = np.array(
+                [codes[course.ljust(16, b"\0")] for course in unique_courses], dtype=np.int32
+            )[course_index]
+
+            sorted_ids, order = self._sorted_ids(arrays["id"])
+            position = np.searchsorted(sorted_ids, batch["id"])
+            found = np.zeros(len(batch), dtype=bool)
+            if len(sorted_ids):
+                found = sorted_ids[np.minimum(position, len(sorted_ids) - 1)] == batch["id"]
+            rows = order[position[found]]
+            for name in ("completed", "is_active"):
+                self.store.update(name, rows, batch[name][found])
+
+            added = batch[~found]
+            start = len(arrays["id"])
+            total = self.store.append(
+                {
+                    "id": added["id"],
+                    "course": course_codes[~found],
+                    "created_at": (added["created_at"] + PG_EPOCH_OFFSET_US).astype("<M8[us]"),
+                    "completed": added["completed"],
+                    "is_active": added["is_active"],
+                },
+                {
+                    "courses": courses,
+                    "watermarks": watermarks,
+                    "refreshed_at": datetime.utcnow().isoformat(),
+                },
+            )
+
+            # Extend the index rather than sorting every row again.
+            slots = np.searchsorted(sorted_ids, added["id"])
+            new_order = np.argsort(added["id"], kind="stable")
+            self._index = (
+                total,
+                np.insert(sorted_ids, slots[new_order], added["id"][new_order]),
+                np.insert(order, slots[new_order], np.arange(start, total)[new_order]),
+            )
+            return len(added)
+
+    def _read(self) -> tuple[dict[str, np.ndarray], list[str], datetime | None]:
+        arrays, state = self.store.read()
+        refreshed_at = state.get("refreshed_at")
+        return arrays, state.get("courses", []), datetime.fromisoformat(refreshed_at) if refreshed_at else None
+
+    def as_of(self) -> datetime | None:
+        return self._read()[2]
+
+    @staticmethod
+    def _course_mask(arrays: dict[str, np.ndarray], courses: list[str], course_id: UUID | None):
+        if course_id is None:
+            return None
+        try:
+            return arrays["course"] == courses.index(course_id.hex)
+        except ValueError:
+            return np.zeros(len(arrays["course"]), dtype=bool)
+
+    def hourly(self, start: datetime, end: datetime, course_id: UUID | None = None) -> list[dict]:
+        """Enrollments created in each hour from ``start`` (rounded down)
+        to ``end``, including hours without any."""
+        arrays, courses, _ = self._read()
+        first = np.datetime64(start.replace(minute=0, second=0, microsecond=0), "us")
+        hours = -(-(np.datetime64(end, "us") - first).astype(np.int64) // HOUR_US)
+        created = arrays["created_at"]
+        mask = (created >= first) & (created < first + np.timedelta64(hours * HOUR_US, "us"))
+        course_mask = self._course_mask(arrays, courses, course_id)
+        if course_mask is not None:
+            mask &= course_mask
+        counts = np.bincount(
+            (created[mask] - first).astype(np.int64) // HOUR_US, minlength=max(hours, 0)
+        )
+        base = first.astype(datetime)
+        return [
+            {"hour": base + timedelta(hours=hour), "count": int(count)}
+            for hour, count in enumerate(counts)
+        ]
+
+    def time_to_fill(self, capacities: dict[UUID, int]) -> list[dict]:
+        """Per course, when the first enrollment was created and when the
+        ``capacity``-th one was, i.e. how long sign-ups took to reach
+        capacity. Deregistrations are not subtracted."""
+        arrays, courses, _ = self._read()
+        order = np.lexsort((arrays["created_at"], arrays["course"]))
+        course = arrays["course"][order]
+        created = arrays["created_at"][order]
+        codes, starts, counts = np.unique(course, return_index=True, return_counts=True)
+        groups = {courses[code]: (start, count) for code, start, count in zip(codes, starts, counts)}
+
+        items = []
+        for course_id, capacity in capacities.items():
+            start, count = groups.get(course_id.hex, (0, 0))
+            first = created[start].astype(datetime) if count else None
+            filled = created[start + capacity - 1].astype(datetime) if 0 < capacity <= count else None
+            items.append({
+                "course_id": course_id,
+                "capacity": capacity,
+                "enrollment_count": int(count),
+                "first_enrollment_at": first,
+                "filled_at": filled,
+                "seconds_to_fill": (filled - first).total_seconds() if filled else None,
+            })
+        return items
+
+    def completion_cohorts(self, period: CohortPeriod, course_id: UUID | None = None) -> list[dict]:
+        """Enrollments grouped by the week (from Monday) or month they were
+        created in, with how many of each cohort are active and completed."""
+        arrays, courses, _ = self._read()
+        created, completed, active = arrays["created_at"], arrays["completed"], arrays["is_active"]
+        course_mask = self._course_mask(arrays, courses, course_id)
+        if course_mask is not None:
+            created, completed, active = created[course_mask], completed[course_mask], active[course_mask]
+
+        if period == "month":
+            starts = created.astype("M8[M]").astype("M8[D]")
+        else:
+            days = created.astype("M8[D]").astype(np.int64)
+            # 1970-01-01 was a Thursday.
+            starts = (days - (days + 3) % 7).astype("M8[D]")
+        cohorts, cohort = np.unique(starts, return_inverse=True)
+        enrolled = np.bincount(cohort, minlength=len(cohorts))
+        completed_counts = np.bincount(cohort, weights=completed, minlength=len(cohorts))
+        active_counts = np.bincount(cohort, weights=active, minlength=len(cohorts))
+        return [
+            {
+                "cohort": cohorts[n].astype(date),
+                "enrollment_count": int(enrolled[n]),
+                "active_count": int(active_counts[n]),
+                "completed_count": int(completed_counts[n]),
+                "completion_rate": float(completed_counts[n] / enrolled[n]),
+            }
+            for n in range(len(cohorts))
+        ]
+
+
+enrollment_snapshot = EnrollmentSnapshot(settings.ANALYTICS_SNAPSHOT_DIR)
+
+
+def refresh_enrollment_snapshot() -> None:
+    db = SessionLocal()
+    try:
+        enrollment_snapshot.refresh(db)
+    finally:
+        close_shard_sessions(db)
+        db.close()
@@ -0,0 +1,173 @@
+import threading
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from app.core import events
+from app.core.availability import AvailabilityBroadcaster
+from app.core.config import settings
+from app.crud.enrollment import enrollment_crud
+from app.db.session import SessionLocal
+from app.db.shards import close_shard_sessions
+from app.models.course import Course
+from app.schemas.course import CourseAvailability
+
+
+def load_availability(db: Session, course_ids: list[UUID] | None = None) -> dict[UUID, CourseAvailability]:
+    """Seat counts for ``course_ids`` (or every course): one course query
+    and one grouped count."""
+    query = db.query(Course.id, Course.capacity, Course.is_active)
+    if course_ids is not None:
+        query = query.filter(Course.id.in_(course_ids))
+    courses = query.all()
+    counts = enrollment_crud.active_counts(db, None if course_ids is None else [course.id for course in courses])
+    return {
+        course.id: CourseAvailability(
+            course_id=course.id,
+            capacity=course.capacity,
+            enrolled=counts.get(course.id, 0),
+            available=max(course.capacity - counts.get(course.id, 0), 0),
+            is_active=course.is_active,
+        )
+        for course in courses
+    }
+
+
+class SeatCounters:
+    """In-process seat availability per course.
+
+    ``reconcile`` seeds the table with one grouped count and is re-run
+    periodically; in between, enrollment events adjust the counts in place
+    and course changes drop their entry so it is re-read on next use. Reads
+    of warm entries touch no database.
+
+    Writes made by other processes only show up at the next ``reconcile``.
+    An entry adjusted while a reconcile is running keeps its local value, and
+    any drift left by such a race is fixed on the following pass.
+    """
+
+    def __init__(self):
+        self._seats: dict[UUID, CourseAvailability] = {}
+        self._touched: dict[UUID, int] = {}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._seats)
+
+    def get_many(self, db: Session, course_ids: list[UUID]) -> dict[UUID, CourseAvailability]:
+        """Snapshots for ``course_ids``; misses cost one load. Unknown ids
+        are left out."""
+        found = {}
+        misses = []
+        for course_id in course_ids:
+            seats = self._seats.get(course_id)
+            if seats is None:
+                misses.append(course_id)
+            else:
+                found[course_id] = seats
+        if misses:
+            loaded = load_availability(db, misses)
+            with self._lock:
+                for course_id, seats in loaded.items():
+                    found[course_id] = self._seats.setdefault(course_id, seats)
+        return found
+
+    def _touch(self, course_id: UUID) -> None:
+        self._version += 1
+        self._touched[course_id] = self._version
+
+    def apply(self, course_id: UUID, delta: int) -> None:
+        self.apply_many({course_id: delta})
+
+    def apply_many(self, deltas: dict[UUID, int]) -> None:
+        with self._lock:
+            for course_id, delta in deltas.items():
+                seats = self._seats.get(course_id)
+                if seats is None or not delta:
+                    continue
+                enrolled = max(seats.enrolled + delta, 0)
+                self._seats[course_id] = seats.model_copy(
+                    update={"enrolled": enrolled, "available": max(seats.capacity - enrolled, 0)}
+                )
+                self._touch(course_id)
+
+    def forget(self, course_id: UUID) -> None:
+        with self._lock:
+            self._seats.pop(course_id, None)
+            self._touch(course_id)
+
+    def reconcile(self, db: Session) -> list[UUID]:
+        """Replace the table with fresh counts; returns the courses whose
+        availability changed."""
+        with self._lock:
+            started = self._version
+        fresh = load_availability(db)
+        with self._lock:
+            skipped = {course_id for course_id, version in self._touched.items() if version > started}
+            changed = [
+                course_id
+                for course_id, seats in fresh.items()
+                if course_id not in skipped and self._seats.get(course_id) != seats
+            ]
+            seats = {course_id: seats for course_id, seats in fresh.items() if course_id not in skipped}
+            seats.update((course_id, self._seats[course_id]) for course_id in skipped if course_id in self._seats)
+            self._seats = seats
+            self._touched = {course_id: self._touched[course_id] for course_id in skipped}
+        return changed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._seats.clear()
+            self._touched.clear()
+
+
+seat_counters = SeatCounters()
+
+
+def _stream_snapshots(course_ids: list[UUID]) -> dict[UUID, CourseAvailability]:
+    db = SessionLocal()
+    try:
+        return seat_counters.get_many(db, course_ids)
+    finally:
+        close_shard_sessions(db)
+        db.close()
+
+
+availability = AvailabilityBroadcaster(
+    _stream_snapshots,
+    max_rate=settings.AVAILABILITY_MAX_EVENTS_PER_SECOND,
+    heartbeat=settings.AVAILABILITY_HEARTBEAT_SECONDS,
+    refresh_interval=settings.AVAILABILITY_REFRESH_SECONDS,
+)
+
+
+def reconcile_seats() -> None:
+    db = SessionLocal()
+    try:
+        changed = seat_counters.reconcile(db)
+    finally:
+        close_shard_sessions(db)
+        db.close()
+    for course_id in changed:
+        availability.notify(course_id)
+
+
+@events.subscribe(events.ENROLLMENT_CHANGED)
+def _enrollment_changed(*, course_id: UUID, delta: int = 0, **_) -> None:
+    seat_counters.apply(course_id, delta)
+    availability.notify(course_id)
+
+
+@events.subscribe(events.ENROLLMENTS_CHANGED)
+def _enrollments_changed(*, deltas: dict[UUID, int], **_) -> None:
+    seat_counters.apply_many(deltas)
+    for course_id, delta in deltas.items():
+        if delta:
+            availability.notify(course_id)
+
+
+@events.subscribe(events.COURSE_CHANGED)
+def _course_changed(*, course_id: UUID, **_) -> None:
+    seat_counters.forget(course_id)
+    availability.notify(course_id)
@@ -1,6 +1,7 @@
-from typing import Generic, TypeVar, Type, Optional, Any
+from itertools import islice
+from typing import Generic, Iterable, Iterator, TypeVar, Type, Optional, Any
 from uuid import UUID
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
 from pydantic import BaseModel
 
 from app import db
@@ -10,6 +11,12 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         self.model = model
@@ -17,9 +24,27 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def get(self, db: Session, id: UUID) -> Optional[ModelType]:
         return db.query(self.model).filter(self.model.id == id).first()
 
-    def get_multi(self, db: Session, *, skip: int = 0, limit: int = 10):
+    def get_many(self, db: Session, ids: list[UUID]) -> list[ModelType]:
+        if not ids:
+            return []
+        return db.query(self.model).filter(self.model.id.in_(ids)).all()
+
+    def _load_only(self, fields: tuple[str, ...] | None) -> list:
+        if not fields:
+            return []
+        return [load_only(*(getattr(self.model, name) for name in fields))]
+
+    def get_multi(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 10,
+        fields: tuple[str, ...] | None = None,
+    ):
         return (
             db.query(self.model)
+            .options(*self._load_only(fields))
             .offset(skip)
             .limit(limit)
             .all()
@@ -0,0 +1,48 @@
+import base64
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.shards import shard_map
+from app.models.course import Course
+from app.models.enrollment import Enrollment
+
+Cursor = tuple[datetime, UUID]
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    updated_at, id = cursor
+    return base64.urlsafe_b64encode(f"{updated_at.isoformat()}|{id}".encode()).decode()
+
+
+def decode_cursor(value: str) -> Cursor:
+    """Raises ValueError for anything ``encode_cursor`` did not produce."""
+    updated_at, id = base64.urlsafe_b64decode(value.encode()).decode().split("|")
+    return datetime.fromisoformat(updated_at), UUID(id)
+
+
+def _changed_since(session: Session, model, after: Cursor | None, limit: int) -> list:
+    horizon = func.timezone("utc", func.clock_timestamp()) - timedelta(
+        seconds=settings.CHANGE_FEED_SAFETY_SECONDS
+    )
+    query = session.query(model).filter(model.updated_at <= horizon)
+    if after:
+        query = query.filter(tuple_(model.updated_at, model.id) > tuple_(*after))
+    return query.order_by(model.updated_at, model.id).limit(limit).all()
+
+
+def get_changes(db: Session, *, after: Cursor | None, limit: int) -> tuple[list, bool]:
+    """Courses and enrollments modified after ``after``, oldest first.
+
+    Every source is read with the same (updated_at, id) keyset, so a page
+    costs one indexed range scan per source regardless of table size.
+    Returns up to ``limit`` rows and whether more are waiting.
+    """
+    rows = _changed_since(db, Course, after, limit + 1)
+    for session in shard_map.all_sessions(db):
+        rows += _changed_since(session, Enrollment, after, limit + 1)
+    rows.sort(key=lambda row: (row.updated_at, row.id))
+    return rows[:limit], len(rows) > limit
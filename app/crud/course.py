@@ -1,7 +1,22 @@
+from typing import Any, Iterator
+from uuid import UUID
+from pydantic import ValidationError
+from sqlalchemy import Row, String, any_, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert
 from sqlalchemy.orm import Session
-from app.crud.base import CRUDBase
+from app.core import events
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.crud.base import CRUDBase, batched
 from app.models.course import Course
-from app.schemas.course import CourseCreate, CourseUpdate
+from app.schemas.course import CourseCreate, CourseUpdate, CourseRead
+
+
+# Read-only snapshots for batch lookups; writes below drop their entry.
+course_cache = TTLCache(
+    ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+    max_entries=settings.CATALOG_CACHE_SIZE,
+)
 
 
 class CRUDCourse(CRUDBase[Course, CourseCreate, CourseUpdate]):
@@ -22,6 +37,7 @@ class CRUDCourse(CRUDBase[Course, CourseCreate, CourseUpdate]):
         return (
             db.query(Course)
             .filter(Course.is_active == True)
+            .order_by(Course.code)
             .offset(skip)
             .limit(limit)
             .all()
@@ -30,6 +46,166 @@ class CRUDCourse(CRUDBase[Course, CourseCreate, CourseUpdate]):
     def get_by_code(self, db: Session, code: str):
         return db.query(Course).filter(Course.code == code).first()
 
+    def get_existing_codes(self, db: Session, codes: list[str]) -> set[str]:
+        return set(
+            db.execute(
+                select(Course.code).where(Course.code == any_(literal(codes, ARRAY(String))))
+            ).scalars()
+        )
+
+    def create_many(
+        self,
+        db: Session,
+        *,
+        rows: list[dict[str, Any]],
+        batch_size: int = settings.BULK_BATCH_SIZE,
+    ) -> Iterator[dict[str, Any]]:
+        """Import ``rows`` of CourseCreate fields, yielding one result per row.
+
+        Invalid rows and codes that are repeated or already taken are
+        reported up front, with one query for the taken codes; the rest are
+        inserted in multi-row batches, one commit per batch.
+        """
+        valid: list[tuple[int, CourseCreate]] = []
+        seen: set[str] = set()
+        for index, row in enumerate(rows):
+            try:
+                course_in = CourseCreate.model_validate(row)
+            except ValidationError as exc:
+                errors = "; ".join(
+                    f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors()
+                )
+                yield {"row": index, "code": row.get("code"), "status": "error", "detail": errors}
+                continue
+            if course_in.code in seen:
+                yield {"row": index, "code": course_in.code, "status": "error", "detail": "Duplicate code in import"}
+                continue
+            seen.add(course_in.code)
+            valid.append((index, course_in))
+
+        existing = self.get_existing_codes(db, [course_in.code for _, course_in in valid]) if valid else set()
+        pending = []
+        for index, course_in in valid:
+            if course_in.code in existing:
+                yield {"row": index, "code": course_in.code, "status": "error", "detail": "Code already exists"}
+            else:
+                pending.append((index, course_in))
+
+        statement = (
+            insert(Course)
+            .on_conflict_do_nothing(index_elements=[Course.code])
+            .returning(Course.id, Course.code)
+        )
+        for batch in batched(pending, batch_size):
+            values = [course_in.model_dump() for _, course_in in batch]
+            created = {row.code: row.id for row in db.execute(statement, values)}
+            db.commit()
+            for index, course_in in batch:
+                if course_in.code in created:
+                    yield {"row": index, "code": course_in.code, "status": "created", "id": str(created[course_in.code])}
+                else:
+                    # Taken by someone else since the existence check.
+                    yield {"row": index, "code": course_in.code, "status": "error", "detail": "Code already exists"}
+
+    def get_many_read(self, db: Session, ids: list[UUID]) -> dict[UUID, CourseRead]:
+        """Snapshots for ``ids``, from the cache where warm and one IN query
+        for the rest. Unknown ids are left out."""
+        found = {}
+        misses = []
+        for course_id in ids:
+            cached = course_cache.get(course_id)
+            if cached is None:
+                misses.append(course_id)
+            else:
+                found[course_id] = cached
+        for course in self.get_many(db, misses):
+            snapshot = CourseRead.model_validate(course)
+            course_cache.set(course.id, snapshot)
+            found[course.id] = snapshot
+        return found
+
+    def update(self, db: Session, *, db_obj: Course, obj_in: CourseUpdate) -> Course:
+        course = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        self.changed(course.id)
+        return course
+
+    def update_status(self, db: Session, *, course: Course, is_active: bool) -> Course:
+        course.is_active = is_active
+        db.commit()
+        self.changed(course.id)
+        db.refresh(course)
+        return course
+
+    def changed(self, course_id: UUID) -> None:
+        """Announce a committed change to the course."""
+        course_cache.pop(course_id)
+        events.publish(events.COURSE_CHANGED, course_id=course_id)
+
+    def update_status_many(
+        self,
+        db: Session,
+        *,
+        is_active: bool,
+        ids: list[UUID] | None = None,
+        codes: list[str] | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Set ``is_active`` on the courses matching ``ids`` or ``codes`` with
+        one UPDATE, yielding one result per requested id and code: ``updated``,
+        ``unchanged`` or ``not_found``."""
+        changed = self.set_status_many(db, is_active=is_active, ids=ids, codes=codes)
+        db.commit()
+        for course in changed:
+            self.changed(course.id)
+        return self.status_results(db, changed, ids=ids, codes=codes)
+
+    def set_status_many(
+        self,
+        db: Session,
+        *,
+        is_active: bool,
+        ids: list[UUID] | None = None,
+        codes: list[str] | None = None,
+    ) -> list[Row]:
+        """The UPDATE of ``update_status_many``, uncommitted; returns the
+        (id, code) of the courses it changed."""
+        return db.execute(
+            update(Course)
+            .where(self._matching(ids, codes), Course.is_active.is_distinct_from(is_active))
+            .values(is_active=is_active)
+            .returning(Course.id, Course.code)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+    def _matching(self, ids: list[UUID] | None, codes: list[str] | None):
+        return or_(
+            Course.id == any_(literal(list(ids or []), ARRAY(PG_UUID(as_uuid=True)))),
+            Course.code == any_(literal(list(codes or []), ARRAY(String))),
+        )
+
+    def status_results(
+        self,
+        db: Session,
+        changed: list[Row],
+        *,
+        ids: list[UUID] | None = None,
+        codes: list[str] | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        ids, codes = list(dict.fromkeys(ids or [])), list(dict.fromkeys(codes or []))
+        found = {}
+        if len(changed) < len(ids) + len(codes):
+            # Only to tell unchanged courses from unknown ones.
+            found = {
+                course.id: course
+                for course in db.execute(select(Course.id, Course.code).where(self._matching(ids, codes)))
+            }
+        by_id = {course.id: "updated" for course in changed}
+        by_id.update((course_id, "unchanged") for course_id in found if course_id not in by_id)
+        by_code = {course.code: by_id[course.id] for course in [*changed, *found.values()]}
+        for course_id in ids:
+            yield {"id": str(course_id), "status": by_id.get(course_id, "not_found")}
+        for code in codes:
+            yield {"code": code, "status": by_code.get(code, "not_found")}
+
 
 crud_course = CRUDCourse(Course)
 
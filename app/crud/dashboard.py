@@ -0,0 +1,63 @@
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from app.core import events
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.crud.enrollment import enrollment_crud
+from app.crud.user import crud_user
+from app.schemas.dashboard import Dashboard, DashboardEnrollment
+from app.schemas.user import UserRead
+
+dashboard_cache = TTLCache(
+    ttl=settings.DASHBOARD_CACHE_TTL_SECONDS,
+    max_entries=settings.CATALOG_CACHE_SIZE,
+)
+
+
+@events.subscribe(events.ENROLLMENT_CHANGED)
+@events.subscribe(events.USER_CHANGED)
+def _invalidate_dashboard(*, user_id: UUID, **_) -> None:
+    dashboard_cache.pop(user_id)
+
+
+@events.subscribe(events.ENROLLMENTS_CHANGED)
+def _invalidate_dashboards(*, user_ids: set[UUID], **_) -> None:
+    for user_id in user_ids:
+        dashboard_cache.pop(user_id)
+
+
+def get_dashboard(db: Session, user_id: UUID) -> Dashboard | None:
+    """Profile, active enrollments with their courses and seat counts.
+
+    A cold build costs four queries however many enrollments the user has:
+    the user, their enrollments, the courses (selectin) and one grouped
+    seat count.
+    """
+    dashboard = dashboard_cache.get(user_id)
+    if dashboard is not None:
+        return dashboard
+
+    user = crud_user.get(db, id=user_id)
+    if not user:
+        return None
+
+    enrollments = enrollment_crud.get_by_user(
+        db,
+        user_id=user_id,
+        active_only=True,
+        expand=frozenset({"course"}),
+    )
+    seats = enrollment_crud.active_counts(db, list({e.course_id for e in enrollments}))
+    for enrollment in enrollments:
+        enrollment.seats_taken = seats[enrollment.course_id]
+        capacity = enrollment.expanded_course.capacity if enrollment.expanded_course else 0
+        enrollment.seats_available = max(capacity - enrollment.seats_taken, 0)
+
+    dashboard = Dashboard(
+        profile=UserRead.model_validate(user),
+        enrollments=[DashboardEnrollment.model_validate(e) for e in enrollments],
+    )
+    dashboard_cache.set(user_id, dashboard)
+    return dashboard
@@ -1,18 +1,56 @@
-from sqlalchemy.orm import Session
+from hashlib import blake2b
+from sqlalchemy.orm import Session, selectinload
 from fastapi import HTTPException, status
-from sqlalchemy import func
+from sqlalchemy import any_, func, inspect, literal, text, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.exc import IntegrityError
 from app import db
 from app.crud import course, user
-from app.models.enrollment import Enrollment
+from app.crud.course import crud_course
+from app.crud.user import crud_user
+from app.models.enrollment import Enrollment, EnrollmentArchive
 from app.models.course import Course
 from app.models.user import User
+from app.models.waitlist import CourseWaitlist, WaitlistEntry
 from app.schemas import enrollment
+from app.schemas.course import CourseUpdate
 from app.schemas.enrollment import EnrollmentCreate, EnrollmentUpdate
-from app.crud.base import CRUDBase
+from app.crud.base import CRUDBase, batched
+from app.db.shards import shard_map
+from app.core import events
+from app.core.admission import AdmissionQueue
+from app.core.config import settings
+from app.core.group_commit import GroupCommitter
+from typing import Any, Iterator
 from uuid import UUID
 
 
+def pair_lock_key(user_id: UUID, course_id: UUID) -> int:
+    """Advisory lock key for enrolling ``user_id`` in ``course_id``."""
+    return int.from_bytes(blake2b(user_id.bytes + course_id.bytes, digest_size=8).digest(), "big", signed=True)
+
+
+# Array order, so callers pass the keys sorted.
+LOCK_PAIRS_SQL = text("SELECT pg_advisory_xact_lock(key) FROM unnest(CAST(:keys AS bigint[])) AS key")
+
+
 class CRUDEnrollment(CRUDBase[Enrollment, EnrollmentCreate, EnrollmentUpdate]):
+    # Enrollments may live on shard databases keyed by user_id (see
+    # app.db.shards); courses and users always stay on the primary `db`.
+    def _session_for_user(self, db: Session, user_id: UUID) -> Session:
+        return shard_map.session_for_user(db, user_id)
+
+    def _all_sessions(self, db: Session) -> list[Session]:
+        return shard_map.all_sessions(db)
+
+    def get(self, db: Session, id: UUID) -> Enrollment | EnrollmentArchive | None:
+        for model in (Enrollment, EnrollmentArchive):
+            for session in self._all_sessions(db):
+                enrollment = session.query(model).filter(model.id == id).first()
+                if enrollment:
+                    return enrollment
+        return None
+
     def enroll(
         self,
         db: Session,
@@ -20,9 +58,12 @@ class CRUDEnrollment(CRUDBase[Enrollment, EnrollmentCreate, EnrollmentUpdate]):
         user_id: UUID,
         course_id: UUID,
     ) -> Enrollment:
+        shard = self._session_for_user(db, user_id)
+        self._lock_pairs(shard, [(user_id, course_id)])
+
         # 1. Check for any existing enrollment (Active or Inactive)
         enrollment = (
-            db.query(Enrollment)
+            shard.query(Enrollment)
             .filter(
                 Enrollment.user_id == user_id,
                 Enrollment.course_id == course_id,
@@ -53,73 +94,785 @@ class CRUDEnrollment(CRUDBase[Enrollment, EnrollmentCreate, EnrollmentUpdate]):
             # Reactivate the existing record instead of creating a new one
             enrollment.is_active = True
             enrollment.completed = False  # Reset progress if needed
-            db.commit()
-            db.refresh(enrollment)
+            enrollment.course_suspended = enrollment.user_suspended = False
+            enrollment.reactivation_count += 1
+            shard.commit()
+            events.publish(events.ENROLLMENT_CHANGED, user_id=user_id, course_id=course_id, delta=1)
+            shard.refresh(enrollment)
             return enrollment
 
-        # 5. Create new enrollment if no record exists at all
-        enrollment = Enrollment(
-            user_id=user_id,
-            course_id=course_id,
-            is_active=True
+        # 5. Restore an archived record, or create a new enrollment if no
+        # record exists at all
+        archived = (
+            shard.query(EnrollmentArchive)
+            .filter(
+                EnrollmentArchive.user_id == user_id,
+                EnrollmentArchive.course_id == course_id,
+            )
+            .first()
         )
-        db.add(enrollment)
-        db.commit()
-        db.refresh(enrollment)
+        if archived:
+            enrollment = Enrollment(
+                id=archived.id,
+                user_id=user_id,
+                course_id=course_id,
+                created_at=archived.created_at,
+                is_active=True,
+                reactivation_count=archived.reactivation_count + 1,
+            )
+            shard.delete(archived)
+        else:
+            enrollment = Enrollment(
+                user_id=user_id,
+                course_id=course_id,
+                is_active=True
+            )
+        shard.add(enrollment)
+        try:
+            shard.commit()
+        except IntegrityError as exc:
+            shard.rollback()
+            if "user_id_course_id" not in str(exc.orig):
+                raise
+            # A concurrent request enrolled the same user first.
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User already enrolled in this course",
+            )
+        events.publish(events.ENROLLMENT_CHANGED, user_id=user_id, course_id=course_id, delta=1)
+        shard.refresh(enrollment)
         return enrollment
     
-    def get_by_user(self, db: Session, *, user_id: UUID, skip: int = 0, limit: int = 100) -> list[Enrollment]:
-        return (
-            db.query(Enrollment)
+    def enroll_many(
+        self,
+        db: Session,
+        requests: list[tuple[UUID, UUID]],
+    ) -> list[Enrollment | HTTPException]:
+        """Enroll many (user_id, course_id) pairs with one commit per shard.
+
+        Each pair gets the enrollment or the HTTPException that ``enroll``
+        would have produced had the pairs arrived one after another. Courses,
+        seat counts and existing records are read with one query each.
+        """
+        results: list[Enrollment | HTTPException | None] = [None] * len(requests)
+        courses = {
+            course.id: course
+            for course in db.query(Course).filter(Course.id.in_({course_id for _, course_id in requests}))
+        }
+        enrolled = self.active_counts(db, list(courses))
+
+        by_shard: dict[int, tuple[Session, list[int]]] = {}
+        for index, (user_id, _) in enumerate(requests):
+            shard = self._session_for_user(db, user_id)
+            by_shard.setdefault(id(shard), (shard, []))[1].append(index)
+        for shard, indexes in by_shard.values():
+            self._enroll_on_shard(db, shard, requests, indexes, courses, enrolled, results)
+        return results
+
+    def _lock_pairs(self, shard: Session, pairs: list[tuple[UUID, UUID]]) -> None:
+        """Serialize enrolling each (user_id, course_id) pair until commit.
+
+        The unique index on the pair only holds within a partition, and an
+        enrollment restored from the archive keeps its old ``created_at``,
+        so it lands in an old partition where a concurrent fresh insert
+        would not collide with it. Everything that inserts an enrollment
+        takes these transaction-scoped advisory locks before looking for
+        existing records, in key order so that batches cannot deadlock.
+        """
+        keys = sorted({pair_lock_key(*pair) for pair in pairs})
+        shard.execute(LOCK_PAIRS_SQL, {"keys": keys})
+
+    def _records_for(self, shard: Session, pairs: list[tuple[UUID, UUID]]) -> tuple[dict, dict]:
+        """Live and archived records for (user_id, course_id) ``pairs``."""
+        existing = {
+            (enrollment.user_id, enrollment.course_id): enrollment
+            for enrollment in shard.query(Enrollment).filter(
+                tuple_(Enrollment.user_id, Enrollment.course_id).in_(pairs)
+            )
+        }
+        archived = {
+            (record.user_id, record.course_id): record
+            for record in shard.query(EnrollmentArchive).filter(
+                tuple_(EnrollmentArchive.user_id, EnrollmentArchive.course_id).in_(pairs)
+            )
+        }
+        return existing, archived
+
+    def _activate(self, shard: Session, pair: tuple[UUID, UUID], existing: dict, archived: dict) -> Enrollment:
+        """Reactivate, restore or create the enrollment for ``pair``, which
+        must not be active already. Nothing is committed."""
+        enrollment = existing.get(pair)
+        if enrollment is not None:
+            enrollment.is_active = True
+            enrollment.completed = False
+            enrollment.course_suspended = enrollment.user_suspended = False
+            enrollment.reactivation_count += 1
+            return enrollment
+        user_id, course_id = pair
+        record = archived.pop(pair, None)
+        enrollment = Enrollment(user_id=user_id, course_id=course_id, is_active=True)
+        if record is not None:
+            enrollment.id = record.id
+            enrollment.created_at = record.created_at
+            enrollment.reactivation_count = record.reactivation_count + 1
+            shard.delete(record)
+        shard.add(enrollment)
+        existing[pair] = enrollment
+        return enrollment
+
+    def _enroll_on_shard(self, db, shard, requests, indexes, courses, enrolled, results) -> None:
+        pairs = [requests[index] for index in indexes]
+        self._lock_pairs(shard, pairs)
+        existing, archived = self._records_for(shard, pairs)
+
+        written: list[tuple[int, Enrollment]] = []
+        for index in indexes:
+            user_id, course_id = pair = requests[index]
+            course = courses.get(course_id)
+            if not course:
+                results[index] = HTTPException(status_code=404, detail="Course not found")
+                continue
+            if not course.is_active:
+                results[index] = HTTPException(status_code=400, detail="Course is inactive")
+                continue
+            if enrolled[course_id] >= course.capacity:
+                results[index] = HTTPException(status_code=400, detail="Course is full")
+                continue
+
+            if pair in existing and existing[pair].is_active:
+                results[index] = HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="User already enrolled in this course",
+                )
+                continue
+            enrollment = self._activate(shard, pair, existing, archived)
+            enrolled[course_id] += 1
+            written.append((index, enrollment))
+
+        if not written:
+            return
+        try:
+            shard.flush()
+            ids = [enrollment.id for _, enrollment in written]
+            shard.commit()
+        except IntegrityError as exc:
+            shard.rollback()
+            if "user_id_course_id" not in str(exc.orig):
+                raise
+            # A request outside this batch enrolled one of the pairs first;
+            # settle each pair on its own.
+            for index, _ in written:
+                user_id, course_id = requests[index]
+                try:
+                    results[index] = self.enroll(db, user_id=user_id, course_id=course_id)
+                except HTTPException as error:
+                    results[index] = error
+            return
+
+        # One query reloads the committed rows (server defaults included),
+        # and detaching them lets other threads serialize their results.
+        loaded = {enrollment.id: enrollment for enrollment in shard.query(Enrollment).filter(Enrollment.id.in_(ids))}
+        for (index, _), enrollment_id in zip(written, ids):
+            enrollment = results[index] = loaded[enrollment_id]
+            shard.expunge(enrollment)
+            events.publish(
+                events.ENROLLMENT_CHANGED,
+                user_id=enrollment.user_id,
+                course_id=enrollment.course_id,
+                delta=1,
+            )
+
+    def get_by_user(
+        self,
+        db: Session,
+        *,
+        user_id: UUID,
+        skip: int = 0,
+        limit: int = 100,
+        include_archived: bool = False,
+        active_only: bool = False,
+        expand: frozenset[str] = frozenset(),
+    ) -> list[Enrollment | EnrollmentArchive]:
+        shard = self._session_for_user(db, user_id)
+        query = (
+            shard.query(Enrollment)
+            .options(*self._eager_options(expand))
             .filter(Enrollment.user_id == user_id)
-            .all()
         )
+        if active_only:
+            query = query.filter(Enrollment.is_active == True)
+        enrollments = query.all()
+        if include_archived:
+            enrollments += (
+                shard.query(EnrollmentArchive)
+                .filter(EnrollmentArchive.user_id == user_id)
+                .all()
+            )
+        return self.expand(db, enrollments, expand)
     
-    def get_by_course_id(self, db: Session, *, course_id: UUID) -> list[Enrollment]:
-        return db.query(self.model).filter(self.model.course_id == course_id).all()
-
-    def get_multi(self, db: Session, *, skip: int = 0, limit: int = 10) -> list[Enrollment]:
-        return (
-            db.query(Enrollment)
-            .offset(skip)
-            .limit(limit)
-            .all()
-    )
+    def get_by_course_id(
+        self,
+        db: Session,
+        *,
+        course_id: UUID,
+        expand: frozenset[str] = frozenset(),
+    ) -> list[Enrollment]:
+        # Scatter to every shard and gather the rosters.
+        enrollments = [
+            enrollment
+            for session in self._all_sessions(db)
+            for enrollment in (
+                session.query(self.model)
+                .options(*self._eager_options(expand))
+                .filter(self.model.course_id == course_id)
+                .all()
+            )
+        ]
+        return self.expand(db, enrollments, expand)
 
+    def get_multi(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 10,
+        expand: frozenset[str] = frozenset(),
+        fields: tuple[str, ...] | None = None,
+    ) -> list[Enrollment]:
+        if not shard_map.enabled:
+            enrollments = (
+                db.query(Enrollment)
+                .options(*self._eager_options(expand), *self._load_only(fields))
+                .offset(skip)
+                .limit(limit)
+                .all()
+            )
+            return self.expand(db, enrollments, expand)
 
-    def course_is_full(self, db: Session, course_id: UUID) -> bool:
-        enrolled_count = (
-            db.query(func.count(Enrollment.id))
-            .filter(
-                Enrollment.course_id == course_id,
-                Enrollment.is_active == True  
+        # A global page needs a global order: take the first skip + limit rows
+        # of every shard, merge them and slice.
+        order = (Enrollment.created_at, Enrollment.id)
+        if fields:
+            fields = (*fields, "created_at")
+        rows = [
+            enrollment
+            for session in self._all_sessions(db)
+            for enrollment in (
+                session.query(Enrollment)
+                .options(*self._load_only(fields))
+                .order_by(*order)
+                .limit(skip + limit)
+                .all()
             )
-            .scalar()
-        )
+        ]
+        rows.sort(key=lambda enrollment: (enrollment.created_at, enrollment.id))
+        return self.expand(db, rows[skip:skip + limit], expand)
+
+    def _eager_options(self, expand: frozenset[str]) -> list:
+        # Shards hold no users/courses tables, so there the related rows are
+        # fetched from the primary by expand() instead.
+        if shard_map.enabled:
+            return []
+        return [selectinload(getattr(Enrollment, name)) for name in sorted(expand)]
+
+    def expand(
+        self,
+        db: Session,
+        enrollments: list[Enrollment | EnrollmentArchive],
+        expand: frozenset[str],
+    ) -> list[Enrollment | EnrollmentArchive]:
+        """Attach ``expanded_course``/``expanded_user`` for EnrollmentRead.
+
+        Relationships already loaded eagerly are reused; anything else (shard
+        rows, archived rows) is resolved with one IN query per relation.
+        """
+        for name, model, key in (("course", Course, "course_id"), ("user", User, "user_id")):
+            if name not in expand:
+                continue
+            loaded = [
+                isinstance(enrollment, Enrollment) and name not in inspect(enrollment).unloaded
+                for enrollment in enrollments
+            ]
+            ids = {
+                getattr(enrollment, key)
+                for enrollment, is_loaded in zip(enrollments, loaded)
+                if not is_loaded
+            }
+            related = {row.id: row for row in db.query(model).filter(model.id.in_(ids))} if ids else {}
+            for enrollment, is_loaded in zip(enrollments, loaded):
+                value = getattr(enrollment, name) if is_loaded else related.get(getattr(enrollment, key))
+                setattr(enrollment, f"expanded_{name}", value)
+        return enrollments
 
+
+    def course_is_full(self, db: Session, course_id: UUID) -> bool:
         course = db.query(Course).filter(Course.id == course_id).first()
         if not course:
             return True  
 
-        return enrolled_count >= course.capacity
+        return self.active_count(db, course_id) >= course.capacity
+
+    def active_count(self, db: Session, course_id: UUID) -> int:
+        return self.active_counts(db, [course_id])[course_id]
     
+    def active_counts(self, db: Session, course_ids: list[UUID] | None = None) -> dict[UUID, int]:
+        """Active enrollments per course for all ``course_ids`` at once, or
+        for every course with any when ``course_ids`` is None."""
+        counts = dict.fromkeys(course_ids or (), 0)
+        if course_ids is not None and not course_ids:
+            return counts
+        for session in self._all_sessions(db):
+            rows = (
+                session.query(Enrollment.course_id, func.count(Enrollment.id))
+                .filter(Enrollment.is_active == True)
+                .group_by(Enrollment.course_id)
+            )
+            if course_ids is not None:
+                rows = rows.filter(Enrollment.course_id.in_(course_ids))
+            for course_id, count in rows:
+                counts[course_id] = counts.get(course_id, 0) + count
+        return counts
+
     def deregister(self, db: Session, *, enrollment_id: UUID, user: User) -> None:
-        query = db.query(Enrollment).filter(Enrollment.id == enrollment_id)
-    
         if user.role != "admin":
-            query = query.filter(Enrollment.user_id == user.id)
-        
-        enrollment = query.first()
+            shard = self._session_for_user(db, user.id)
+            enrollment = (
+                shard.query(Enrollment)
+                .filter(Enrollment.id == enrollment_id, Enrollment.user_id == user.id)
+                .first()
+            )
+        else:
+            enrollment = self.get(db, enrollment_id)
 
         if not enrollment:
             raise HTTPException(status_code=404, detail="Enrollment record not found.")
 
+        was_active = enrollment.is_active
         enrollment.is_active = False
-        db.commit()
+        session = Session.object_session(enrollment)
+        promoted, sessions = [], set()
+        if was_active:
+            # The freed seat goes to the head of the waitlist in the same
+            # transaction (per database, when enrollments are sharded).
+            session.flush()
+            promoted, sessions = self._promote(db, enrollment.course_id)
+        for dirty in {session, db, *sessions}:
+            dirty.commit()
+        events.publish(
+            events.ENROLLMENT_CHANGED,
+            user_id=enrollment.user_id,
+            course_id=enrollment.course_id,
+            delta=-1 if was_active else 0,
+        )
+        self._announce(promoted)
+
+    def update_course(self, db: Session, *, course: Course, obj_in: CourseUpdate) -> Course:
+        """Apply ``obj_in`` to the course. Seats added by raising its
+        capacity go to the waitlist in the same transaction."""
+        previous_capacity = course.capacity
+        for field, value in obj_in.model_dump(exclude_unset=True).items():
+            setattr(course, field, value)
+        promoted, sessions = [], set()
+        if course.capacity > previous_capacity:
+            db.flush()
+            promoted, sessions = self._promote(db, course.id)
+        for dirty in {db, *sessions}:
+            dirty.commit()
+        crud_course.changed(course.id)
+        self._announce(promoted)
+        db.refresh(course)
+        return course
+
+    def promote_waitlisted(self, db: Session, course_id: UUID) -> list[tuple[UUID, UUID]]:
+        """Fill the course's free seats from the head of its waitlist."""
+        promoted, sessions = self._promote(db, course_id)
+        for dirty in {db, *sessions}:
+            dirty.commit()
+        self._announce(promoted)
+        return promoted
+
+    def _announce(self, promoted: list[tuple[UUID, UUID]]) -> None:
+        for user_id, course_id in promoted:
+            events.publish(events.ENROLLMENT_CHANGED, user_id=user_id, course_id=course_id, delta=1)
+
+    def _promote(self, db: Session, course_id: UUID) -> tuple[list[tuple[UUID, UUID]], set[Session]]:
+        """Enroll waitlisted students into free seats without committing.
+
+        Locks the course's waitlist counters, then takes as many entries from
+        the head as there are free seats with one query, so raising capacity
+        by hundreds costs the same handful of statements as a single
+        deregistration. Returns the promoted (user_id, course_id) pairs and
+        the shard sessions that need committing.
+        """
+        counters = (
+            db.query(CourseWaitlist)
+            .filter(CourseWaitlist.course_id == course_id)
+            .with_for_update()
+            .first()
+        )
+        course = db.query(Course).filter(Course.id == course_id).first()
+        if counters is None or counters.head == counters.tail or not course or not course.is_active:
+            return [], set()
+
+        promoted: list[tuple[UUID, UUID]] = []
+        sessions: set[Session] = set()
+        free = course.capacity - self.active_count(db, course_id)
+        while free > 0 and counters.head < counters.tail:
+            entries = (
+                db.query(WaitlistEntry.id, WaitlistEntry.user_id, User.is_active)
+                .join(User, User.id == WaitlistEntry.user_id)
+                .filter(
+                    WaitlistEntry.course_id == course_id,
+                    WaitlistEntry.position < counters.head + free,
+                )
+                .order_by(WaitlistEntry.position)
+                .all()
+            )
+            if not entries:
+                break
+            by_shard: dict[int, tuple[Session, list[tuple[UUID, UUID]]]] = {}
+            for entry in entries:
+                # Deactivated students lose their place rather than take a seat.
+                if not entry.is_active:
+                    continue
+                shard = self._session_for_user(db, entry.user_id)
+                by_shard.setdefault(id(shard), (shard, []))[1].append((entry.user_id, course_id))
+            for shard, pairs in by_shard.values():
+                self._lock_pairs(shard, pairs)
+                existing, archived = self._records_for(shard, pairs)
+                for pair in pairs:
+                    # Students who enrolled directly meanwhile just leave the line.
+                    if pair in existing and existing[pair].is_active:
+                        continue
+                    self._activate(shard, pair, existing, archived)
+                    promoted.append(pair)
+                    free -= 1
+                shard.flush()
+                sessions.add(shard)
+
+            db.query(WaitlistEntry).filter(
+                WaitlistEntry.id.in_([entry.id for entry in entries])
+            ).delete(synchronize_session=False)
+            counters.head += len(entries)
+        db.flush()
+        return promoted, sessions
+
+    def complete_many(
+        self,
+        db: Session,
+        *,
+        enrollment_ids: list[UUID] | None = None,
+        course_id: UUID | None = None,
+        user_ids: list[UUID] | None = None,
+        batch_size: int = settings.BULK_COMPLETE_BATCH_SIZE,
+    ) -> Iterator[dict[str, Any]]:
+        """Mark active enrollments completed, by ``enrollment_ids`` or by
+        ``user_ids`` within ``course_id``, yielding one result per id.
+
+        Each chunk of ids costs one ``UPDATE ... WHERE ... = ANY(...)
+        RETURNING`` per database and a commit; only ids the update did not
+        return are looked up again, to tell why.
+        """
+        if enrollment_ids is not None:
+            key, column, ids, scope = "id", Enrollment.id, enrollment_ids, []
+        else:
+            key, column, ids, scope = "user_id", Enrollment.user_id, user_ids, [Enrollment.course_id == course_id]
+
+        for chunk in batched(dict.fromkeys(ids), batch_size):
+            if enrollment_ids is not None or not shard_map.enabled:
+                # Enrollment ids do not say which shard holds them.
+                parts = [(session, chunk) for session in self._all_sessions(db)]
+            else:
+                by_shard: dict[int, tuple[Session, list[UUID]]] = {}
+                for user_id in chunk:
+                    shard = self._session_for_user(db, user_id)
+                    by_shard.setdefault(id(shard), (shard, []))[1].append(user_id)
+                parts = list(by_shard.values())
+
+            completed: dict[UUID, tuple[UUID, UUID]] = {}
+            for session, part in parts:
+                rows = session.execute(
+                    update(Enrollment)
+                    .where(
+                        column == any_(literal(part, ARRAY(PG_UUID(as_uuid=True)))),
+                        *scope,
+                        Enrollment.is_active == True,
+                        Enrollment.completed == False,
+                    )
+                    .values(completed=True)
+                    .returning(column, Enrollment.user_id, Enrollment.course_id)
+                    .execution_options(synchronize_session=False)
+                ).all()
+                session.commit()
+                completed.update((row[0], row[1:]) for row in rows)
+            if completed:
+                # No seats change, but course statistics do.
+                events.publish(
+                    events.ENROLLMENTS_CHANGED,
+                    user_ids={user_id for user_id, _ in completed.values()},
+                    deltas=dict.fromkeys((course_id for _, course_id in completed.values()), 0),
+                )
+
+            states: dict[UUID, tuple[bool, bool]] = {}
+            if len(completed) < len(chunk):
+                for session, part in parts:
+                    missing = [value for value in part if value not in completed]
+                    if not missing:
+                        continue
+                    for value, is_active, done in session.query(
+                        column, Enrollment.is_active, Enrollment.completed
+                    ).filter(column == any_(literal(missing, ARRAY(PG_UUID(as_uuid=True)))), *scope):
+                        states[value] = (is_active, done)
+            for value in chunk:
+                if value in completed:
+                    outcome = "completed"
+                elif value not in states:
+                    outcome = "not_found"
+                elif not states[value][0]:
+                    outcome = "inactive"
+                else:
+                    outcome = "already_completed"
+                yield {key: str(value), "status": outcome}
+
+    def update_course_status(self, db: Session, *, course: Course, is_active: bool) -> tuple[Course, int]:
+        """Set the course's status and cascade it to its enrollments.
+
+        Deactivating suspends every active enrollment in the course;
+        reactivating restores those (unless their user is suspended too),
+        oldest first and only as many as there are seats, releases the rest
+        and then fills any room left from the waitlist. Both take two
+        set-based UPDATEs per database, committed with the course. Returns
+        the course and how many enrollments changed state.
+        """
+        sessions = self._all_sessions(db)
+        scope = Enrollment.course_id == course.id
+        if is_active:
+            changed = self._restore(
+                sessions, scope, Enrollment.course_suspended, Enrollment.user_suspended,
+                self._seated(db, sessions, scope, [course.id]),
+            )
+        else:
+            changed = self._suspend(sessions, scope, Enrollment.course_suspended, Enrollment.user_suspended)
+        course = crud_course.update_status(db, course=course, is_active=is_active)
+        for shard in sessions:
+            shard.commit()
+        self._publish_bulk(changed, 1 if is_active else -1)
+        if is_active:
+            self.promote_waitlisted(db, course.id)
+        return course, len(changed)
+
+    def update_course_status_many(
+        self,
+        db: Session,
+        *,
+        is_active: bool,
+        ids: list[UUID] | None = None,
+        codes: list[str] | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """``crud_course.update_status_many`` with the cascade of
+        ``update_course_status``: the enrollments of every course that
+        changed are suspended or restored (as many as each has seats) by
+        the same set-based UPDATEs, scoped to all those courses at once, and
+        committed with them."""
+        changed = crud_course.set_status_many(db, is_active=is_active, ids=ids, codes=codes)
+        course_ids = [course.id for course in changed]
+        sessions = self._all_sessions(db)
+        scope = Enrollment.course_id == any_(literal(course_ids, ARRAY(PG_UUID(as_uuid=True))))
+        if is_active:
+            moved = self._restore(
+                sessions, scope, Enrollment.course_suspended, Enrollment.user_suspended,
+                self._seated(db, sessions, scope, course_ids),
+            )
+        else:
+            moved = self._suspend(sessions, scope, Enrollment.course_suspended, Enrollment.user_suspended)
+        for dirty in {db, *sessions}:
+            dirty.commit()
+        for course_id in course_ids:
+            crud_course.changed(course_id)
+        self._publish_bulk(moved, 1 if is_active else -1)
+        if is_active:
+            for course_id in course_ids:
+                self.promote_waitlisted(db, course_id)
+        return crud_course.status_results(db, changed, ids=ids, codes=codes)
+
+    def update_user_status(self, db: Session, *, user: User, is_active: bool) -> tuple[User, int]:
+        """Set the user's status and cascade it to their enrollments.
+
+        Deactivating suspends the user's active enrollments, takes them off
+        every waitlist and hands the freed seats to the courses' waitlists.
+        Reactivating restores the suspended ones in courses that are active
+        and still have a seat; the others are released. Returns the user and
+        how many enrollments changed state.
+        """
+        shard = self._session_for_user(db, user.id)
+        scope = Enrollment.user_id == user.id
+        if is_active:
+            candidates = [
+                course_id
+                for (course_id,) in shard.query(Enrollment.course_id).filter(
+                    scope, Enrollment.user_suspended, ~Enrollment.course_suspended
+                )
+            ]
+            counts = self.active_counts(db, candidates)
+            room = [
+                course_id
+                for course_id, capacity in db.query(Course.id, Course.capacity).filter(
+                    Course.id.in_(candidates), Course.is_active == True
+                )
+                if counts.get(course_id, 0) < capacity
+            ]
+            changed = self._restore(
+                [shard], scope, Enrollment.user_suspended, Enrollment.course_suspended,
+                Enrollment.course_id.in_(room),
+            )
+        else:
+            changed = self._suspend([shard], scope, Enrollment.user_suspended, Enrollment.course_suspended)
+            self._leave_waitlists(db, user.id)
+        user = crud_user.update_status(db, user=user, is_active=is_active)
+        shard.commit()
+        self._publish_bulk(changed, 1 if is_active else -1)
+        if not is_active:
+            for _, course_id in changed:
+                self.promote_waitlisted(db, course_id)
+        return user, len(changed)
+
+    def _leave_waitlists(self, db: Session, user_id: UUID) -> None:
+        """Take the user off every waitlist and close the gaps behind them,
+        without committing."""
+        by_user = WaitlistEntry.user_id == user_id
+        # Counters are locked in course order first, so positions cannot
+        # shift between reading the entries and closing the gaps.
+        counters = {
+            row.course_id: row
+            for row in db.query(CourseWaitlist)
+            .filter(CourseWaitlist.course_id.in_(db.query(WaitlistEntry.course_id).filter(by_user)))
+            .order_by(CourseWaitlist.course_id)
+            .with_for_update()
+        }
+        for entry in db.query(WaitlistEntry).filter(by_user).all():
+            db.delete(entry)
+            db.execute(
+                update(WaitlistEntry)
+                .where(WaitlistEntry.course_id == entry.course_id, WaitlistEntry.position > entry.position)
+                .values(position=WaitlistEntry.position - 1)
+            )
+            counters[entry.course_id].tail -= 1
+
+    def _seated(self, db: Session, sessions, scope, course_ids: list[UUID]):
+        """Criterion for the course-suspended enrollments in ``scope`` that
+        still fit their course: the oldest ones, up to its free seats (the
+        capacity may have been lowered while the course was inactive)."""
+        waiting: list[tuple] = []
+        for session in sessions:
+            waiting += session.query(Enrollment.created_at, Enrollment.id, Enrollment.course_id).filter(
+                scope, Enrollment.course_suspended, ~Enrollment.user_suspended
+            )
+        counts = self.active_counts(db, course_ids)
+        free = {
+            course_id: capacity - counts.get(course_id, 0)
+            for course_id, capacity in db.query(Course.id, Course.capacity).filter(Course.id.in_(course_ids))
+        }
+        seated = []
+        for _, enrollment_id, course_id in sorted(waiting):
+            if free.get(course_id, 0) > 0:
+                free[course_id] -= 1
+                seated.append(enrollment_id)
+        return Enrollment.id == any_(literal(seated, ARRAY(PG_UUID(as_uuid=True))))
+
+    def _suspend(self, sessions, scope, flag, other) -> list[tuple[UUID, UUID]]:
+        """Deactivate the active enrollments in ``scope`` and mark them with
+        ``flag``. Rows already suspended through ``other`` get ``flag`` too,
+        so that lifting one suspension alone does not reactivate them."""
+        changed = []
+        for session in sessions:
+            changed += session.execute(
+                update(Enrollment)
+                .where(scope, Enrollment.is_active == True)
+                .values({Enrollment.is_active: False, flag: True})
+                .returning(Enrollment.user_id, Enrollment.course_id)
+            ).all()
+            session.execute(update(Enrollment).where(scope, other, ~flag).values({flag: True}))
+        return changed
+
+    def _restore(self, sessions, scope, flag, other, *criteria) -> list[tuple[UUID, UUID]]:
+        """Lift ``flag`` in ``scope``: rows not also suspended through
+        ``other`` (and matching ``criteria``) become active again."""
+        changed = []
+        for session in sessions:
+            changed += session.execute(
+                update(Enrollment)
+                .where(scope, flag, ~other, *criteria)
+                .values({Enrollment.is_active: True, flag: False})
+                .returning(Enrollment.user_id, Enrollment.course_id)
+            ).all()
+            session.execute(update(Enrollment).where(scope, flag).values({flag: False}))
+        return changed
+
+    def _publish_bulk(self, changed: list[tuple[UUID, UUID]], delta: int) -> None:
+        if not changed:
+            return
+        deltas: dict[UUID, int] = {}
+        for _, course_id in changed:
+            deltas[course_id] = deltas.get(course_id, 0) + delta
+        events.publish(
+            events.ENROLLMENTS_CHANGED,
+            user_ids={user_id for user_id, _ in changed},
+            deltas=deltas,
+        )
+
+enrollment_crud = CRUDEnrollment(Enrollment)
+
+# Used instead of enroll() when ENROLLMENT_GROUP_COMMIT is on.
+enrollment_batcher = GroupCommitter(
+    enrollment_crud.enroll_many,
+    window=settings.ENROLLMENT_GROUP_COMMIT_WINDOW_MS / 1000,
+    max_batch=settings.ENROLLMENT_GROUP_COMMIT_MAX_BATCH,
+)
+
+
+def _admit(items: list[tuple[Session, UUID, UUID]]) -> list[Enrollment | HTTPException]:
+    # Every item in a lane is for the same course. The draining thread runs
+    # the batch on the submitters' sessions (with group commit, on the first
+    # one's alone). That is safe only because AdmissionQueue.submit keeps
+    # every submitter blocked until its result is set, so no session is
+    # used by two threads at once; callers must not touch ``db`` meanwhile.
+    course_id = items[0][2]
+    if settings.ENROLLMENT_GROUP_COMMIT:
+        results = enrollment_crud.enroll_many(items[0][0], [(user_id, course_id) for _, user_id, _ in items])
+    else:
+        results = []
+        for db, user_id, _ in items:
+            try:
+                results.append(enrollment_crud.enroll(db, user_id=user_id, course_id=course_id))
+            except HTTPException as error:
+                results.append(error)
+    if any(isinstance(result, HTTPException) and result.detail == "Course is full" for result in results):
+        enrollment_admission.close(course_id, settings.ADMISSION_FULL_SECONDS)
+    return results
+
+
+# Used instead of enroll() when ENROLLMENT_ADMISSION_QUEUE is on; keyed by
+# course_id and items are (db, user_id, course_id).
+enrollment_admission = AdmissionQueue(
+    _admit,
+    depth=settings.ADMISSION_QUEUE_DEPTH,
+    max_batch=settings.ENROLLMENT_GROUP_COMMIT_MAX_BATCH,
+)
+
+
+@events.subscribe(events.ENROLLMENT_CHANGED)
+def _seat_freed(*, course_id: UUID, delta: int = 0, **_) -> None:
+    if delta < 0:
+        enrollment_admission.reopen(course_id)
+
+
+@events.subscribe(events.ENROLLMENTS_CHANGED)
+def _seats_freed(*, deltas: dict[UUID, int], **_) -> None:
+    for course_id, delta in deltas.items():
+        if delta < 0:
+            enrollment_admission.reopen(course_id)
 
-def get_active_enrollments_count(self, db: Session, course_id: UUID) -> int:
-    return db.query(func.count(Enrollment.id))\
-             .filter(Enrollment.course_id == course_id, Enrollment.is_active == True)\
-             .scalar()
 
-enrollment_crud = CRUDEnrollment(Enrollment)
\ No newline at end of file
+@events.subscribe(events.COURSE_CHANGED)
+def _course_changed(*, course_id: UUID, **_) -> None:
+    enrollment_admission.reopen(course_id)
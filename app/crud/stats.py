@@ -0,0 +1,171 @@
+import threading
+from typing import Literal
+from uuid import UUID
+
+from sqlalchemy import Float, any_, cast, func, literal, nulls_last, select, type_coerce, union_all
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert
+from sqlalchemy.orm import Session
+
+from app.core import events
+from app.db.base_class import UTC_NOW
+from app.db.session import SessionLocal
+from app.db.shards import close_shard_sessions, shard_map
+from app.models.course import Course
+from app.models.course_stats import CourseStats
+from app.models.enrollment import Enrollment, EnrollmentArchive
+from app.schemas.course import CourseStatsRead
+
+COUNTS = ("enrollment_count", "active_count", "completed_count", "reactivation_count")
+
+# NULL rather than a division error for zero capacity or no enrollments.
+FILL_RATE = cast(func.coalesce(CourseStats.active_count, 0), Float) / type_coerce(
+    func.nullif(Course.capacity, 0), Float
+)
+COMPLETION_RATE = cast(CourseStats.completed_count, Float) / type_coerce(
+    func.nullif(CourseStats.enrollment_count, 0), Float
+)
+
+StatsSort = Literal["code", "fill_rate", "-fill_rate", "completion_rate", "-completion_rate"]
+
+SORTS = {
+    "code": Course.code,
+    "fill_rate": nulls_last(FILL_RATE.asc()),
+    "-fill_rate": nulls_last(FILL_RATE.desc()),
+    "completion_rate": nulls_last(COMPLETION_RATE.asc()),
+    "-completion_rate": nulls_last(COMPLETION_RATE.desc()),
+}
+
+
+class CourseStatistics:
+    """Keeps ``course_stats`` in step with the enrollments.
+
+    Enrollment events mark their course dirty; ``refresh_dirty`` then
+    recomputes just those courses with one grouped aggregate per database,
+    over live and archived enrollments alike, and upserts the rows. Writes go to the summary table in the background,
+    so enrolling never waits on (or contends for) a statistics row.
+    Changes made by other processes are refreshed by those processes, and
+    ``refresh`` with no ids rebuilds every course.
+    """
+
+    def __init__(self):
+        self._dirty: set[UUID] = set()
+        self._lock = threading.Lock()
+
+    def mark(self, course_ids) -> None:
+        with self._lock:
+            self._dirty.update(course_ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._dirty.clear()
+
+    def refresh_dirty(self, db: Session) -> int:
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return 0
+        try:
+            return self.refresh(db, list(dirty))
+        except BaseException:
+            self.mark(dirty)
+            raise
+
+    def refresh(self, db: Session, course_ids: list[UUID] | None = None) -> int:
+        """Recompute the rows of ``course_ids`` (or every course); returns
+        how many were written."""
+        if course_ids is None:
+            course_ids = [course_id for (course_id,) in db.query(Course.id)]
+        if not course_ids:
+            return 0
+        ids = literal(course_ids, ARRAY(PG_UUID(as_uuid=True)))
+        counts = {course_id: [0, 0, 0, 0] for course_id in course_ids}
+        # Archiving moves rows without changing them, so it must not change the counts.
+        enrollments = union_all(*(
+            select(
+                model.course_id, model.is_active, model.completed, model.reactivation_count
+            ).where(model.course_id == any_(ids))
+            for model in (Enrollment, EnrollmentArchive)
+        )).subquery()
+        for session in shard_map.all_sessions(db):
+            rows = session.execute(
+                select(
+                    enrollments.c.course_id,
+                    func.count(),
+                    func.count().filter(enrollments.c.is_active),
+                    func.count().filter(enrollments.c.completed),
+                    func.coalesce(func.sum(enrollments.c.reactivation_count), 0),
+                ).group_by(enrollments.c.course_id)
+            )
+            for course_id, *values in rows:
+                counts[course_id] = [total + value for total, value in zip(counts[course_id], values)]
+
+        # Courses deleted meanwhile would break the foreign key.
+        existing = {course_id for (course_id,) in db.query(Course.id).filter(Course.id == any_(ids))}
+        values = [
+            {"course_id": course_id, **dict(zip(COUNTS, row))}
+            for course_id, row in counts.items()
+            if course_id in existing
+        ]
+        if not values:
+            return 0
+        statement = insert(CourseStats).values(values)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[CourseStats.course_id],
+                set_={
+                    **{name: statement.excluded[name] for name in COUNTS},
+                    "refreshed_at": UTC_NOW,
+                },
+            )
+        )
+        db.commit()
+        return len(values)
+
+    def get_all(self, db: Session, *, sort: str = "code") -> list[CourseStatsRead]:
+        """Every course with its statistics, in one query."""
+        rows = (
+            db.query(
+                Course.id,
+                Course.code,
+                Course.title,
+                Course.capacity,
+                Course.is_active,
+                *(func.coalesce(getattr(CourseStats, name), 0) for name in COUNTS),
+                FILL_RATE,
+                COMPLETION_RATE,
+                CourseStats.refreshed_at,
+            )
+            .outerjoin(CourseStats, CourseStats.course_id == Course.id)
+            .order_by(SORTS[sort], Course.code)
+            .all()
+        )
+        fields = (
+            "course_id", "code", "title", "capacity", "is_active", *COUNTS,
+            "fill_rate", "completion_rate", "refreshed_at",
+        )
+        return [CourseStatsRead(**dict(zip(fields, row))) for row in rows]
+
+
+course_statistics = CourseStatistics()
+
+
+def refresh_course_stats(full: bool = False) -> None:
+    db = SessionLocal()
+    try:
+        if full:
+            course_statistics.refresh(db)
+        else:
+            course_statistics.refresh_dirty(db)
+    finally:
+        close_shard_sessions(db)
+        db.close()
+
+
+@events.subscribe(events.ENROLLMENT_CHANGED)
+def _enrollment_changed(*, course_id: UUID, **_) -> None:
+    course_statistics.mark([course_id])
+
+
+@events.subscribe(events.ENROLLMENTS_CHANGED)
+def _enrollments_changed(*, deltas: dict[UUID, int], **_) -> None:
+    course_statistics.mark(deltas)
@@ -1,11 +1,37 @@
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, NamedTuple
+from uuid import UUID
+from pydantic import ValidationError
+from sqlalchemy import String, any_, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.orm import Session
 
 
-from app.crud.base import CRUDBase
+from app.crud.base import CRUDBase, batched
 from app.models.user import User
-from app.schemas.user import UserCreate
-from app.core.security import get_password_hash
+from app.schemas.user import UserCreate, UserRead
+from app.core import events
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import get_password_hash, hash_passwords
+
+
+class TokenState(NamedTuple):
+    token_version: int
+    is_active: bool
+
+
+# Read-only snapshots for batch lookups; writes below drop their entry.
+user_cache = TTLCache(
+    ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+    max_entries=settings.CATALOG_CACHE_SIZE,
+)
+
+# Lets token checks skip the users table; entries for a user are dropped
+# here on every revocation, other processes catch up within the TTL.
+token_states = TTLCache(
+    ttl=settings.TOKEN_VERSION_CACHE_TTL_SECONDS,
+    max_entries=settings.TOKEN_VERSION_CACHE_SIZE,
+)
 
 
 class CRUDUser(CRUDBase[User, UserCreate, Dict[str, Any]]):
@@ -30,6 +56,93 @@ class CRUDUser(CRUDBase[User, UserCreate, Dict[str, Any]]):
         db.refresh(db_obj)
         return db_obj
 
+    def get_many_read(self, db: Session, ids: list[UUID]) -> dict[UUID, UserRead]:
+        """Snapshots for ``ids``, from the cache where warm and one IN query
+        for the rest. Unknown ids are left out."""
+        found = {}
+        misses = []
+        for user_id in ids:
+            cached = user_cache.get(user_id)
+            if cached is None:
+                misses.append(user_id)
+            else:
+                found[user_id] = cached
+        for user in self.get_many(db, misses):
+            snapshot = UserRead.model_validate(user)
+            user_cache.set(user.id, snapshot)
+            found[user.id] = snapshot
+        return found
+
+    def get_existing_emails(self, db: Session, emails: list[str]) -> set[str]:
+        return set(
+            db.execute(
+                select(User.email).where(User.email == any_(literal(emails, ARRAY(String))))
+            ).scalars()
+        )
+
+    def create_many(
+        self,
+        db: Session,
+        *,
+        rows: list[dict[str, Any]],
+        batch_size: int = settings.BULK_BATCH_SIZE,
+    ) -> Iterator[dict[str, Any]]:
+        """Import ``rows`` of UserCreate fields, yielding one result per row.
+
+        Invalid rows and emails that are repeated or already registered are
+        reported without hashing. Passwords for the rest are hashed in a
+        process pool while earlier batches are inserted and committed.
+        """
+        valid: list[tuple[int, UserCreate]] = []
+        seen: set[str] = set()
+        for index, row in enumerate(rows):
+            try:
+                user_in = UserCreate.model_validate(row)
+            except ValidationError as exc:
+                errors = "; ".join(
+                    f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors()
+                )
+                yield {"row": index, "email": row.get("email"), "status": "error", "detail": errors}
+                continue
+            if user_in.email in seen:
+                yield {"row": index, "email": user_in.email, "status": "error", "detail": "Duplicate email in import"}
+                continue
+            seen.add(user_in.email)
+            valid.append((index, user_in))
+
+        existing = self.get_existing_emails(db, [user_in.email for _, user_in in valid]) if valid else set()
+        pending = []
+        for index, user_in in valid:
+            if user_in.email in existing:
+                yield {"row": index, "email": user_in.email, "status": "error", "detail": "Email already registered"}
+            else:
+                pending.append((index, user_in))
+
+        hashes = hash_passwords(user_in.password for _, user_in in pending)
+        statement = (
+            insert(User)
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User.id, User.email)
+        )
+        for batch in batched(pending, batch_size):
+            values = [
+                {
+                    "name": user_in.name,
+                    "email": user_in.email,
+                    "hashed_password": hashed,
+                    "role": user_in.role,
+                }
+                for (_, user_in), hashed in zip(batch, hashes)
+            ]
+            created = {row.email: row.id for row in db.execute(statement, values)}
+            db.commit()
+            for index, user_in in batch:
+                if user_in.email in created:
+                    yield {"row": index, "email": user_in.email, "status": "created", "id": str(created[user_in.email])}
+                else:
+                    # Registered by someone else since the existence check.
+                    yield {"row": index, "email": user_in.email, "status": "error", "detail": "Email already registered"}
+
 
     def update(
         self,
@@ -38,7 +151,9 @@ class CRUDUser(CRUDBase[User, UserCreate, Dict[str, Any]]):
         db_obj: User,
         obj_in: Dict[str, Any],
     ) -> User:
-      
+        if "role" in obj_in and obj_in["role"] != db_obj.role:
+            self._revoke_tokens(db_obj)
+
         for field, value in obj_in.items():
             if field == "password":
                 setattr(db_obj, "hashed_password", get_password_hash(value))
@@ -47,6 +162,9 @@ class CRUDUser(CRUDBase[User, UserCreate, Dict[str, Any]]):
 
         db.add(db_obj)
         db.commit()
+        token_states.pop(db_obj.id)
+        user_cache.pop(db_obj.id)
+        events.publish(events.USER_CHANGED, user_id=db_obj.id)
         db.refresh(db_obj)
         return db_obj
 
@@ -57,13 +175,35 @@ class CRUDUser(CRUDBase[User, UserCreate, Dict[str, Any]]):
         user: User,
         is_active: bool,
     ) -> User:
-        
+        if user.is_active != is_active:
+            self._revoke_tokens(user)
         user.is_active = is_active
         db.add(user)
         db.commit()
+        token_states.pop(user.id)
+        user_cache.pop(user.id)
+        events.publish(events.USER_CHANGED, user_id=user.id)
         db.refresh(user)
         return user
 
+    def get_token_state(self, db: Session, user_id: UUID) -> TokenState | None:
+        state = token_states.get(user_id)
+        if state is None:
+            row = (
+                db.query(User.token_version, User.is_active)
+                .filter(User.id == user_id)
+                .first()
+            )
+            if row is None:
+                return None
+            state = TokenState(row.token_version, bool(row.is_active))
+            token_states.set(user_id, state)
+        return state
+
+    def _revoke_tokens(self, user: User) -> None:
+        # Incremented in SQL so concurrent revocations cannot collapse into one.
+        user.token_version = User.token_version + 1
+
 
 crud_user = CRUDUser(User)
 
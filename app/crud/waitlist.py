@@ -0,0 +1,135 @@
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.crud.enrollment import enrollment_crud
+from app.db.shards import shard_map
+from app.models.course import Course
+from app.models.enrollment import Enrollment
+from app.models.waitlist import CourseWaitlist, WaitlistEntry
+from app.schemas.waitlist import WaitlistRead
+
+
+class CRUDWaitlist:
+    """Per-course waitlists. Students are promoted into freed seats by
+    ``CRUDEnrollment.deregister`` and ``promote_waitlisted``."""
+
+    def join(self, db: Session, *, user_id: UUID, course_id: UUID) -> WaitlistRead:
+        course = db.query(Course).filter(Course.id == course_id).first()
+        if not course:
+            raise HTTPException(status_code=404, detail="Course not found")
+        if not course.is_active:
+            raise HTTPException(status_code=400, detail="Course is inactive")
+
+        shard = shard_map.session_for_user(db, user_id)
+        enrolled = (
+            shard.query(Enrollment.id)
+            .filter(
+                Enrollment.user_id == user_id,
+                Enrollment.course_id == course_id,
+                Enrollment.is_active == True,
+            )
+            .first()
+        )
+        if enrolled:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User already enrolled in this course",
+            )
+        queued = (
+            db.query(WaitlistEntry.id)
+            .filter(WaitlistEntry.user_id == user_id, WaitlistEntry.course_id == course_id)
+            .first()
+        )
+        if queued:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Already on the waitlist for this course",
+            )
+        if enrollment_crud.active_count(db, course_id) < course.capacity:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Course has free seats, enroll instead",
+            )
+
+        # Takes the next position; the counter row lock orders concurrent
+        # joins and promotions for this course until commit.
+        tail = db.execute(
+            insert(CourseWaitlist)
+            .values(course_id=course_id, head=0, tail=1)
+            .on_conflict_do_update(
+                index_elements=[CourseWaitlist.course_id],
+                set_={"tail": CourseWaitlist.tail + 1},
+            )
+            .returning(CourseWaitlist.head, CourseWaitlist.tail)
+        ).one()
+        entry = WaitlistEntry(user_id=user_id, course_id=course_id, position=tail.tail - 1)
+        db.add(entry)
+        try:
+            db.commit()
+        except IntegrityError as exc:
+            db.rollback()
+            if "user_id_course_id" not in str(exc.orig):
+                raise
+            # A concurrent request queued the same user first.
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Already on the waitlist for this course",
+            )
+        db.refresh(entry)
+        return WaitlistRead(
+            course_id=course_id,
+            position=entry.position - tail.head + 1,
+            created_at=entry.created_at,
+        )
+
+    def get_by_user(self, db: Session, *, user_id: UUID) -> list[WaitlistRead]:
+        """The user's waitlist places, one indexed lookup per course."""
+        rows = (
+            db.query(WaitlistEntry, CourseWaitlist.head)
+            .join(CourseWaitlist, CourseWaitlist.course_id == WaitlistEntry.course_id)
+            .filter(WaitlistEntry.user_id == user_id)
+            .order_by(WaitlistEntry.created_at)
+            .all()
+        )
+        return [
+            WaitlistRead(
+                course_id=entry.course_id,
+                position=entry.position - head + 1,
+                created_at=entry.created_at,
+            )
+            for entry, head in rows
+        ]
+
+    def leave(self, db: Session, *, user_id: UUID, course_id: UUID) -> None:
+        """Remove the user from the line and close the gap behind them, so
+        positions stay dense."""
+        counters = (
+            db.query(CourseWaitlist)
+            .filter(CourseWaitlist.course_id == course_id)
+            .with_for_update()
+            .first()
+        )
+        entry = (
+            db.query(WaitlistEntry)
+            .filter(WaitlistEntry.user_id == user_id, WaitlistEntry.course_id == course_id)
+            .first()
+        )
+        if not counters or not entry:
+            raise HTTPException(status_code=404, detail="Not on the waitlist for this course")
+
+        db.delete(entry)
+        db.execute(
+            update(WaitlistEntry)
+            .where(WaitlistEntry.course_id == course_id, WaitlistEntry.position > entry.position)
+            .values(position=WaitlistEntry.position - 1)
+        )
+        counters.tail -= 1
+        db.commit()
+
+
+waitlist_crud = CRUDWaitlist()
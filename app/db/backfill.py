@@ -0,0 +1,332 @@
+"""Online data-migration helpers for Alembic revisions.
+
+Large UPDATEs, row moves and index builds are run outside the revision's
+transaction so that each batch commits on its own and writers are never
+blocked for long::
+
+    from app.db.backfill import backfill, create_index_concurrently
+
+    def upgrade() -> None:
+        op.execute("ALTER TABLE enrollments ADD COLUMN IF NOT EXISTS seats INTEGER")
+        backfill("enrollments", "seats = 1", where="seats IS NULL", name="abc123_enrollments_seats")
+        create_index_concurrently("ix_enrollments_seats", "enrollments", ["seats"])
+
+Everything before a helper call is committed when it runs, so statements in
+the revision must be safe to re-run (``IF NOT EXISTS`` and friends). An
+interrupted backfill resumes from its last committed batch.
+"""
+import logging
+import time
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger("alembic.backfill")
+
+PROGRESS_TABLE = "alembic_backfill_progress"
+
+
+def _ensure_progress_table(connection: Connection) -> None:
+    connection.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} ("
+            "name TEXT PRIMARY KEY, "
+            "last_key TEXT, "
+            "rows_done BIGINT NOT NULL DEFAULT 0, "
+            "completed_at TIMESTAMP)"
+        )
+    )
+
+
+def _column_type(connection: Connection, table: str, column: str) -> str:
+    return connection.execute(
+        text(
+            "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+            "WHERE attrelid = CAST(:table AS regclass) AND attname = :column"
+        ),
+        {"table": table, "column": column},
+    ).scalar_one()
+
+
+def is_partitioned(connection: Connection, table: str) -> bool:
+    return connection.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = CAST(:table AS regclass))"),
+        {"table": table},
+    ).scalar()
+
+
+def _run_batches(
+    connection: Connection,
+    table: str,
+    changes: str,
+    *,
+    name: str,
+    where: str | None,
+    key: str,
+    batch_size: int,
+    pause: float,
+    progress: Callable[[int, int], None] | None,
+) -> int:
+    """Apply ``changes`` to ``key``-ordered batches of the rows matching
+    ``where``, recording progress under ``name`` in the same statement.
+
+    ``changes`` holds one or more CTEs over ``batch`` (the batch's keys), the
+    last of which must be named ``changed`` and return the keys it touched.
+    """
+    _ensure_progress_table(connection)
+    state = connection.execute(
+        text(f"SELECT last_key, rows_done, completed_at FROM {PROGRESS_TABLE} WHERE name = :name"),
+        {"name": name},
+    ).first()
+    if state and state.completed_at:
+        logger.info("Backfill %s already completed (%s rows)", name, state.rows_done)
+        return 0
+
+    last_key = state.last_key if state else None
+    total = state.rows_done if state else 0
+    key_type = _column_type(connection, table, key)
+    batch_sql = text(
+        f"WITH batch AS ("
+        f"SELECT {key} FROM {table} "
+        f"WHERE (CAST(:last_key AS {key_type}) IS NULL OR {key} > CAST(:last_key AS {key_type})) "
+        f"AND ({where or 'TRUE'}) "
+        f"ORDER BY {key} LIMIT :batch_size), "
+        f"{changes} "
+        f"INSERT INTO {PROGRESS_TABLE} AS progress (name, last_key, rows_done) "
+        f"SELECT :name, CAST((SELECT {key} FROM changed ORDER BY {key} DESC LIMIT 1) AS TEXT), count(*) "
+        f"FROM changed HAVING count(*) > 0 "
+        f"ON CONFLICT (name) DO UPDATE SET last_key = EXCLUDED.last_key, "
+        f"rows_done = progress.rows_done + EXCLUDED.rows_done "
+        f"RETURNING progress.last_key, progress.rows_done"
+    )
+
+    changed = 0
+    while True:
+        row = connection.execute(
+            batch_sql,
+            {"name": name, "last_key": last_key, "batch_size": batch_size},
+        ).first()
+        if row is None:
+            break
+        last_key, rows_done = row
+        batch_rows = rows_done - total
+        changed += batch_rows
+        total = rows_done
+        logger.info("Backfill %s: %s rows done (last %s = %s)", name, total, key, last_key)
+        if progress:
+            progress(batch_rows, total)
+        if pause:
+            time.sleep(pause)
+
+    connection.execute(
+        text(
+            f"INSERT INTO {PROGRESS_TABLE} (name, rows_done, completed_at) VALUES (:name, 0, now()) "
+            f"ON CONFLICT (name) DO UPDATE SET completed_at = now()"
+        ),
+        {"name": name},
+    )
+    logger.info("Backfill %s completed: %s rows", name, total)
+    return changed
+
+
+def run_backfill(
+    connection: Connection,
+    table: str,
+    set_clause: str,
+    *,
+    name: str,
+    where: str | None = None,
+    key: str = "id",
+    batch_size: int = 1000,
+    pause: float = 0.1,
+    progress: Callable[[int, int], None] | None = None,
+) -> int:
+    """Apply ``UPDATE table SET set_clause`` in ``key``-ordered batches.
+
+    ``connection`` must be in autocommit mode: every batch and its progress
+    record are written by a single statement, so each batch commits
+    atomically and a rerun under the same ``name`` picks up after the last
+    committed key. Returns the number of rows updated by this call.
+    """
+    return _run_batches(
+        connection,
+        table,
+        f"changed AS ("
+        f"UPDATE {table} SET {set_clause} FROM batch WHERE {table}.{key} = batch.{key} "
+        f"RETURNING {table}.{key})",
+        name=name, where=where, key=key, batch_size=batch_size, pause=pause, progress=progress,
+    )
+
+
+def run_move(
+    connection: Connection,
+    table: str,
+    target: str,
+    columns: dict[str, str],
+    *,
+    name: str,
+    where: str | None = None,
+    key: str = "id",
+    batch_size: int = 1000,
+    pause: float = 0.1,
+    progress: Callable[[int, int], None] | None = None,
+) -> int:
+    """Move the rows of ``table`` matching ``where`` into ``target`` in
+    ``key``-ordered batches, e.g. to set rows aside rather than delete them.
+
+    ``columns`` maps each ``target`` column to an expression over the moved
+    row's columns. Each batch is deleted, inserted and recorded by
+    a single statement, so it commits atomically and a rerun resumes as with
+    ``run_backfill``. Returns the number of rows moved by this call.
+    """
+    return _run_batches(
+        connection,
+        table,
+        f"moved AS ("
+        f"DELETE FROM {table} USING batch WHERE {table}.{key} = batch.{key} "
+        f"RETURNING {table}.*), "
+        f"changed AS ("
+        f"INSERT INTO {target} ({', '.join(columns)}) SELECT {', '.join(columns.values())} FROM moved "
+        f"RETURNING {key})",
+        name=name, where=where, key=key, batch_size=batch_size, pause=pause, progress=progress,
+    )
+
+
+def reset_progress(connection: Connection, name: str) -> None:
+    """Forget backfill ``name`` so that re-applying its revision after a
+    downgrade runs it again."""
+    _ensure_progress_table(connection)
+    connection.execute(text(f"DELETE FROM {PROGRESS_TABLE} WHERE name = :name"), {"name": name})
+
+
+def _drop_invalid_index(connection: Connection, index_name: str) -> None:
+    # A failed CONCURRENTLY build leaves an INVALID index behind that
+    # IF NOT EXISTS would otherwise mistake for a finished one.
+    invalid = connection.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(:name) AND NOT indisvalid)"
+        ),
+        {"name": index_name},
+    ).scalar()
+    if invalid:
+        connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+
+
+def create_index_online(
+    connection: Connection,
+    index_name: str,
+    table: str,
+    columns: list[str],
+    *,
+    unique: bool = False,
+    where: str | None = None,
+) -> None:
+    """Build an index without blocking writes; ``connection`` must be in
+    autocommit mode.
+
+    Partitioned tables do not support CONCURRENTLY, so the parent index is
+    created ``ON ONLY`` the parent and each partition's index is built
+    concurrently and attached to it.
+    """
+    unique_sql = "UNIQUE " if unique else ""
+    columns_sql = ", ".join(columns)
+    where_sql = f" WHERE {where}" if where else ""
+
+    if not is_partitioned(connection, table):
+        _drop_invalid_index(connection, index_name)
+        connection.execute(
+            text(
+                f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                f"ON {table} ({columns_sql}){where_sql}"
+            )
+        )
+        return
+
+    connection.execute(
+        text(f"CREATE {unique_sql}INDEX IF NOT EXISTS {index_name} ON ONLY {table} ({columns_sql}){where_sql}")
+    )
+    partitions = connection.execute(
+        text("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = CAST(:table AS regclass)"),
+        {"table": table},
+    ).scalars().all()
+    for partition in partitions:
+        partition_index = f"{partition}_{index_name}"[:63]
+        create_index_online(connection, partition_index, partition, columns, unique=unique, where=where)
+        attached = connection.execute(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM pg_inherits "
+                "WHERE inhrelid = to_regclass(:child) AND inhparent = to_regclass(:parent))"
+            ),
+            {"child": partition_index, "parent": index_name},
+        ).scalar()
+        if not attached:
+            connection.execute(text(f"ALTER INDEX {index_name} ATTACH PARTITION {partition_index}"))
+
+
+def drop_index_online(connection: Connection, index_name: str) -> None:
+    partitioned = connection.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_class WHERE oid = to_regclass(:name) AND relkind = 'I')"),
+        {"name": index_name},
+    ).scalar()
+    concurrently = "" if partitioned else "CONCURRENTLY "
+    connection.execute(text(f"DROP INDEX {concurrently}IF EXISTS {index_name}"))
+
+
+def set_not_null_online(connection: Connection, table: str, column: str) -> None:
+    """SET NOT NULL without holding an exclusive lock for a full scan.
+
+    A NOT VALID check constraint is validated under a weaker lock first; Postgres
+    then uses it to skip the scan when the column is made NOT NULL.
+    """
+    constraint = f"{table}_{column}_not_null"[:63]
+    connection.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {constraint}"))
+    connection.execute(
+        text(f"ALTER TABLE {table} ADD CONSTRAINT {constraint} CHECK ({column} IS NOT NULL) NOT VALID")
+    )
+    connection.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {constraint}"))
+    connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL"))
+    connection.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT {constraint}"))
+
+
+# Alembic entry points: call these from a revision's upgrade()/downgrade().
+
+def backfill(table: str, set_clause: str, *, name: str, **kwargs) -> int:
+    from alembic import op
+
+    with op.get_context().autocommit_block():
+        return run_backfill(op.get_bind(), table, set_clause, name=name, **kwargs)
+
+
+def move_rows(table: str, target: str, columns: dict[str, str], *, name: str, **kwargs) -> int:
+    from alembic import op
+
+    with op.get_context().autocommit_block():
+        return run_move(op.get_bind(), table, target, columns, name=name, **kwargs)
+
+
+def reset_backfill(name: str) -> None:
+    from alembic import op
+
+    reset_progress(op.get_bind(), name)
+
+
+def create_index_concurrently(index_name: str, table: str, columns: list[str], **kwargs) -> None:
+    from alembic import op
+
+    with op.get_context().autocommit_block():
+        create_index_online(op.get_bind(), index_name, table, columns, **kwargs)
+
+
+def drop_index_concurrently(index_name: str) -> None:
+    from alembic import op
+
+    with op.get_context().autocommit_block():
+        drop_index_online(op.get_bind(), index_name)
+
+
+def alter_column_not_null(table: str, column: str) -> None:
+    from alembic import op
+
+    with op.get_context().autocommit_block():
+        set_not_null_online(op.get_bind(), table, column)
@@ -3,5 +3,9 @@ from app.db.base_class import Base
 # Import all models 
 from app.models.user import User
 from app.models.course import Course
-from app.models.enrollment import Enrollment
+from app.models.enrollment import Enrollment, EnrollmentArchive
 
+from app.models.token import RevokedToken
+from app.models.idempotency import IdempotencyKey
+from app.models.waitlist import CourseWaitlist, WaitlistEntry
+from app.models.course_stats import CourseStats
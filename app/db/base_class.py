@@ -1,6 +1,10 @@
+from sqlalchemy import func
 from sqlalchemy.orm import DeclarativeBase
 
 
+# Naive UTC timestamp from the database clock (matches datetime.utcnow()).
+UTC_NOW = func.timezone("utc", func.now())
+
+
 class Base(DeclarativeBase):
     pass
-
@@ -0,0 +1,215 @@
+"""Maintenance for the range-partitioned ``enrollments`` table.
+
+Run from the project root, e.g. from cron:
+
+    python -m app.db.partitions create-partitions --months-ahead 3
+    python -m app.db.partitions archive --older-than-days 365
+"""
+import argparse
+import logging
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ENROLLMENT_COLUMNS = "id, user_id, course_id, created_at, completed, is_active, updated_at, reactivation_count"
+# Live rows also carry the cascade flags; suspended rows are never archived.
+LIVE_ENROLLMENT_COLUMNS = f"{ENROLLMENT_COLUMNS}, course_suspended, user_suspended"
+
+
+def is_partitioned(db: Session, table: str = "enrollments") -> bool:
+    return db.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = :table AND pg_table_is_visible(c.oid))"
+        ),
+        {"table": table},
+    ).scalar()
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date, table: str = "enrollments") -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def create_partition(db: Session, month: date, table: str = "enrollments") -> bool:
+    """Create the monthly partition starting at ``month`` if it is missing.
+
+    Rows that already landed in the default partition for that month are
+    moved into the new partition before it is attached, because Postgres
+    refuses to attach a range the default partition still holds rows for.
+    The (user_id, course_id) uniqueness cannot be declared on the parent
+    (it lacks the partition key), so each partition gets its own index.
+    """
+    name = partition_name(month, table)
+    if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+        return False
+
+    bounds = {"start": month, "end": add_months(month, 1)}
+    db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(
+        text(
+            f"WITH moved AS ("
+            f"DELETE FROM {table}_default WHERE created_at >= :start AND created_at < :end "
+            f"RETURNING {LIVE_ENROLLMENT_COLUMNS}) "
+            f"INSERT INTO {name} ({LIVE_ENROLLMENT_COLUMNS}) SELECT {LIVE_ENROLLMENT_COLUMNS} FROM moved"
+        ),
+        bounds,
+    )
+    db.execute(text(f"CREATE UNIQUE INDEX {name}_user_id_course_id_key ON {name} (user_id, course_id)"))
+    db.execute(
+        text(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+        )
+    )
+    return True
+
+
+def ensure_partitions(
+    db: Session,
+    *,
+    months_ahead: int = settings.ENROLLMENT_PARTITION_MONTHS_AHEAD,
+    today: date | None = None,
+    table: str = "enrollments",
+) -> list[str]:
+    """Create the current month's partition and ``months_ahead`` future ones.
+
+    A no-op on databases where the table is not partitioned (e.g. ones built
+    with ``Base.metadata.create_all``).
+    """
+    if not is_partitioned(db, table):
+        return []
+
+    current = month_start(today or datetime.utcnow().date())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if create_partition(db, month, table):
+            created.append(partition_name(month, table))
+    db.commit()
+    return created
+
+
+def archive_enrollments(
+    db: Session,
+    *,
+    before: datetime,
+    batch_size: int = 1000,
+    pause: float = 0.0,
+) -> int:
+    """Move inactive or completed enrollments created before ``before`` to
+    ``enrollments_archive``, one committed batch at a time. Enrollments
+    suspended by a cascade stay until their course or user is reactivated."""
+    moved = 0
+    while True:
+        result = db.execute(
+            text(
+                "WITH batch AS ("
+                "SELECT id, created_at FROM enrollments "
+                "WHERE created_at < :before AND (is_active = false OR completed = true) "
+                "AND NOT (course_suspended OR user_suspended) "
+                "LIMIT :batch_size), "
+                "moved AS ("
+                "DELETE FROM enrollments e USING batch b "
+                "WHERE e.id = b.id AND e.created_at = b.created_at "
+                "RETURNING e.*) "
+                f"INSERT INTO enrollments_archive ({ENROLLMENT_COLUMNS}, archived_at) "
+                f"SELECT {ENROLLMENT_COLUMNS}, now() FROM moved"
+            ),
+            {"before": before, "batch_size": batch_size},
+        )
+        db.commit()
+        if not result.rowcount:
+            return moved
+        moved += result.rowcount
+        logger.info("Archived %s enrollments (%s total)", result.rowcount, moved)
+        if pause:
+            time.sleep(pause)
+
+
+def drop_empty_partitions(db: Session, *, before: datetime, table: str = "enrollments") -> list[str]:
+    """Detach and drop monthly partitions that end before ``before`` and
+    were emptied by ``archive_enrollments``."""
+    if not is_partitioned(db, table):
+        return []
+
+    names = db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table AND c.relname LIKE :pattern ORDER BY c.relname"
+        ),
+        {"table": table, "pattern": f"{table}_p%"},
+    ).scalars().all()
+
+    dropped = []
+    for name in names:
+        month = datetime.strptime(name.rsplit("_p", 1)[1], "%Y%m")
+        if add_months(month.date(), 1) > before.date():
+            continue
+        if db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+            continue
+        db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        db.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    db.commit()
+    return dropped
+
+
+def main(argv: list[str] | None = None) -> None:
+    from app.db.session import SessionLocal
+    from app.db.shards import close_shard_sessions, shard_map
+
+    parser = argparse.ArgumentParser(description="Enrollment partition maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create-partitions", help="create upcoming monthly partitions")
+    create.add_argument("--months-ahead", type=int, default=settings.ENROLLMENT_PARTITION_MONTHS_AHEAD)
+
+    archive = commands.add_parser("archive", help="move cold enrollments to the archive table")
+    archive.add_argument("--older-than-days", type=int, default=settings.ENROLLMENT_ARCHIVE_AFTER_DAYS)
+    archive.add_argument("--batch-size", type=int, default=1000)
+    archive.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    db = SessionLocal()
+    try:
+        for session in shard_map.all_sessions(db):
+            if args.command == "create-partitions":
+                created = ensure_partitions(session, months_ahead=args.months_ahead)
+                logger.info("Created partitions: %s", ", ".join(created) or "none")
+            else:
+                before = datetime.utcnow() - timedelta(days=args.older_than_days)
+                moved = archive_enrollments(
+                    session,
+                    before=before,
+                    batch_size=args.batch_size,
+                    pause=args.pause,
+                )
+                dropped = drop_empty_partitions(session, before=before)
+                logger.info("Archived %s enrollments, dropped partitions: %s", moved, ", ".join(dropped) or "none")
+    finally:
+        close_shard_sessions(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,11 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
 
 engine = create_engine(settings.DATABASE_URL, future=True)
@@ -10,3 +16,126 @@ SessionLocal = sessionmaker(
     bind=engine,
 )
 
+
+# Seconds the replica is behind the primary; 0 when fully caught up and NULL
+# when the server is not a standby at all.
+REPLICA_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+class ReplicaRouter:
+    """Round-robins read-only sessions across the healthy replicas.
+
+    ``check`` probes every replica; the app runs it at startup and then every
+    ``check_interval`` in the background, so requests never wait on a
+    probe. A replica that cannot be reached or lags by more than ``max_lag``
+    seconds is skipped until a later probe succeeds, as is one reported
+    through ``mark_failed``. ``session()`` returns None when no replica is
+    available so the caller can fall back to the primary.
+    """
+
+    def __init__(self, urls: list[str], *, max_lag: float, check_interval: float):
+        self.engines = [
+            create_engine(
+                url,
+                future=True,
+                pool_pre_ping=True,
+                connect_args={"connect_timeout": 2},
+            )
+            for url in urls
+        ]
+        self._sessionmakers = [
+            sessionmaker(autocommit=False, autoflush=False, bind=replica)
+            for replica in self.engines
+        ]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        # Unknown until the first check.
+        self._healthy = [False] * len(self.engines)
+        self._cursor = itertools.count()
+
+    def _probe(self, index: int) -> bool:
+        try:
+            with self.engines[index].connect() as conn:
+                lag = conn.execute(REPLICA_LAG_SQL).scalar()
+        except SQLAlchemyError:
+            return False
+        return lag is None or float(lag) <= self.max_lag
+
+    def check(self) -> None:
+        for index in range(len(self.engines)):
+            self._healthy[index] = self._probe(index)
+
+    def mark_failed(self, session: Session) -> None:
+        """Take the replica behind ``session`` out of rotation until the
+        next check finds it healthy."""
+        index = session.info.get("replica")
+        if index is not None:
+            self._healthy[index] = False
+
+    def session(self) -> Session | None:
+        count = len(self.engines)
+        start = next(self._cursor)
+        for offset in range(count):
+            index = (start + offset) % count
+            if self._healthy[index]:
+                session = self._sessionmakers[index]()
+                session.info["replica"] = index
+                return session
+        return None
+
+
+class PrimaryPins:
+    """Remembers callers that recently committed a write.
+
+    Their reads stay on the primary for ``ttl`` seconds so they never observe
+    a replica that has not replayed their own write yet.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 100_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._pins: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def pin(self, key: str | None) -> None:
+        if not key:
+            return
+        with self._lock:
+            self._pins[key] = time.monotonic() + self.ttl
+            self._pins.move_to_end(key)
+            while len(self._pins) > self.max_entries:
+                self._pins.popitem(last=False)
+
+    def is_pinned(self, key: str | None) -> bool:
+        if not key:
+            return False
+        with self._lock:
+            expires = self._pins.get(key)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._pins[key]
+                return False
+            return True
+
+
+replica_router = ReplicaRouter(
+    settings.replica_urls,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.REPLICA_CHECK_INTERVAL_SECONDS,
+)
+
+primary_pins = PrimaryPins(ttl=settings.READ_YOUR_WRITES_SECONDS)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _pin_writer_to_primary(session: Session) -> None:
+    primary_pins.pin(session.info.get("pin_key"))
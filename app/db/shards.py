@@ -0,0 +1,72 @@
+from uuid import UUID
+
+from sqlalchemy import ForeignKeyConstraint, MetaData, create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.models.enrollment import Enrollment, EnrollmentArchive
+
+
+# Shards hold only the enrollment tables, so the copies used for their DDL
+# drop the foreign keys to users/courses, which live on the primary.
+shard_metadata = MetaData()
+for model in (Enrollment, EnrollmentArchive):
+    shard_table = model.__table__.to_metadata(shard_metadata)
+    shard_table.constraints = {
+        constraint
+        for constraint in shard_table.constraints
+        if not isinstance(constraint, ForeignKeyConstraint)
+    }
+    shard_table.foreign_keys.clear()
+    for column in shard_table.columns:
+        column.foreign_keys.clear()
+
+
+class ShardMap:
+    """Places enrollment rows on one of several databases by ``user_id``.
+
+    With no shard URLs configured every lookup resolves to the primary
+    session, so callers can route unconditionally.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.engines = [create_engine(url, future=True) for url in urls]
+        self._sessionmakers = [
+            sessionmaker(autocommit=False, autoflush=False, bind=shard)
+            for shard in self.engines
+        ]
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.engines)
+
+    def index_for(self, user_id: UUID) -> int:
+        return user_id.int % len(self.engines)
+
+    def create_schema(self) -> None:
+        for shard in self.engines:
+            shard_metadata.create_all(bind=shard)
+
+    def _session(self, db: Session, index: int) -> Session:
+        sessions = db.info.setdefault("shard_sessions", {})
+        if index not in sessions:
+            sessions[index] = self._sessionmakers[index]()
+        return sessions[index]
+
+    def session_for_user(self, db: Session, user_id: UUID) -> Session:
+        if not self.enabled:
+            return db
+        return self._session(db, self.index_for(user_id))
+
+    def all_sessions(self, db: Session) -> list[Session]:
+        if not self.enabled:
+            return [db]
+        return [self._session(db, index) for index in range(len(self.engines))]
+
+
+shard_map = ShardMap(settings.enrollment_shard_urls)
+
+
+def close_shard_sessions(db: Session) -> None:
+    for session in db.info.pop("shard_sessions", {}).values():
+        session.close()
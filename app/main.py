@@ -1,22 +1,141 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 
 from app.core.config import settings
-from app.db.session import engine
+from app.core.idempotency import IdempotencyMiddleware, idempotency_store
+from app.crud.analytics import refresh_enrollment_snapshot
+from app.crud.availability import availability, reconcile_seats
+from app.crud.stats import refresh_course_stats
+from app.core.revocation import revoked_tokens
+from app.core.security import shutdown_hash_pool
+from app.db.session import SessionLocal, engine, replica_router
 from app.db.base import Base
+from app.db.shards import shard_map
+
+from app.api.routes import users, courses, enrollments, auth, changes, waitlist, analytics
+
+logger = logging.getLogger(__name__)
+
+
+def _sync_revocations(purge: bool) -> None:
+    db = SessionLocal()
+    try:
+        if purge:
+            revoked_tokens.purge_expired(db)
+            idempotency_store.purge_expired(db)
+        revoked_tokens.sync(db)
+    finally:
+        db.close()
+
+
+async def _maintain_revocations() -> None:
+    # Picks up tokens revoked by other processes and garbage-collects the
+    # ones that have expired anyway, along with expired idempotency keys.
+    purged_at = time.monotonic()
+    while True:
+        await asyncio.sleep(settings.REVOCATION_SYNC_INTERVAL_SECONDS)
+        purge = time.monotonic() - purged_at >= settings.REVOCATION_PURGE_INTERVAL_SECONDS
+        try:
+            await run_in_threadpool(_sync_revocations, purge)
+        except Exception:
+            logger.exception("Refresh token revocation sync failed")
+            continue
+        if purge:
+            purged_at = time.monotonic()
+
+
+async def _maintain_replicas() -> None:
+    # Probes run here so that a slow or dead replica never delays a request.
+    while True:
+        await asyncio.sleep(settings.REPLICA_CHECK_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(replica_router.check)
+        except Exception:
+            logger.exception("Replica health check failed")
+
+
+async def _maintain_seat_counters() -> None:
+    while True:
+        await asyncio.sleep(settings.SEAT_COUNTER_RECONCILE_SECONDS)
+        try:
+            await run_in_threadpool(reconcile_seats)
+        except Exception:
+            logger.exception("Seat counter reconciliation failed")
+
+
+async def _maintain_course_stats() -> None:
+    refreshed_at = time.monotonic()
+    while True:
+        await asyncio.sleep(settings.COURSE_STATS_REFRESH_SECONDS)
+        full = time.monotonic() - refreshed_at >= settings.COURSE_STATS_FULL_REFRESH_SECONDS
+        try:
+            await run_in_threadpool(refresh_course_stats, full)
+        except Exception:
+            logger.exception("Course statistics refresh failed")
+            continue
+        if full:
+            refreshed_at = time.monotonic()
+
+
+async def _maintain_analytics() -> None:
+    # The first refresh can export every enrollment, so it runs here rather
+    # than holding up startup; the endpoints answer 503 until it is done.
+    while True:
+        try:
+            await run_in_threadpool(refresh_enrollment_snapshot)
+        except Exception:
+            logger.exception("Analytics snapshot refresh failed")
+        await asyncio.sleep(settings.ANALYTICS_REFRESH_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(_sync_revocations, False)
+    await run_in_threadpool(replica_router.check)
+    await run_in_threadpool(reconcile_seats)
+    await run_in_threadpool(refresh_course_stats, True)
+    tasks = [
+        asyncio.create_task(_maintain_revocations()),
+        asyncio.create_task(_maintain_replicas()),
+        asyncio.create_task(_maintain_seat_counters()),
+        asyncio.create_task(_maintain_course_stats()),
+        asyncio.create_task(_maintain_analytics()),
+    ]
+    availability.start()
+    yield
+    await availability.stop()
+    for task in tasks:
+        task.cancel()
+    shutdown_hash_pool()
 
-from app.api.routes import users, courses, enrollments, auth
 
 app = FastAPI(
     title=settings.APP_NAME,
     debug=settings.DEBUG,
+    lifespan=lifespan,
 )
 
 Base.metadata.create_all(bind=engine)
+shard_map.create_schema()
+
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=idempotency_store,
+    paths={"/enrollments/", "/users/", "/courses/"},
+)
 
 app.include_router(users.router, prefix="/users", tags=["Users"])
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(courses.router, prefix="/courses", tags=["Courses"])
 app.include_router(enrollments.router, prefix="/enrollments", tags=["Enrollments"])
+app.include_router(waitlist.router, prefix="/waitlist", tags=["Waitlist"])
+app.include_router(changes.router, prefix="/changes", tags=["Changes"])
+app.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
 
 @app.get("/")
 def read_root():
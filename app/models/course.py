@@ -1,18 +1,23 @@
 import uuid
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
+from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, Boolean, Index, text
 from sqlalchemy.orm import relationship
-from app.db.base_class import Base
+from app.db.base_class import Base, UTC_NOW
 from sqlalchemy.dialects.postgresql import UUID
 
 
 class Course(Base):
     __tablename__ = "courses"
+    __table_args__ = (
+        Index("ix_courses_code_active", "code", postgresql_where=text("is_active")),
+        Index("ix_courses_updated_at_id", "updated_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String(100), nullable=False)
     code = Column(String(20), unique=True, nullable=False, index=True)
     capacity = Column(Integer, nullable=False)
     is_active = Column(Boolean, default=True)
+    updated_at = Column(DateTime, nullable=False, server_default=UTC_NOW, onupdate=UTC_NOW)
 
 # Relationships
     enrollments = relationship(
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from app.db.base_class import Base, UTC_NOW
+
+
+class CourseStats(Base):
+    """Enrollment counts per course, recomputed from the enrollments by
+    ``app.crud.stats`` for the courses that changed. Rates are derived at
+    read time so that capacity edits need no refresh."""
+
+    __tablename__ = "course_stats"
+
+    course_id = Column(UUID(as_uuid=True), ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    # Live (unarchived) enrollment rows, active or not.
+    enrollment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    active_count = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_count = Column(Integer, nullable=False, default=0, server_default="0")
+    reactivation_count = Column(Integer, nullable=False, default=0, server_default="0")
+    refreshed_at = Column(DateTime, nullable=False, server_default=UTC_NOW)
@@ -1,13 +1,21 @@
 import uuid
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Boolean, Index, false, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
-from app.db.base_class import Base
+from app.db.base_class import Base, UTC_NOW
 
 class Enrollment(Base):
     __tablename__ = "enrollments"
+    __table_args__ = (
+        # One row per (user, course); re-enrolling reactivates it.
+        Index("uq_enrollments_user_id_course_id", "user_id", "course_id", unique=True),
+        # Seat counting only ever looks at active rows.
+        Index("ix_enrollments_course_id_active", "course_id", postgresql_where=text("is_active")),
+        # Keyset order of the change feed.
+        Index("ix_enrollments_updated_at_id", "updated_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
@@ -17,7 +25,35 @@ class Enrollment(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     completed = Column(Boolean, default=False, nullable=False)
     is_active = Column(Boolean, nullable=False, default=True)
+    # Set on enrollments deactivated by a cascading course or user
+    # deactivation, so that reactivating it restores exactly those.
+    course_suspended = Column(Boolean, nullable=False, default=False, server_default=false())
+    user_suspended = Column(Boolean, nullable=False, default=False, server_default=false())
+    # Times a deregistered enrollment was taken up again.
+    reactivation_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Database time, so change-feed cursors compare against one clock.
+    updated_at = Column(DateTime, nullable=False, server_default=UTC_NOW, onupdate=UTC_NOW)
 
     # Relationships
     user = relationship("User", back_populates="enrollments")
-    course = relationship("Course", back_populates="enrollments")
\ No newline at end of file
+    course = relationship("Course", back_populates="enrollments")
+
+class EnrollmentArchive(Base):
+    """Cold enrollments moved out of the partitioned hot table."""
+
+    __tablename__ = "enrollments_archive"
+    __table_args__ = (
+        # Incremental exports of the analytics snapshot.
+        Index("ix_enrollments_archive_updated_at", "updated_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    course_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+
+    created_at = Column(DateTime, nullable=False)
+    completed = Column(Boolean, nullable=False)
+    is_active = Column(Boolean, nullable=False)
+    updated_at = Column(DateTime, nullable=False, server_default=UTC_NOW)
+    reactivation_count = Column(Integer, nullable=False, default=0, server_default="0")
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, LargeBinary, SmallInteger, String
+from app.db.base_class import Base
+
+
+class IdempotencyKey(Base):
+    """First response to a request sent with an ``Idempotency-Key`` header.
+
+    ``status_code`` is NULL while the first request is still running.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    # sha256 over the caller, route and client-supplied key.
+    key = Column(LargeBinary(32), primary_key=True)
+    # sha256 of the request body, to reject a key reused for another request.
+    fingerprint = Column(LargeBinary(32), nullable=False)
+    status_code = Column(SmallInteger, nullable=True)
+    content_type = Column(String(100), nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, DateTime, func
+from sqlalchemy.dialects.postgresql import UUID
+from app.db.base_class import Base
+
+
+class RevokedToken(Base):
+    """Refresh token ids that may no longer be exchanged.
+
+    Rows are only needed until the token would have expired anyway.
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(UUID(as_uuid=True), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    # Database time, so every process syncs against the same clock.
+    revoked_at = Column(DateTime, nullable=False, server_default=func.now(), index=True)
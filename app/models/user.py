@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 from sqlalchemy.dialects.postgresql import UUID
@@ -15,6 +15,8 @@ class User(Base):
 
     role = Column(String(20), nullable=False)  # "student" or "admin"
     is_active = Column(Boolean, default=True)
+    # Embedded in access tokens; bumping it revokes every outstanding token.
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
 
     enrollments = relationship("Enrollment", back_populates="user", cascade="all, delete-orphan")
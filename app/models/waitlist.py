@@ -0,0 +1,32 @@
+import uuid
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from app.db.base_class import Base, UTC_NOW
+
+
+class CourseWaitlist(Base):
+    """Position counters of a course's waitlist.
+
+    Waiting entries always hold the dense positions ``head`` to ``tail - 1``,
+    so a student's place in line is ``position - head + 1``.
+    """
+
+    __tablename__ = "course_waitlists"
+
+    course_id = Column(UUID(as_uuid=True), ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    head = Column(BigInteger, nullable=False, default=0, server_default="0")
+    tail = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+
+class WaitlistEntry(Base):
+    __tablename__ = "waitlist_entries"
+    __table_args__ = (
+        Index("ix_waitlist_entries_course_id_position", "course_id", "position"),
+        Index("uq_waitlist_entries_user_id_course_id", "user_id", "course_id", unique=True),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    course_id = Column(UUID(as_uuid=True), ForeignKey("courses.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    position = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=UTC_NOW)
@@ -0,0 +1,49 @@
+from datetime import date, datetime
+from typing import Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class HourlyCount(BaseModel):
+    hour: datetime
+    count: int
+
+
+class EnrollmentHourly(BaseModel):
+    # When the snapshot the figures come from was last refreshed.
+    as_of: datetime
+    course_id: Optional[UUID] = None
+    hours: list[HourlyCount]
+
+
+class CourseFill(BaseModel):
+    course_id: UUID
+    code: str
+    capacity: int
+    enrollment_count: int
+    first_enrollment_at: Optional[datetime] = None
+    # When the capacity-th enrollment was created; None while it has not been.
+    filled_at: Optional[datetime] = None
+    seconds_to_fill: Optional[float] = None
+
+
+class CourseFillPage(BaseModel):
+    as_of: datetime
+    items: list[CourseFill]
+
+
+class CompletionCohort(BaseModel):
+    # First day of the week (a Monday) or month.
+    cohort: date
+    enrollment_count: int
+    active_count: int
+    completed_count: int
+    completion_rate: float
+
+
+class CompletionCohorts(BaseModel):
+    as_of: datetime
+    period: str
+    course_id: Optional[UUID] = None
+    cohorts: list[CompletionCohort]
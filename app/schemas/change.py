@@ -0,0 +1,18 @@
+from typing import Literal, Union
+
+from pydantic import BaseModel
+
+from app.schemas.course import CourseRead
+from app.schemas.enrollment import EnrollmentRead
+
+
+class Change(BaseModel):
+    type: Literal["course", "enrollment"]
+    data: Union[CourseRead, EnrollmentRead]
+
+
+class ChangePage(BaseModel):
+    changes: list[Change]
+    # Pass back as ?since= to continue; unchanged when nothing new arrived.
+    next_cursor: str
+    has_more: bool
@@ -1,4 +1,5 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, model_validator
+from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
@@ -25,6 +26,53 @@ class CourseRead(CourseBase):
 
 class CourseStatusUpdate(BaseModel):
     is_active: bool
+    # Also deactivate (or restore) the course's enrollments.
+    cascade: bool = False
 
+class CourseStatusRead(CourseRead):
+    enrollments_changed: int = 0
 
-    
+class CourseStatusBatchUpdate(BaseModel):
+    is_active: bool
+    ids: list[UUID] = []
+    codes: list[str] = []
+    # As for CourseStatusUpdate, for every course whose status changes.
+    cascade: bool = False
+
+    @model_validator(mode="after")
+    def check_targets(self):
+        if not self.ids and not self.codes:
+            raise ValueError("Send ids and/or codes")
+        return self
+
+class CourseBatch(BaseModel):
+    items: dict[UUID, CourseRead]
+    missing: list[UUID]
+
+class CourseAvailability(BaseModel):
+    course_id: UUID
+    capacity: int
+    enrolled: int
+    available: int
+    is_active: bool
+
+class CourseAvailabilityBatch(BaseModel):
+    items: dict[UUID, CourseAvailability]
+    missing: list[UUID]
+
+class CourseStatsRead(BaseModel):
+    course_id: UUID
+    code: str
+    title: str
+    capacity: int
+    is_active: bool
+    enrollment_count: int
+    active_count: int
+    completed_count: int
+    reactivation_count: int
+    # Active enrollments per seat; None for a course without capacity.
+    fill_rate: Optional[float] = None
+    # Completed share of all enrollments; None before the first one.
+    completion_rate: Optional[float] = None
+    # None until the course's first refresh.
+    refreshed_at: Optional[datetime] = None
@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+from app.schemas.enrollment import CourseSummary, EnrollmentBase
+from app.schemas.user import UserRead
+
+
+class DashboardEnrollment(EnrollmentBase):
+    id: UUID
+    course_id: UUID
+    completed: bool
+    created_at: datetime
+    course: Optional[CourseSummary] = Field(default=None, validation_alias="expanded_course")
+    seats_taken: int
+    seats_available: int
+
+
+class Dashboard(BaseModel):
+    profile: UserRead
+    enrollments: list[DashboardEnrollment]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from datetime import datetime
 from typing import Optional
 from uuid import UUID
@@ -10,6 +10,8 @@ class EnrollmentBase(BaseModel):
 # 2. CREATE
 class EnrollmentCreate(EnrollmentBase):
     course_id: UUID
+    # Join the course's waitlist instead of failing when it is full.
+    waitlist: bool = False
 
 class EnrollmentCreateAdmin(EnrollmentBase):
     user_id: UUID
@@ -20,7 +22,34 @@ class EnrollmentUpdate(EnrollmentBase):
     completed: Optional[bool] = None
     is_active: Optional[bool] = None
 
+class EnrollmentCompletion(EnrollmentBase):
+    """Either ``enrollment_ids``, or ``course_id`` with ``user_ids``."""
+    enrollment_ids: Optional[list[UUID]] = None
+    course_id: Optional[UUID] = None
+    user_ids: Optional[list[UUID]] = None
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if self.enrollment_ids is not None:
+            valid = self.course_id is None and self.user_ids is None
+        else:
+            valid = self.course_id is not None and self.user_ids is not None
+        if not valid:
+            raise ValueError("Send enrollment_ids, or course_id together with user_ids")
+        return self
+
 # 4. READ
+class CourseSummary(EnrollmentBase):
+    id: UUID
+    title: str
+    code: str
+    capacity: int
+
+class UserSummary(EnrollmentBase):
+    id: UUID
+    name: str
+    email: str
+
 class EnrollmentRead(EnrollmentBase):
     id: UUID
     user_id: UUID
@@ -28,6 +57,10 @@ class EnrollmentRead(EnrollmentBase):
     completed: bool
     is_active: bool
     created_at: datetime
+    # Only filled in for ?expand=...; read from attributes set by
+    # CRUDEnrollment.expand so serializing never triggers a lazy load.
+    course: Optional[CourseSummary] = Field(default=None, validation_alias="expanded_course")
+    user: Optional[UserSummary] = Field(default=None, validation_alias="expanded_user")
 
 class EnrollmentStatusRead(EnrollmentBase):
     id: UUID
@@ -28,6 +28,8 @@ class UserUpdateAdmin(UserBase):
 
 class UserStatusUpdate(BaseModel):
     is_active: bool
+    # Also deactivate (or restore) the user's enrollments.
+    cascade: bool = False
 
 
 class UserRead(UserBase):
@@ -35,4 +37,13 @@ class UserRead(UserBase):
     name: str
     email: EmailStr
     role: str
-    is_active: bool
\ No newline at end of file
+    is_active: bool
+
+
+class UserStatusRead(UserRead):
+    enrollments_changed: int = 0
+
+
+class UserBatch(BaseModel):
+    items: dict[UUID, UserRead]
+    missing: list[UUID]
@@ -0,0 +1,15 @@
+from datetime import datetime
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class WaitlistCreate(BaseModel):
+    course_id: UUID
+
+
+class WaitlistRead(BaseModel):
+    course_id: UUID
+    # 1 for the next student to get a seat.
+    position: int
+    created_at: datetime
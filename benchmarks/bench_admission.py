@@ -0,0 +1,97 @@
+"""Enrolling into one hot course: no locking vs a course row lock vs the
+in-process admission queue, alone and draining group-committed batches.
+
+    DATABASE_URL=postgresql://... SECRET_KEY=x \\
+        python benchmarks/bench_admission.py [--threads 32] [--requests 2000]
+
+Needs a database with the schema applied; see bench_group_commit.py. The
+course has seats for half of the requests, so every approach also has to
+turn the rest away. "oversold" counts active enrollments beyond capacity.
+"""
+import argparse
+
+from fastapi import HTTPException
+
+from bench_group_commit import report, run, setup, teardown
+from app.core.admission import AdmissionQueue, KeyClosed
+from app.crud.enrollment import enrollment_crud
+from app.db.session import SessionLocal
+from app.models.course import Course
+
+
+def unlocked(db, pair):
+    enrollment_crud.enroll(db, user_id=pair[0], course_id=pair[1])
+
+
+def row_lock(db, pair):
+    # Serialize on the course row for the whole enroll transaction.
+    db.query(Course).filter(Course.id == pair[1]).with_for_update().one()
+    try:
+        enrollment_crud.enroll(db, user_id=pair[0], course_id=pair[1])
+    finally:
+        db.rollback()
+
+
+def admission_queue(max_batch: int, *, group_commit: bool = False):
+    def execute(items):
+        course_id = items[0][2]
+        if group_commit:
+            results = enrollment_crud.enroll_many(items[0][0], [(user_id, course_id) for _, user_id, _ in items])
+        else:
+            results = []
+            for db, user_id, _ in items:
+                try:
+                    results.append(enrollment_crud.enroll(db, user_id=user_id, course_id=course_id))
+                except HTTPException as error:
+                    results.append(error)
+        if any(isinstance(result, HTTPException) and result.detail == "Course is full" for result in results):
+            queue.close(course_id, 60)
+        return results
+
+    queue = AdmissionQueue(execute, depth=100_000, max_batch=max_batch)
+
+    def enroll(db, pair):
+        try:
+            queue.submit(pair[1], (db, *pair))
+        except KeyClosed:
+            pass
+
+    return enroll
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    modes = {
+        "no lock": unlocked,
+        "row lock": row_lock,
+        "admission queue": admission_queue(max_batch=1),
+        "queue + batches": admission_queue(max_batch=64, group_commit=True),
+    }
+    for name, enroll in modes.items():
+        user_ids, course_ids = setup(args.requests, 1)
+        capacity = args.requests // 2
+        db = SessionLocal()
+        db.query(Course).filter(Course.id == course_ids[0]).update({"capacity": capacity})
+        db.commit()
+
+        def attempt(db, pair, enroll=enroll):
+            try:
+                enroll(db, pair)
+            except HTTPException:
+                pass
+
+        try:
+            report(name, *run(attempt, [(user_id, course_ids[0]) for user_id in user_ids], args.threads))
+            oversold = enrollment_crud.active_count(db, course_ids[0]) - capacity
+            print(f"{'':>16}  oversold: {max(oversold, 0)}")
+        finally:
+            db.close()
+            teardown(user_ids, course_ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Building and querying the columnar enrollment analytics snapshot.
+
+    DATABASE_URL=postgresql://... SECRET_KEY=x \\
+        python benchmarks/bench_analytics.py [--rows 1000000] [--courses 500]
+
+Needs a database with the schema applied; see bench_group_commit.py. Users,
+courses and enrollments spread over the past year are inserted with
+generate_series and deleted afterwards. The snapshot is written to a
+temporary directory: a full export, then an incremental refresh after a
+tenth of the enrollments are completed, then each aggregation.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+
+import app.db.base  # noqa: E402,F401  (registers every model)
+from app.core.security import DUMMY_PASSWORD_HASH  # noqa: E402
+from app.crud.analytics import EnrollmentSnapshot  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+
+
+def setup(db, rows: int, courses: int, tag: str) -> None:
+    db.execute(
+        text(
+            "INSERT INTO courses (id, title, code, capacity) "
+            "SELECT gen_random_uuid(), 'Bench', 'BA' || :tag || n, :capacity FROM generate_series(1, :courses) n"
+        ),
+        {"tag": tag, "courses": courses, "capacity": rows // courses},
+    )
+    db.execute(
+        text(
+            "INSERT INTO users (id, name, email, hashed_password, role) "
+            "SELECT gen_random_uuid(), 'Bench', 'bench-' || :tag || '-' || n || '@example.com', :hash, 'student' "
+            "FROM generate_series(1, :rows) n"
+        ),
+        {"tag": tag, "hash": DUMMY_PASSWORD_HASH, "rows": rows},
+    )
+    db.execute(
+        text(
+            "INSERT INTO enrollments (id, user_id, course_id, created_at, completed, is_active) "
+            "SELECT gen_random_uuid(), u.id, c.ids[1 + (u.n % :courses)], "
+            "timezone('utc', now()) - random() * interval '365 days', false, true "
+            "FROM (SELECT id, row_number() OVER () AS n FROM users WHERE email LIKE 'bench-' || :tag || '-%') u, "
+            "(SELECT array_agg(id) AS ids FROM courses WHERE code LIKE 'BA' || :tag || '%') c"
+        ),
+        {"tag": tag, "courses": courses},
+    )
+    db.commit()
+
+
+def complete_some(db, tag: str) -> None:
+    db.execute(
+        text(
+            "UPDATE enrollments SET completed = true, updated_at = timezone('utc', now()) "
+            "WHERE course_id IN (SELECT id FROM courses WHERE code LIKE 'BA' || :tag || '%') AND random() < 0.1"
+        ),
+        {"tag": tag},
+    )
+    db.commit()
+
+
+def teardown(db, tag: str) -> None:
+    db.execute(
+        text("DELETE FROM enrollments WHERE course_id IN (SELECT id FROM courses WHERE code LIKE 'BA' || :tag || '%')"),
+        {"tag": tag},
+    )
+    db.execute(text("DELETE FROM courses WHERE code LIKE 'BA' || :tag || '%'"), {"tag": tag})
+    db.execute(text("DELETE FROM users WHERE email LIKE 'bench-' || :tag || '-%'"), {"tag": tag})
+    db.commit()
+
+
+def timed(name: str, call):
+    start = time.perf_counter()
+    result = call()
+    print(f"{name:>22}: {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--courses", type=int, default=500)
+    args = parser.parse_args()
+
+    tag = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    setup(db, args.rows, args.courses, tag)
+    try:
+        with tempfile.TemporaryDirectory() as path:
+            snapshot = EnrollmentSnapshot(path)
+            added = timed("full export", lambda: snapshot.refresh(db))
+            print(f"{'':>22}  {added} rows")
+            complete_some(db, tag)
+            timed("incremental refresh", lambda: snapshot.refresh(db))
+
+            now = datetime.utcnow()
+            timed("hourly, 30 days", lambda: snapshot.hourly(now - timedelta(days=30), now))
+            capacities = {
+                course_id: capacity
+                for course_id, capacity in db.execute(
+                    text("SELECT id, capacity FROM courses WHERE code LIKE 'BA' || :tag || '%'"), {"tag": tag}
+                )
+            }
+            timed("time to fill", lambda: snapshot.time_to_fill(capacities))
+            timed("weekly cohorts", lambda: snapshot.completion_cohorts("week"))
+            timed("monthly cohorts", lambda: snapshot.completion_cohorts("month"))
+    finally:
+        teardown(db, tag)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Marking a term's worth of enrollments completed in one bulk call.
+
+    DATABASE_URL=postgresql://... SECRET_KEY=x \\
+        python benchmarks/bench_bulk_complete.py [--rows 100000] [--batch-size 5000]
+
+Needs a database with the schema applied; see bench_group_commit.py. Users,
+courses and enrollments are inserted with generate_series, completed both
+by enrollment id and by course plus user ids, then deleted.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+
+import app.db.base  # noqa: E402,F401  (registers every model)
+from app.core.security import DUMMY_PASSWORD_HASH  # noqa: E402
+from app.crud.enrollment import enrollment_crud  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+
+
+def setup(db, rows: int, tag: str) -> tuple[uuid.UUID, list[uuid.UUID], list[uuid.UUID]]:
+    course_id = uuid.uuid4()
+    db.execute(
+        text("INSERT INTO courses (id, title, code, capacity) VALUES (:id, 'Bench', :code, :rows)"),
+        {"id": course_id, "code": f"BC{tag}", "rows": rows},
+    )
+    db.execute(
+        text(
+            "INSERT INTO users (id, name, email, hashed_password, role) "
+            "SELECT gen_random_uuid(), 'Bench', 'bench-' || :tag || '-' || n || '@example.com', :hash, 'student' "
+            "FROM generate_series(1, :rows) n"
+        ),
+        {"tag": tag, "hash": DUMMY_PASSWORD_HASH, "rows": rows},
+    )
+    db.execute(
+        text(
+            "INSERT INTO enrollments (id, user_id, course_id, created_at, completed, is_active) "
+            "SELECT gen_random_uuid(), id, :course_id, now(), false, true FROM users "
+            "WHERE email LIKE 'bench-' || :tag || '-%'"
+        ),
+        {"course_id": course_id, "tag": tag},
+    )
+    db.commit()
+    enrollments = db.execute(
+        text("SELECT id, user_id FROM enrollments WHERE course_id = :course_id"), {"course_id": course_id}
+    ).all()
+    return course_id, [row.id for row in enrollments], [row.user_id for row in enrollments]
+
+
+def reset(db, course_id: uuid.UUID) -> None:
+    db.execute(text("UPDATE enrollments SET completed = false WHERE course_id = :id"), {"id": course_id})
+    db.commit()
+
+
+def teardown(db, course_id: uuid.UUID, tag: str) -> None:
+    db.execute(text("DELETE FROM enrollments WHERE course_id = :id"), {"id": course_id})
+    db.execute(text("DELETE FROM courses WHERE id = :id"), {"id": course_id})
+    db.execute(text("DELETE FROM users WHERE email LIKE 'bench-' || :tag || '-%'"), {"tag": tag})
+    db.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    tag = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    course_id, enrollment_ids, user_ids = setup(db, args.rows, tag)
+    try:
+        modes = {
+            "by enrollment id": {"enrollment_ids": enrollment_ids},
+            "by course + user": {"course_id": course_id, "user_ids": user_ids},
+        }
+        for name, target in modes.items():
+            reset(db, course_id)
+            start = time.perf_counter()
+            outcomes = Counter(
+                result["status"]
+                for result in enrollment_crud.complete_many(db, batch_size=args.batch_size, **target)
+            )
+            elapsed = time.perf_counter() - start
+            print(f"{name:>17}: {args.rows} rows in {elapsed:6.2f} s   {dict(outcomes)}")
+    finally:
+        teardown(db, course_id, tag)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Enrollment throughput and latency: one commit per request vs group commit.
+
+    DATABASE_URL=postgresql://... SECRET_KEY=x \\
+        python benchmarks/bench_group_commit.py [--threads 32] [--requests 2000]
+
+Needs a database with the schema applied. It creates its own users and
+courses and deletes them afterwards. Each simulated request runs on its own
+session from the pool, as a route handler would.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.db.base  # noqa: E402,F401  (registers every model)
+from app.core.group_commit import GroupCommitter  # noqa: E402
+from app.core.security import DUMMY_PASSWORD_HASH  # noqa: E402
+from app.crud.enrollment import enrollment_crud  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+from app.models.course import Course  # noqa: E402
+from app.models.enrollment import Enrollment  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+def setup(requests: int, courses: int) -> tuple[list[uuid.UUID], list[uuid.UUID]]:
+    tag = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        users = [
+            User(name="Bench", email=f"bench-{tag}-{n}@example.com", hashed_password=DUMMY_PASSWORD_HASH, role="student")
+            for n in range(requests)
+        ]
+        course_rows = [
+            Course(title="Bench", code=f"B{tag}{n}", capacity=requests) for n in range(courses)
+        ]
+        db.add_all(users + course_rows)
+        db.commit()
+        return [user.id for user in users], [course.id for course in course_rows]
+    finally:
+        db.close()
+
+
+def teardown(user_ids: list[uuid.UUID], course_ids: list[uuid.UUID]) -> None:
+    db = SessionLocal()
+    try:
+        db.query(Enrollment).filter(Enrollment.course_id.in_(course_ids)).delete(synchronize_session=False)
+        db.query(User).filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+        db.query(Course).filter(Course.id.in_(course_ids)).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def run(enroll, pairs: list[tuple[uuid.UUID, uuid.UUID]], threads: int) -> tuple[float, list[float]]:
+    latencies: list[float] = []
+    lock = threading.Lock()
+    work = iter(pairs)
+
+    def worker() -> None:
+        while True:
+            with lock:
+                pair = next(work, None)
+            if pair is None:
+                return
+            db = SessionLocal()
+            start = time.perf_counter()
+            try:
+                enroll(db, pair)
+            finally:
+                db.close()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def report(name: str, elapsed: float, latencies: list[float]) -> None:
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{name:>16}: {len(latencies) / elapsed:8.0f} enroll/s   p50 {p50:6.1f} ms   p99 {p99:6.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--courses", type=int, default=10)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    batcher = GroupCommitter(
+        enrollment_crud.enroll_many,
+        window=args.window_ms / 1000,
+        max_batch=args.max_batch,
+    )
+    modes = {
+        "per-request": lambda db, pair: enrollment_crud.enroll(db, user_id=pair[0], course_id=pair[1]),
+        "group commit": lambda db, pair: batcher.submit(db, pair),
+    }
+    for name, enroll in modes.items():
+        user_ids, course_ids = setup(args.requests, args.courses)
+        try:
+            pairs = [(user_id, course_ids[n % len(course_ids)]) for n, user_id in enumerate(user_ids)]
+            report(name, *run(enroll, pairs, args.threads))
+        finally:
+            teardown(user_ids, course_ids)
+
+
+if __name__ == "__main__":
+    main()
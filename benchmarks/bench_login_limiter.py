@@ -0,0 +1,54 @@
+"""Per-call overhead of the login token-bucket limiter.
+
+    python benchmarks/bench_login_limiter.py [--max-us 20]
+
+Exits non-zero if the slowest scenario averages more than ``--max-us``
+microseconds per ``acquire``.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.rate_limit import TokenBucketLimiter  # noqa: E402
+
+
+def bench(keys: list[str], *, max_entries: int, rounds: int) -> float:
+    limiter = TokenBucketLimiter(rate=5 / 60, burst=5, max_entries=max_entries)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for key in keys:
+            limiter.acquire(key)
+    elapsed = time.perf_counter() - start
+    return elapsed / (rounds * len(keys)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-us", type=float, default=20.0)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    scenarios = {
+        # One account hammered repeatedly: hot bucket, always rejected.
+        "single key": (["victim@example.com"], 100_000, 200_000),
+        # Stuffing across many accounts that fit in the table.
+        "10k keys": ([f"user{n}@example.com" for n in range(10_000)], 100_000, 20),
+        # More keys than the table holds: every call inserts and evicts.
+        "eviction": ([f"user{rng.random()}@example.com" for _ in range(200_000)], 100_000, 1),
+    }
+    worst = 0.0
+    for name, (keys, max_entries, rounds) in scenarios.items():
+        per_call = bench(keys, max_entries=max_entries, rounds=rounds)
+        worst = max(worst, per_call)
+        print(f"{name:>12}: {per_call:6.2f} us/acquire")
+
+    if worst > args.max_us:
+        sys.exit(f"limiter overhead {worst:.2f} us exceeds {args.max_us} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,18 @@
 import os
+import tempfile
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+# Keep the analytics snapshot the app refreshes in the background out of the tree.
+os.environ.setdefault("ANALYTICS_SNAPSHOT_DIR", tempfile.mkdtemp(prefix="edutrack-analytics-"))
+
 from app.main import app
-from app.api.deps import get_db
+from app.api.deps import get_db, get_read_db
+from app.api.routes.auth import account_login_limiter, ip_login_limiter
+from app.crud.availability import seat_counters
+from app.crud.stats import course_statistics
 from app.db.base import Base
 
 from app.core.security import create_access_token
@@ -44,6 +51,18 @@ def db():
     transaction.rollback()
     connection.close()
 
+@pytest.fixture(autouse=True)
+def reset_login_limits():
+    yield
+    account_login_limiter.clear()
+    ip_login_limiter.clear()
+
+@pytest.fixture(autouse=True)
+def reset_seat_counters():
+    yield
+    seat_counters.clear()
+    course_statistics.clear()
+
 # -----------------------
 # Base client
 # -----------------------
@@ -53,6 +72,7 @@ def client(db):
         yield db
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
@@ -0,0 +1,131 @@
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+from app.api.routes import analytics
+from app.crud.analytics import EXPORT_ROW, EnrollmentSnapshot, parse_copy
+from app.crud.course import crud_course
+from app.crud.enrollment import enrollment_crud
+from app.crud.user import crud_user
+from app.models.enrollment import Enrollment
+from app.schemas.course import CourseCreate
+from app.schemas.user import UserCreate
+
+
+@pytest.fixture
+def snapshot(tmp_path, monkeypatch):
+    snapshot = EnrollmentSnapshot(str(tmp_path))
+    monkeypatch.setattr(analytics, "enrollment_snapshot", snapshot)
+    return snapshot
+
+
+def _enroll(db, course, created_ats):
+    enrollments = []
+    for created_at in created_ats:
+        stamp = f"{created_at:%Y%m%d%H%M}"
+        user = crud_user.create(
+            db=db,
+            obj_in=UserCreate(
+                email=f"cohort-{course.code}-{stamp}@example.com",
+                password="testpass123",
+                name="Cohort",
+                role="student",
+            ),
+        )
+        enrollment = enrollment_crud.enroll(db, user_id=user.id, course_id=course.id)
+        db.query(Enrollment).filter(Enrollment.id == enrollment.id).update({"created_at": created_at})
+        enrollments.append(enrollment)
+    db.commit()
+    return enrollments
+
+
+def test_analytics_not_ready(admin_client, snapshot):
+    response = admin_client.get("/analytics/completion-cohorts")
+    assert response.status_code == 503
+
+
+def test_enrollments_hourly(admin_client, db, snapshot, test_course):
+    _enroll(db, test_course, [
+        datetime(2026, 9, 1, 9, 5),
+        datetime(2026, 9, 1, 9, 55),
+        datetime(2026, 9, 1, 11, 30),
+        datetime(2026, 9, 2, 9, 0),
+    ])
+    assert snapshot.refresh(db) == 4
+
+    response = admin_client.get(
+        "/analytics/enrollments/hourly",
+        params={"start": "2026-09-01T09:30:00", "end": "2026-09-01T12:00:00", "course_id": str(test_course.id)},
+    )
+    assert response.status_code == 200
+    assert response.json()["hours"] == [
+        {"hour": "2026-09-01T09:00:00", "count": 2},
+        {"hour": "2026-09-01T10:00:00", "count": 0},
+        {"hour": "2026-09-01T11:00:00", "count": 1},
+    ]
+
+    response = admin_client.get(
+        "/analytics/enrollments/hourly", params={"start": "2026-01-01T00:00:00", "end": "2026-12-31T00:00:00"}
+    )
+    assert response.status_code == 400
+
+
+def test_refresh_patches_changed_rows(admin_client, db, snapshot, test_course):
+    first, second = _enroll(db, test_course, [datetime(2026, 9, 1, 9), datetime(2026, 9, 8, 9)])
+    assert snapshot.refresh(db) == 2
+
+    list(enrollment_crud.complete_many(db, enrollment_ids=[first.id]))
+    _enroll(db, test_course, [datetime(2026, 9, 20, 9)])
+    assert snapshot.refresh(db) == 1
+    assert len(snapshot.store.read()[0]["id"]) == 3
+
+    response = admin_client.get("/analytics/completion-cohorts", params={"period": "week"})
+    assert response.status_code == 200
+    assert [
+        (cohort["cohort"], cohort["enrollment_count"], cohort["completed_count"])
+        for cohort in response.json()["cohorts"]
+    ] == [("2026-08-31", 1, 1), ("2026-09-07", 1, 0), ("2026-09-14", 1, 0)]
+
+    cohorts = snapshot.completion_cohorts("month", test_course.id)
+    assert cohorts == [{
+        "cohort": date(2026, 9, 1),
+        "enrollment_count": 3,
+        "active_count": 3,
+        "completed_count": 1,
+        "completion_rate": 1 / 3,
+    }]
+
+
+def test_courses_time_to_fill(admin_client, db, snapshot, test_course):
+    tiny = crud_course.create(db, obj_in=CourseCreate(title="Tiny", code="TINY1", capacity=2))
+    _enroll(db, tiny, [datetime(2026, 9, 1, 10), datetime(2026, 9, 1, 9)])
+    _enroll(db, test_course, [datetime(2026, 9, 1, 9)])
+    snapshot.refresh(db)
+
+    response = admin_client.get("/analytics/courses/time-to-fill")
+    assert response.status_code == 200
+    fills = {item["code"]: item for item in response.json()["items"]}
+    assert fills["TINY1"] | {"course_id": None} == {
+        "course_id": None,
+        "code": "TINY1",
+        "capacity": 2,
+        "enrollment_count": 2,
+        "first_enrollment_at": "2026-09-01T09:00:00",
+        "filled_at": "2026-09-01T10:00:00",
+        "seconds_to_fill": 3600.0,
+    }
+    assert fills["CS101"]["enrollment_count"] == 1
+    assert fills["CS101"]["filled_at"] is None
+
+
+def test_analytics_student_forbidden(student_client, snapshot):
+    assert student_client.get("/analytics/completion-cohorts").status_code == 403
+
+
+def test_parse_copy_rejects_other_streams():
+    with pytest.raises(ValueError):
+        parse_copy(b"id,course_id\n")
+    header = b"PGCOPY\n\xff\r\n\0" + bytes(8)
+    assert parse_copy(header + b"\xff\xff").dtype == EXPORT_ROW
+    with pytest.raises(ValueError):
+        parse_copy(header + np.zeros(1, dtype=EXPORT_ROW).tobytes()[:-1] + b"\xff\xff")
@@ -1,6 +1,14 @@
 import pytest
 from fastapi.testclient import TestClient
-from uuid import UUID
+from datetime import datetime, timedelta
+from uuid import UUID, uuid4
+
+from app.core import security
+from app.core.config import settings
+from app.core.rate_limit import TokenBucketLimiter
+from app.core.revocation import RevocationStore
+from app.models.token import RevokedToken
+from tests.utils import capture_statements
 
 
 def test_login_success(client, student_user, test_password):
@@ -56,17 +64,151 @@ def test_login_inactive_user(client, db, student_user):
     db.commit()
 
 
-def test_refresh_token_success(client, student_token):
-    payload = {"refresh_token": student_token}
+def test_refresh_token_success(client, student_user, test_password):
+    tokens = client.post(
+        "/auth/login",
+        data={"username": student_user.email, "password": test_password},
+    ).json()
+    payload = {"refresh_token": tokens["refresh_token"]}
     response = client.post("/auth/refresh", json=payload)
     
     assert response.status_code == 200
     assert "access_token" in response.json()
 
 
+def test_refresh_token_rotates(client, student_user, test_password):
+    tokens = client.post(
+        "/auth/login",
+        data={"username": student_user.email, "password": test_password},
+    ).json()
+
+    rotated = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    reused = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    assert rotated.status_code == 200
+    assert reused.status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": rotated.json()["refresh_token"]}).status_code == 200
+
+
+def test_access_and_refresh_tokens_are_not_interchangeable(client, student_user, student_token, test_password):
+    tokens = client.post(
+        "/auth/login",
+        data={"username": student_user.email, "password": test_password},
+    ).json()
+
+    assert client.post("/auth/refresh", json={"refresh_token": student_token}).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["access_token"]}).status_code == 401
+    response = client.get("/users/me", headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+    assert response.status_code == 401
+
+
+def test_logout_revokes_refresh_token(client, student_user, test_password):
+    tokens = client.post(
+        "/auth/login",
+        data={"username": student_user.email, "password": test_password},
+    ).json()
+
+    assert client.post("/auth/logout", json={"refresh_token": tokens["refresh_token"]}).status_code == 204
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+
+def test_revocation_store_syncs_and_purges(db):
+    writer, reader = RevocationStore(), RevocationStore()
+    live, expired = uuid4(), uuid4()
+
+    writer.revoke(db, live, expires_at=datetime.utcnow() + timedelta(days=1))
+    reader.load(db)
+    writer.revoke(db, expired, expires_at=datetime.utcnow() - timedelta(seconds=1))
+    reader.sync(db)
+    assert reader.is_revoked(live) and reader.is_revoked(expired)
+
+    assert reader.purge_expired(db) == 1
+    assert reader.is_revoked(live) and not reader.is_revoked(expired)
+    assert db.get(RevokedToken, expired) is None
+
+
 def test_refresh_token_invalid(client):
     payload = {"refresh_token": "invalidtoken"}
     response = client.post("/auth/refresh", json=payload)
     
     assert response.status_code == 401
-    assert "Invalid refresh token" in response.json()["detail"]
\ No newline at end of file
+    assert "Invalid refresh token" in response.json()["detail"]
+
+def login(client, user, password):
+    response = client.post(
+        "/auth/login",
+        data={"username": user.email, "password": password},
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_role_gated_route_skips_user_load_with_claims(client, db, admin_user, test_password):
+    headers = login(client, admin_user, test_password)
+    client.get("/enrollments/", headers=headers)
+
+    with capture_statements(db) as statements:
+        response = client.get("/enrollments/", headers=headers)
+
+    assert response.status_code == 200
+    assert not [s for s, _ in statements if "FROM users" in s]
+
+
+def test_deactivation_revokes_outstanding_tokens(client, student_user, admin_user, test_password):
+    student_headers = login(client, student_user, test_password)
+    admin_headers = login(client, admin_user, test_password)
+    assert client.get("/enrollments/me", headers=student_headers).status_code == 200
+
+    client.patch(f"/users/{student_user.id}/status", json={"is_active": False}, headers=admin_headers)
+    client.patch(f"/users/{student_user.id}/status", json={"is_active": True}, headers=admin_headers)
+
+    assert client.get("/enrollments/me", headers=student_headers).status_code == 401
+    assert client.get("/users/me", headers=student_headers).status_code == 401
+    assert client.get("/enrollments/me", headers=login(client, student_user, test_password)).status_code == 200
+
+
+def test_role_change_revokes_outstanding_tokens(client, admin_user, other_student, test_password):
+    student_headers = login(client, other_student, test_password)
+    admin_headers = login(client, admin_user, test_password)
+
+    client.patch(f"/users/{other_student.id}", json={"role": "admin"}, headers=admin_headers)
+
+    assert client.get("/enrollments/me", headers=student_headers).status_code == 401
+    assert client.get("/enrollments/", headers=login(client, other_student, test_password)).status_code == 200
+
+
+def test_login_throttled_per_account_before_hashing(client, student_user, monkeypatch):
+    verified = []
+    monkeypatch.setattr(security, "verify_password", lambda *args: verified.append(args) or False)
+    attempts = [
+        client.post("/auth/login", data={"username": student_user.email, "password": "wrongpass"})
+        for _ in range(settings.LOGIN_ACCOUNT_BURST + 1)
+    ]
+
+    assert [r.status_code for r in attempts[:-1]] == [400] * settings.LOGIN_ACCOUNT_BURST
+    assert attempts[-1].status_code == 429
+    assert int(attempts[-1].headers["Retry-After"]) >= 1
+    assert len(verified) == settings.LOGIN_ACCOUNT_BURST
+
+
+def test_login_unknown_email_runs_dummy_verify(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(security, "dummy_verify", calls.append)
+
+    response = client.post("/auth/login", data={"username": "ghost@example.com", "password": "pass12345"})
+
+    assert response.status_code == 400
+    assert calls == ["pass12345"]
+
+
+def test_token_bucket_refills_and_evicts():
+    now = [0.0]
+    limiter = TokenBucketLimiter(rate=1.0, burst=2, max_entries=2, clock=lambda: now[0])
+
+    assert limiter.acquire("a") == 0 and limiter.acquire("a") == 0
+    assert limiter.acquire("a") == pytest.approx(1.0)
+    now[0] += 1.0
+    assert limiter.acquire("a") == 0
+
+    limiter.acquire("b")
+    limiter.acquire("c")
+    assert "a" not in limiter._buckets
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+import pytest
+
+from app.core.config import settings
+
+
+@pytest.fixture(autouse=True)
+def no_safety_lag(monkeypatch):
+    # Rows written inside the test transaction all carry its start time.
+    monkeypatch.setattr(settings, "CHANGE_FEED_SAFETY_SECONDS", 0.0)
+
+
+def test_changes_requires_admin(student_client):
+    assert student_client.get("/changes/").status_code == 403
+
+
+def test_changes_lists_courses_and_enrollments(admin_client, test_enrollment, test_course):
+    response = admin_client.get("/changes/")
+    assert response.status_code == 200
+    body = response.json()
+    seen = {(change["type"], change["data"]["id"]) for change in body["changes"]}
+    assert ("course", str(test_course.id)) in seen
+    assert ("enrollment", str(test_enrollment.id)) in seen
+    assert body["has_more"] is False
+
+    again = admin_client.get("/changes/", params={"since": body["next_cursor"]}).json()
+    assert again["changes"] == []
+    assert again["next_cursor"] == body["next_cursor"]
+
+
+def test_changes_pages_with_cursor(admin_client, test_enrollment, test_course):
+    first = admin_client.get("/changes/", params={"limit": 1}).json()
+    assert len(first["changes"]) == 1
+    assert first["has_more"] is True
+
+    second = admin_client.get("/changes/", params={"limit": 1, "since": first["next_cursor"]}).json()
+    assert len(second["changes"]) == 1
+    assert second["changes"][0]["data"]["id"] != first["changes"][0]["data"]["id"]
+
+
+def test_changes_picks_up_modified_rows(admin_client, db, test_enrollment, test_course):
+    for row in (test_enrollment, test_course):
+        row.updated_at = row.updated_at - timedelta(hours=1)
+    db.commit()
+    cursor = admin_client.get("/changes/").json()["next_cursor"]
+
+    response = admin_client.patch(f"/enrollments/{test_enrollment.id}")
+    assert response.status_code == 204
+
+    changes = admin_client.get("/changes/", params={"since": cursor}).json()["changes"]
+    assert [(change["type"], change["data"]["id"]) for change in changes] == [
+        ("enrollment", str(test_enrollment.id))
+    ]
+    assert changes[0]["data"]["is_active"] is False
+
+
+def test_changes_rejects_invalid_cursor(admin_client):
+    assert admin_client.get("/changes/", params={"since": "not-a-cursor"}).status_code == 400
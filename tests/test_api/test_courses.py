@@ -1,5 +1,19 @@
+import json
+import asyncio
+from datetime import datetime, timedelta
 from uuid import uuid4
 
+from app.core.availability import AvailabilityBroadcaster
+from app.core.config import settings
+from app.crud.availability import SeatCounters
+from app.crud.course import crud_course
+from app.crud.enrollment import enrollment_crud
+from app.crud.stats import COUNTS, course_statistics
+from app.db.partitions import archive_enrollments
+from app.models.course_stats import CourseStats
+from app.schemas.course import CourseCreate
+from tests.utils import capture_statements
+
 def test_list_public_courses(client, test_course):
     response = client.get("/courses/public")
     assert response.status_code == 200
@@ -32,6 +46,42 @@ def test_update_course_status_success(admin_client, test_course):
     assert response.json()["id"] == str(test_course.id)
 
 
+def test_update_course_status_cascades_to_enrollments(admin_client, db, student_user, other_student, test_course):
+    course_id = test_course.id
+    kept = enrollment_crud.enroll(db, user_id=student_user.id, course_id=course_id).id
+    left = enrollment_crud.enroll(db, user_id=other_student.id, course_id=course_id)
+    enrollment_crud.deregister(db, enrollment_id=left.id, user=other_student)
+    left = left.id
+    assert admin_client.get(f"/courses/{course_id}/availability").json()["enrolled"] == 1
+
+    response = admin_client.patch(f"/courses/{course_id}/status", json={"is_active": False, "cascade": True})
+    assert response.status_code == 200
+    assert response.json()["enrollments_changed"] == 1
+    assert enrollment_crud.get(db, kept).is_active is False
+
+    response = admin_client.patch(f"/courses/{course_id}/status", json={"is_active": True, "cascade": True})
+    assert response.json()["enrollments_changed"] == 1
+    assert enrollment_crud.get(db, kept).is_active is True
+    # Deregistered before the cascade, so not restored by it.
+    assert enrollment_crud.get(db, left).is_active is False
+    assert admin_client.get(f"/courses/{course_id}/availability").json()["enrolled"] == 1
+
+
+def test_course_reactivation_restores_only_as_many_as_fit(admin_client, db, student_user, other_student, test_course):
+    course_id = test_course.id
+    first = enrollment_crud.enroll(db, user_id=student_user.id, course_id=course_id).id
+    second = enrollment_crud.enroll(db, user_id=other_student.id, course_id=course_id).id
+    admin_client.patch(f"/courses/{course_id}/status", json={"is_active": False, "cascade": True})
+    test_course.capacity = 1
+    db.commit()
+
+    response = admin_client.patch(f"/courses/{course_id}/status", json={"is_active": True, "cascade": True})
+    assert response.json()["enrollments_changed"] == 1
+    assert enrollment_crud.get(db, first).is_active is True
+    released = enrollment_crud.get(db, second)
+    assert (released.is_active, released.course_suspended) == (False, False)
+
+
 def test_create_course_student_forbidden(student_client):
     data = {"title": "Steal Course", "description": "No", "code": "BAD", "capacity": 1}
     response = student_client.post("/courses/", json=data)
@@ -80,4 +130,259 @@ def test_get_course_inactive_returns_404(client, db, test_course):
     
     response = client.get(f"/courses/{test_course.id}")
     assert response.status_code == 404
-    assert response.json()["detail"] == "Course not found"
\ No newline at end of file
+    assert response.json()["detail"] == "Course not found"
+
+def test_get_courses_batch(client, db, test_course):
+    inactive = crud_course.create(db, obj_in=CourseCreate(title="Old", code="OLD1", capacity=5))
+    crud_course.update_status(db, course=inactive, is_active=False)
+    course_id, inactive_id, unknown = test_course.id, inactive.id, uuid4()
+
+    with capture_statements(db) as statements:
+        response = client.get(f"/courses/batch?ids={course_id},{inactive_id}&ids={unknown}")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert list(data["items"]) == [str(course_id)]
+    assert data["items"][str(course_id)]["code"] == "CS101"
+    assert data["missing"] == [str(inactive_id), str(unknown)]
+    assert len([s for s, _ in statements if "FROM courses" in s]) == 1
+
+    with capture_statements(db) as statements:
+        assert client.get(f"/courses/batch?ids={course_id}").json()["items"]
+    assert statements == []
+
+
+def test_get_courses_batch_sees_updates(admin_client, test_course):
+    admin_client.get(f"/courses/batch?ids={test_course.id}")
+    admin_client.put(f"/courses/{test_course.id}", json={"title": "Renamed"})
+
+    response = admin_client.get(f"/courses/batch?ids={test_course.id}")
+    assert response.json()["items"][str(test_course.id)]["title"] == "Renamed"
+
+
+def test_get_courses_batch_rejects_too_many_ids(client):
+    ids = ",".join(str(uuid4()) for _ in range(settings.BATCH_LOOKUP_MAX_IDS + 1))
+    assert client.get(f"/courses/batch?ids={ids}").status_code == 422
+    assert client.get("/courses/batch?ids=not-a-uuid").status_code == 422
+
+
+def test_availability_stream_unknown_course(client):
+    assert client.get(f"/courses/{uuid4()}/availability/stream").status_code == 404
+
+
+def test_availability_broadcaster_coalesces_and_fans_out():
+    course_id = uuid4()
+    loads = []
+    enrolled = 0
+
+    def load(course_ids):
+        loads.append(course_ids)
+        return {course_id: enrolled for course_id in course_ids}
+
+    async def scenario():
+        nonlocal enrolled
+        broadcaster = AvailabilityBroadcaster(load, max_rate=20, heartbeat=0.2, refresh_interval=60)
+        broadcaster.start()
+        streams = [broadcaster.subscribe(course_id) for _ in range(100)]
+        try:
+            initial = await asyncio.gather(*(anext(stream) for stream in streams))
+            assert initial == [0] * 100
+            assert len(loads) == 1
+
+            pending = [asyncio.ensure_future(anext(stream)) for stream in streams]
+            await asyncio.sleep(0.1)
+            enrolled = 5
+            for _ in range(5):
+                broadcaster.notify(course_id)
+            assert await asyncio.gather(*pending) == [5] * 100
+            assert len(loads) == 2
+
+            # Nothing changed within the heartbeat interval.
+            assert await anext(streams[0]) is None
+        finally:
+            for stream in streams:
+                await stream.aclose()
+            await broadcaster.stop()
+        assert broadcaster.subscriber_count == 0
+
+    asyncio.run(scenario())
+
+
+def test_course_availability_follows_enrollments(student_client, db, test_course):
+    course_id = test_course.id
+    response = student_client.get(f"/courses/{course_id}/availability")
+    assert response.status_code == 200
+    assert response.json()["available"] == 30
+
+    enrollment = student_client.post("/enrollments/", json={"course_id": str(course_id)}).json()
+    with capture_statements(db) as statements:
+        response = student_client.get(f"/courses/{course_id}/availability")
+    assert statements == []
+    assert response.json()["enrolled"] == 1
+    assert response.json()["available"] == 29
+
+    student_client.patch(f"/enrollments/{enrollment['id']}")
+    assert student_client.get(f"/courses/{course_id}/availability").json()["available"] == 30
+
+
+def test_courses_availability_batch(admin_client, db, test_course):
+    inactive = crud_course.create(db, obj_in=CourseCreate(title="Old", code="OLD1", capacity=5))
+    admin_client.patch(f"/courses/{inactive.id}/status", json={"is_active": False})
+    unknown = uuid4()
+
+    response = admin_client.get(f"/courses/availability?ids={test_course.id},{inactive.id},{unknown}")
+    assert response.status_code == 200
+    data = response.json()
+    assert list(data["items"]) == [str(test_course.id)]
+    assert data["missing"] == [str(inactive.id), str(unknown)]
+
+
+def test_seat_counters_reconcile_corrects_drift(db, test_course):
+    counters = SeatCounters()
+    counters.get_many(db, [test_course.id])
+    counters.apply(test_course.id, 3)
+    assert counters.get_many(db, [test_course.id])[test_course.id].enrolled == 3
+
+    assert test_course.id in counters.reconcile(db)
+    assert counters.get_many(db, [test_course.id])[test_course.id].enrolled == 0
+    assert counters.reconcile(db) == []
+
+
+def test_bulk_import_courses_json(admin_client, db, test_course):
+    rows = [
+        {"title": "Algebra", "code": "MATH101", "capacity": 40},
+        {"title": "Dup", "code": "MATH101", "capacity": 10},
+        {"title": "Taken", "code": test_course.code, "capacity": 10},
+        {"title": "No capacity", "code": "BAD1"},
+    ]
+    response = admin_client.post("/courses/bulk", json=rows)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = {r["row"]: r for r in map(json.loads, response.text.splitlines())}
+    assert [results[i]["status"] for i in range(4)] == ["created", "error", "error", "error"]
+    assert results[1]["detail"] == "Duplicate code in import"
+    assert results[2]["detail"] == "Code already exists"
+    created = crud_course.get_by_code(db, "MATH101")
+    assert str(created.id) == results[0]["id"]
+    assert created.capacity == 40
+    assert created.is_active is True
+
+
+def test_bulk_import_courses_csv(admin_client, db):
+    body = "title,code,capacity\nPhysics,PHY101,25\nChemistry,CHEM101,30\n"
+    response = admin_client.post("/courses/bulk", content=body, headers={"Content-Type": "text/csv"})
+
+    assert [json.loads(line)["status"] for line in response.text.splitlines()] == ["created", "created"]
+    assert crud_course.get_by_code(db, "CHEM101").capacity == 30
+
+
+def test_bulk_import_courses_requires_admin(student_client):
+    assert student_client.post("/courses/bulk", json=[]).status_code == 403
+
+
+def test_batch_course_status(admin_client, db, test_course):
+    other = crud_course.create(db, obj_in=CourseCreate(title="Other", code="OTH1", capacity=5))
+    inactive = crud_course.create(db, obj_in=CourseCreate(title="Old", code="OLD1", capacity=5))
+    crud_course.update_status(db, course=inactive, is_active=False)
+    course_id, other_id = test_course.id, other.id
+    unknown = uuid4()
+    assert admin_client.get(f"/courses/batch?ids={course_id}").json()["items"]
+
+    response = admin_client.patch(
+        "/courses/status",
+        json={"is_active": False, "ids": [str(course_id), str(unknown)], "codes": ["OTH1", "OLD1", "NOPE"]},
+    )
+    assert response.status_code == 200
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"id": str(course_id), "status": "updated"},
+        {"id": str(unknown), "status": "not_found"},
+        {"code": "OTH1", "status": "updated"},
+        {"code": "OLD1", "status": "unchanged"},
+        {"code": "NOPE", "status": "not_found"},
+    ]
+    db.expire_all()
+    assert crud_course.get(db, other_id).is_active is False
+    # The batch lookup cache was invalidated.
+    assert admin_client.get(f"/courses/batch?ids={course_id}").json()["items"] == {}
+
+
+def test_batch_course_status_cascades(admin_client, db, student_user, other_student, test_course):
+    other = crud_course.create(db, obj_in=CourseCreate(title="Other", code="OTH1", capacity=5))
+    course_id, other_id = test_course.id, other.id
+    kept = enrollment_crud.enroll(db, user_id=student_user.id, course_id=course_id).id
+    enrollment_crud.enroll(db, user_id=other_student.id, course_id=other_id)
+
+    response = admin_client.patch(
+        "/courses/status", json={"is_active": False, "cascade": True, "ids": [str(course_id), str(other_id)]}
+    )
+    assert [json.loads(line)["status"] for line in response.text.splitlines()] == ["updated", "updated"]
+    assert enrollment_crud.get(db, kept).is_active is False
+    assert enrollment_crud.active_counts(db, [course_id, other_id]) == {course_id: 0, other_id: 0}
+
+    admin_client.patch("/courses/status", json={"is_active": True, "cascade": True, "codes": ["CS101"]})
+    assert enrollment_crud.active_counts(db, [course_id, other_id]) == {course_id: 1, other_id: 0}
+
+    other.capacity = 0
+    db.commit()
+    admin_client.patch("/courses/status", json={"is_active": True, "cascade": True, "ids": [str(other_id)]})
+    assert enrollment_crud.active_counts(db, [course_id, other_id]) == {course_id: 1, other_id: 0}
+
+def test_batch_course_status_requires_targets(admin_client):
+    assert admin_client.patch("/courses/status", json={"is_active": True}).status_code == 422
+
+
+def test_course_stats(admin_client, db, student_user, other_student, test_course):
+    tiny = crud_course.create(db, obj_in=CourseCreate(title="Tiny", code="TINY1", capacity=2))
+    course_id, tiny_id = test_course.id, tiny.id
+    enrollment = enrollment_crud.enroll(db, user_id=student_user.id, course_id=course_id)
+    enrollment_crud.deregister(db, enrollment_id=enrollment.id, user=student_user)
+    enrollment_crud.enroll(db, user_id=student_user.id, course_id=course_id)
+    enrollment_crud.enroll(db, user_id=other_student.id, course_id=course_id)
+    enrollment_crud.enroll(db, user_id=student_user.id, course_id=tiny_id)
+    list(enrollment_crud.complete_many(db, course_id=course_id, user_ids=[other_student.id]))
+
+    assert course_statistics.refresh_dirty(db) == 2
+    assert course_statistics.refresh_dirty(db) == 0
+
+    with capture_statements(db) as statements:
+        response = admin_client.get("/courses/stats?sort=-fill_rate")
+    assert response.status_code == 200
+    # The other statement loads the admin for the role check.
+    assert len([sql for sql, _ in statements if "courses" in sql]) == 1
+    stats = {row["course_id"]: row for row in response.json()}
+    assert [row["course_id"] for row in response.json()][:2] == [str(tiny_id), str(course_id)]
+    assert stats[str(course_id)] | {"refreshed_at": None} == {
+        "course_id": str(course_id),
+        "code": "CS101",
+        "title": "Intro to CS",
+        "capacity": 30,
+        "is_active": True,
+        "enrollment_count": 2,
+        "active_count": 2,
+        "completed_count": 1,
+        "reactivation_count": 1,
+        "fill_rate": 2 / 30,
+        "completion_rate": 0.5,
+        "refreshed_at": None,
+    }
+    assert stats[str(tiny_id)]["fill_rate"] == 0.5
+
+
+def test_course_stats_count_archived_enrollments(db, student_user, other_student, test_course):
+    course_id = test_course.id
+    done = enrollment_crud.enroll(db, user_id=student_user.id, course_id=course_id)
+    enrollment_crud.enroll(db, user_id=other_student.id, course_id=course_id)
+    list(enrollment_crud.complete_many(db, enrollment_ids=[done.id]))
+    course_statistics.refresh(db, [course_id])
+    before = db.get(CourseStats, course_id)
+    counts = [getattr(before, name) for name in COUNTS]
+
+    assert archive_enrollments(db, before=datetime.utcnow() + timedelta(days=1)) == 1
+    course_statistics.refresh(db, [course_id])
+    db.expire_all()
+    assert [getattr(db.get(CourseStats, course_id), name) for name in COUNTS] == counts == [2, 2, 1, 0]
+
+
+def test_course_stats_student_forbidden(student_client):
+    assert student_client.get("/courses/stats").status_code == 403
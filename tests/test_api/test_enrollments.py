@@ -1,8 +1,22 @@
+import json
+import threading
+import time
+from datetime import datetime
 import pytest
 from uuid import uuid4
+from fastapi import HTTPException
+from app.core.admission import AdmissionQueue, KeyClosed, QueueFull
+from app.core.config import settings
+from app.core.group_commit import GroupCommitter
+from app.crud.course import crud_course
 from app.crud.enrollment import enrollment_crud
 from app.main import app
 from app.api.deps import get_current_user
+from app.models.course import Course
+from app.models.enrollment import Enrollment
+from app.models.user import User
+from app.schemas.course import CourseCreate
+from tests.utils import capture_statements
 
 
 def test_student_enroll_success(student_client, test_course):
@@ -119,4 +133,247 @@ def test_enrollment_fails_when_course_full(student_client, db, test_course, othe
     
 
     assert response.status_code == 400
-    assert "Course is full" in response.json()["detail"]
\ No newline at end of file
+    assert "Course is full" in response.json()["detail"]
+
+def enroll_many(db, count):
+    courses = [Course(title=f"Expand {n}", code=f"EXP{n}", capacity=100) for n in range(3)]
+    users = [
+        User(name=f"Expand {n}", email=f"expand{n}@example.com", hashed_password="x", role="student")
+        for n in range(count)
+    ]
+    db.add_all(courses + users)
+    db.flush()
+    db.add_all(
+        Enrollment(user_id=user.id, course_id=courses[n % len(courses)].id)
+        for n, user in enumerate(users)
+    )
+    db.commit()
+
+
+def count_page_statements(admin_client, db, limit):
+    db.expire_all()
+    with capture_statements(db) as statements:
+        response = admin_client.get(f"/enrollments/?limit={limit}&expand=course,user")
+    assert response.status_code == 200
+    assert len(response.json()) == limit
+    return response.json(), len(statements)
+
+
+def test_list_enrollments_expand_uses_fixed_query_count(admin_client, db):
+    enroll_many(db, 40)
+
+    small_page, small_count = count_page_statements(admin_client, db, 4)
+    large_page, large_count = count_page_statements(admin_client, db, 40)
+
+    # Token check, the enrollment page, then one selectin query per relation.
+    assert small_count == large_count == 4
+    assert all(e["course"]["code"].startswith("EXP") for e in large_page)
+    assert all(e["user"]["id"] == e["user_id"] for e in large_page)
+
+
+def test_list_enrollments_without_expand_omits_relations(admin_client, test_enrollment):
+    response = admin_client.get("/enrollments/")
+    assert response.status_code == 200
+    assert response.json()[0]["course"] is None
+
+    assert admin_client.get("/enrollments/?expand=grades").status_code == 422
+
+
+def test_my_enrollments_expand_course(student_client, test_enrollment, test_course):
+    response = student_client.get("/enrollments/me?expand=course")
+    assert response.json()[0]["course"]["code"] == test_course.code
+    assert response.json()[0]["user"] is None
+
+
+def test_list_enrollments_sparse_fields(admin_client, test_enrollment):
+    response = admin_client.get("/enrollments/?fields=id,is_active")
+
+    assert response.status_code == 200
+    assert response.json() == [{"id": str(test_enrollment.id), "is_active": True}]
+    assert admin_client.get("/enrollments/?fields=course").status_code == 422
+    assert admin_client.get("/enrollments/?fields=id&expand=course").status_code == 422
+
+
+def test_enroll_many_matches_sequential_enroll(db, student_user, other_student, admin_user):
+    small = crud_course.create(db, obj_in=CourseCreate(title="Small", code="SM1", capacity=2))
+    closed = crud_course.create(db, obj_in=CourseCreate(title="Closed", code="CL1", capacity=5))
+    closed.is_active = False
+    db.commit()
+    small_id, closed_id, unknown_id = small.id, closed.id, uuid4()
+
+    results = enrollment_crud.enroll_many(
+        db,
+        [
+            (student_user.id, small_id),
+            (student_user.id, small_id),
+            (other_student.id, small_id),
+            (admin_user.id, small_id),
+            (student_user.id, closed_id),
+            (student_user.id, unknown_id),
+        ],
+    )
+
+    assert results[0].user_id == student_user.id
+    assert results[2].user_id == other_student.id
+    errors = [(r.status_code, r.detail) for r in results if isinstance(r, HTTPException)]
+    assert errors == [
+        (400, "User already enrolled in this course"),
+        (400, "Course is full"),
+        (400, "Course is inactive"),
+        (404, "Course not found"),
+    ]
+    assert enrollment_crud.active_count(db, small_id) == 2
+
+
+def test_enroll_with_group_commit(student_client, db, test_course, monkeypatch):
+    monkeypatch.setattr(settings, "ENROLLMENT_GROUP_COMMIT", True)
+    payload = {"course_id": str(test_course.id)}
+    response = student_client.post("/enrollments/", json=payload)
+    assert response.status_code == 201
+    assert response.json()["course_id"] == str(test_course.id)
+    assert student_client.post("/enrollments/", json=payload).status_code == 400
+
+
+def test_group_committer_batches_concurrent_callers():
+    batches = []
+
+    def execute(db, items):
+        batches.append(items)
+        return [ValueError(item) if item < 0 else item * 2 for item in items]
+
+    committer = GroupCommitter(execute, window=0.2, max_batch=4)
+    results = {}
+
+    def submit(item):
+        try:
+            results[item] = committer.submit(None, item)
+        except ValueError as exc:
+            results[item] = exc
+
+    threads = [threading.Thread(target=submit, args=(item,)) for item in (1, 2, -3, 4, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(len(batch) for batch in batches) == [1, 4]
+    assert results[1] == 2 and results[5] == 10
+    assert isinstance(results[-3], ValueError)
+
+
+def test_enroll_through_admission_queue(student_client, db, test_course, other_student, monkeypatch):
+    monkeypatch.setattr(settings, "ENROLLMENT_ADMISSION_QUEUE", True)
+    test_course.capacity = 1
+    db.commit()
+    course_id = test_course.id
+    taken = enrollment_crud.enroll(db, user_id=other_student.id, course_id=course_id)
+
+    response = student_client.post("/enrollments/", json={"course_id": str(course_id)})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Course is full"
+    # The course is now known to be full: rejected without a query.
+    with capture_statements(db) as statements:
+        assert student_client.post("/enrollments/", json={"course_id": str(course_id)}).status_code == 400
+    assert not [s for s, _ in statements if "FROM enrollments" in s]
+
+    # A freed seat reopens the course.
+    enrollment_crud.deregister(db, enrollment_id=taken.id, user=other_student)
+    assert student_client.post("/enrollments/", json={"course_id": str(course_id)}).status_code == 201
+
+
+def test_admission_queue_serializes_per_key():
+    running = {}
+    overlaps = []
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def execute(items):
+        key = items[0][0]
+        with lock:
+            running[key] = running.get(key, 0) + 1
+            overlaps.append(dict(running))
+        release.wait(1)
+        with lock:
+            running[key] -= 1
+        return [value for _, value in items]
+
+    queue = AdmissionQueue(execute, depth=2, max_batch=2)
+    results = []
+    threads = [
+        threading.Thread(target=lambda key=key, value=value: results.append(queue.submit(key, (key, value))))
+        for key, value in [("a", 1), ("a", 2), ("a", 3), ("b", 4)]
+    ]
+    # "a" 1 leads and blocks in execute while 2 and 3 queue behind it.
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    with pytest.raises(QueueFull):
+        queue.submit("a", ("a", 0))
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == [1, 2, 3, 4]
+    assert all(count <= 1 for snapshot in overlaps for count in snapshot.values())
+    assert any(snapshot.get("a") and snapshot.get("b") for snapshot in overlaps)
+
+    queue.close("a", 60)
+    with pytest.raises(KeyClosed):
+        queue.submit("a", ("a", 5))
+    queue.reopen("a")
+    assert queue.submit("a", ("a", 6)) == 6
+
+
+def test_complete_enrollments_by_id(admin_client, db, student_user, other_student, test_course):
+    done = enrollment_crud.enroll(db, user_id=student_user.id, course_id=test_course.id)
+    left = enrollment_crud.enroll(db, user_id=other_student.id, course_id=test_course.id)
+    enrollment_crud.deregister(db, enrollment_id=left.id, user=other_student)
+    done_id, left_id, unknown = done.id, left.id, uuid4()
+    done.updated_at = before = datetime(2000, 1, 1)
+    db.commit()
+
+    response = admin_client.post(
+        "/enrollments/complete",
+        json={"enrollment_ids": [str(done_id), str(left_id), str(unknown)]},
+    )
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert results == [
+        {"id": str(done_id), "status": "completed"},
+        {"id": str(left_id), "status": "inactive"},
+        {"id": str(unknown), "status": "not_found"},
+    ]
+    db.expire_all()
+    enrollment = enrollment_crud.get(db, done_id)
+    assert enrollment.completed is True
+    assert enrollment.updated_at > before
+
+    response = admin_client.post("/enrollments/complete", json={"enrollment_ids": [str(done_id)]})
+    assert json.loads(response.text) == {"id": str(done_id), "status": "already_completed"}
+
+
+def test_complete_enrollments_by_course_and_user(admin_client, db, student_user, test_course):
+    enrollment_crud.enroll(db, user_id=student_user.id, course_id=test_course.id)
+
+    response = admin_client.post(
+        "/enrollments/complete",
+        json={"course_id": str(test_course.id), "user_ids": [str(student_user.id), str(student_user.id)]},
+    )
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"user_id": str(student_user.id), "status": "completed"},
+    ]
+
+
+def test_complete_enrollments_requires_one_target(admin_client, test_course):
+    response = admin_client.post("/enrollments/complete", json={"course_id": str(test_course.id)})
+    assert response.status_code == 422
+    response = admin_client.post(
+        "/enrollments/complete",
+        json={"enrollment_ids": [], "course_id": str(test_course.id), "user_ids": []},
+    )
+    assert response.status_code == 422
+
+
+def test_complete_enrollments_student_forbidden(student_client):
+    response = student_client.post("/enrollments/complete", json={"enrollment_ids": []})
+    assert response.status_code == 403
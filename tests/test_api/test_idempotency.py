@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.idempotency import IdempotencyStore, StoredResponse, idempotency_store
+from app.crud.enrollment import enrollment_admission
+from app.models.enrollment import Enrollment
+from tests.utils import capture_statements
+
+
+def _session_factory(db):
+    return lambda: Session(bind=db.connection(), join_transaction_mode="create_savepoint")
+
+
+@pytest.fixture(autouse=True)
+def store_in_test_transaction(db, monkeypatch):
+    monkeypatch.setattr(idempotency_store, "session_factory", _session_factory(db))
+    yield
+    idempotency_store.clear()
+
+
+def test_enrollment_retry_is_replayed(student_client, db, test_course):
+    course_id = test_course.id
+    headers = {"Idempotency-Key": "enroll-1"}
+    first = student_client.post("/enrollments/", json={"course_id": str(course_id)}, headers=headers)
+    assert first.status_code == 201
+
+    with capture_statements(db) as statements:
+        retry = student_client.post("/enrollments/", json={"course_id": str(course_id)}, headers=headers)
+    assert statements == []
+    assert retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert db.query(Enrollment).filter(Enrollment.course_id == course_id).count() == 1
+
+
+def test_retry_without_key_runs_again(student_client, test_course):
+    payload = {"course_id": str(test_course.id)}
+    assert student_client.post("/enrollments/", json=payload).status_code == 201
+    assert student_client.post("/enrollments/", json=payload).status_code == 400
+
+
+def test_key_reused_for_different_request(student_client, test_course, db):
+    other = student_client.post(
+        "/enrollments/", json={"course_id": str(test_course.id)}, headers={"Idempotency-Key": "k"}
+    )
+    assert other.status_code == 201
+    response = student_client.post("/enrollments/", json={"course_id": "x"}, headers={"Idempotency-Key": "k"})
+    assert response.status_code == 422
+
+
+def test_registration_retry_is_replayed_from_table(client):
+    payload = {"email": "retry@example.com", "password": "secret123", "name": "Retry"}
+    headers = {"Idempotency-Key": "register-1"}
+    first = client.post("/users/", json=payload, headers=headers)
+    assert first.status_code == 200
+
+    # A retry landing on another worker only finds the table row.
+    idempotency_store.clear()
+    retry = client.post("/users/", json=payload, headers=headers)
+    assert retry.status_code == 200
+    assert retry.json()["id"] == first.json()["id"]
+
+
+def test_concurrent_duplicate_waits_for_first_request(db):
+    store = IdempotencyStore(_session_factory(db), ttl=60, lock_timeout=60, wait_timeout=5, cache_size=10)
+    key, fingerprint = b"k" * 32, b"f" * 32
+    response = StoredResponse(fingerprint=fingerprint, status_code=201, content_type="application/json", body=b"{}")
+
+    async def scenario():
+        assert await store.begin(key, fingerprint) is None
+        duplicate = asyncio.ensure_future(store.begin(key, fingerprint))
+        await asyncio.sleep(0.05)
+        assert not duplicate.done()
+        await store.finish(key, response)
+        assert await duplicate == response
+
+    asyncio.run(scenario())
+
+
+def test_released_key_can_be_claimed_again(db):
+    store = IdempotencyStore(_session_factory(db), ttl=60, lock_timeout=60, wait_timeout=0.2, cache_size=10)
+    key, fingerprint = b"r" * 32, b"f" * 32
+
+    async def scenario():
+        assert await store.begin(key, fingerprint) is None
+        await store.release(key)
+        assert await store.begin(key, fingerprint) is None
+
+    asyncio.run(scenario())
+
+
+def test_retry_after_backpressure_reaches_route(student_client, db, test_course, monkeypatch):
+    monkeypatch.setattr(settings, "ENROLLMENT_ADMISSION_QUEUE", True)
+    payload, headers = {"course_id": str(test_course.id)}, {"Idempotency-Key": "busy-1"}
+    # A depth of zero turns every submission away as if the lane were full.
+    monkeypatch.setattr(enrollment_admission, "depth", 0)
+    busy = student_client.post("/enrollments/", json=payload, headers=headers)
+    assert busy.status_code == 429
+
+    monkeypatch.setattr(enrollment_admission, "depth", settings.ADMISSION_QUEUE_DEPTH)
+    retry = student_client.post("/enrollments/", json=payload, headers=headers)
+    assert retry.status_code == 201
+    assert "Idempotent-Replayed" not in retry.headers
+    assert db.query(Enrollment).filter(Enrollment.course_id == test_course.id).count() == 1
@@ -1,6 +1,16 @@
+import json
 import pytest
 from uuid import uuid4
 
+from app.core.security import verify_password
+from app.crud.enrollment import enrollment_crud
+from app.crud.course import crud_course
+from app.crud.user import crud_user
+from app.crud.waitlist import waitlist_crud
+from app.schemas.course import CourseCreate
+from app.schemas.user import UserCreate
+from tests.utils import capture_statements
+
 # --------------------------
 # Registration
 # --------------------------
@@ -63,6 +73,47 @@ def test_update_user_status_admin(admin_client, student_user):
     assert response.json()["is_active"] is False
 
 
+def test_update_user_status_cascades_to_enrollments(admin_client, db, student_user, other_student, test_course):
+    tiny = crud_course.create(db, obj_in=CourseCreate(title="Tiny", code="TINY1", capacity=1))
+    tiny_id, course_id = tiny.id, test_course.id
+    in_tiny = enrollment_crud.enroll(db, user_id=student_user.id, course_id=tiny_id).id
+    in_course = enrollment_crud.enroll(db, user_id=student_user.id, course_id=course_id).id
+    waitlist_crud.join(db, user_id=other_student.id, course_id=tiny_id)
+    assert admin_client.get(f"/courses/{course_id}/availability").json()["enrolled"] == 1
+
+    response = admin_client.patch(f"/users/{student_user.id}/status", json={"is_active": False, "cascade": True})
+    assert response.status_code == 200
+    assert response.json()["enrollments_changed"] == 2
+    assert enrollment_crud.get(db, in_course).is_active is False
+    with capture_statements(db) as statements:
+        assert admin_client.get(f"/courses/{course_id}/availability").json()["enrolled"] == 0
+    assert statements == []
+    # The freed seat went to the waitlist.
+    assert [e.course_id for e in enrollment_crud.get_by_user(db, user_id=other_student.id)] == [tiny_id]
+
+    response = admin_client.patch(f"/users/{student_user.id}/status", json={"is_active": True, "cascade": True})
+    assert response.json()["enrollments_changed"] == 1
+    assert enrollment_crud.get(db, in_course).is_active is True
+    assert enrollment_crud.get(db, in_tiny).is_active is False
+
+
+
+def test_deactivating_user_leaves_waitlists(admin_client, db, student_user, other_student):
+    tiny = crud_course.create(db, obj_in=CourseCreate(title="Tiny", code="TINY1", capacity=1))
+    enrollment_crud.enroll(db, user_id=student_user.id, course_id=tiny.id)
+    behind = crud_user.create(
+        db=db,
+        obj_in=UserCreate(email="behind@example.com", password="testpass123", name="Behind", role="student"),
+    )
+    waitlist_crud.join(db, user_id=other_student.id, course_id=tiny.id)
+    waitlist_crud.join(db, user_id=behind.id, course_id=tiny.id)
+
+    response = admin_client.patch(f"/users/{other_student.id}/status", json={"is_active": False, "cascade": True})
+    assert response.status_code == 200
+    assert waitlist_crud.get_by_user(db, user_id=other_student.id) == []
+    assert waitlist_crud.get_by_user(db, user_id=behind.id)[0].position == 1
+
+
 def test_get_user_by_id_success(admin_client, student_user):
     response = admin_client.get(f"/users/{student_user.id}")
     assert response.status_code == 200
@@ -107,3 +158,105 @@ def test_update_me_role_escalation_attempt(student_client):
     assert response.json()["role"] == "student"
 
 
+
+
+def test_bulk_import_users_json(admin_client, db, student_user):
+    rows = [
+        {"name": "A", "email": "bulk_a@example.com", "password": "password1"},
+        {"name": "B", "email": "bulk_b@example.com", "password": "password2", "role": "admin"},
+        {"name": "Dup", "email": "bulk_a@example.com", "password": "password3"},
+        {"name": "Taken", "email": student_user.email, "password": "password4"},
+        {"name": "Short", "email": "bulk_c@example.com", "password": "short"},
+    ]
+    response = admin_client.post("/users/bulk", json=rows)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = {r["row"]: r for r in map(json.loads, response.text.splitlines())}
+    assert [results[i]["status"] for i in range(5)] == ["created", "created", "error", "error", "error"]
+    assert results[2]["detail"] == "Duplicate email in import"
+    assert results[3]["detail"] == "Email already registered"
+    created = crud_user.get_by_email(db, email="bulk_b@example.com")
+    assert str(created.id) == results[1]["id"]
+    assert created.role == "admin"
+    assert verify_password("password2", created.hashed_password)
+
+
+def test_bulk_import_users_csv(admin_client, db):
+    body = "name,email,password,role\nC,bulk_csv@example.com,password1,\n"
+    response = admin_client.post("/users/bulk", content=body, headers={"Content-Type": "text/csv"})
+
+    assert response.status_code == 200
+    assert json.loads(response.text)["status"] == "created"
+    assert crud_user.get_by_email(db, email="bulk_csv@example.com").role == "student"
+
+
+def test_bulk_import_users_requires_admin(student_client):
+    response = student_client.post("/users/bulk", json=[])
+    assert response.status_code == 403
+
+
+def test_get_users_batch_admin(admin_client, student_user, other_student):
+    unknown = uuid4()
+    response = admin_client.get(f"/users/batch?ids={student_user.id},{other_student.id},{unknown}")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data["items"]) == {str(student_user.id), str(other_student.id)}
+    assert data["items"][str(student_user.id)]["email"] == student_user.email
+    assert data["missing"] == [str(unknown)]
+
+
+def test_get_users_batch_student_forbidden(student_client, student_user):
+    assert student_client.get(f"/users/batch?ids={student_user.id}").status_code == 403
+
+
+def test_dashboard_in_fixed_queries_and_cached(client, db, student_user, test_password, test_course, other_student):
+    enrollment_crud.enroll(db, user_id=other_student.id, course_id=test_course.id)
+    enrollment_crud.enroll(db, user_id=student_user.id, course_id=test_course.id)
+    token = client.post(
+        "/auth/login",
+        data={"username": student_user.email, "password": test_password},
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    db.expire_all()
+
+    with capture_statements(db) as cold:
+        response = client.get("/users/me/dashboard", headers=headers)
+    with capture_statements(db) as warm:
+        assert client.get("/users/me/dashboard", headers=headers).json() == response.json()
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["profile"]["email"] == student_user.email
+    [enrollment] = data["enrollments"]
+    assert enrollment["course"]["code"] == test_course.code
+    assert enrollment["seats_taken"] == 2
+    assert enrollment["seats_available"] == test_course.capacity - 2
+    # Token version, user, enrollments, courses, seat counts.
+    assert len(cold) == 5
+    assert warm == []
+
+
+def test_dashboard_invalidated_by_own_enrollment_change(student_client, db, test_course, test_enrollment):
+    assert len(student_client.get("/users/me/dashboard").json()["enrollments"]) == 1
+
+    student_client.patch(f"/enrollments/{test_enrollment.id}")
+
+    assert student_client.get("/users/me/dashboard").json()["enrollments"] == []
+
+
+def test_list_users_sparse_fields(admin_client, db, student_user):
+    with capture_statements(db) as statements:
+        response = admin_client.get("/users/?fields=id,is_active&limit=100")
+
+    assert response.status_code == 200
+    assert all(set(user) == {"id", "is_active"} for user in response.json())
+    [select] = [s for s, _ in statements if "FROM users" in s and "OFFSET" in s]
+    assert "hashed_password" not in select and "users.email" not in select
+
+
+def test_list_users_rejects_unknown_fields(admin_client):
+    response = admin_client.get("/users/?fields=id,hashed_password")
+    assert response.status_code == 422
+    assert "hashed_password" in response.json()["detail"]
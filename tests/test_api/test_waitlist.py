@@ -0,0 +1,138 @@
+import pytest
+from app.core.security import create_access_token
+from app.crud.course import crud_course
+from app.crud.enrollment import enrollment_crud
+from app.crud.user import crud_user
+from app.crud.waitlist import waitlist_crud
+from app.schemas.course import CourseCreate
+from app.schemas.user import UserCreate
+
+
+def _students(db, count):
+    return [
+        crud_user.create(
+            db=db,
+            obj_in=UserCreate(
+                email=f"waiting{n}@example.com",
+                password="testpass123",
+                name=f"Waiting {n}",
+                role="student",
+            ),
+        )
+        for n in range(count)
+    ]
+
+
+def _auth(user):
+    return {"Authorization": f"Bearer {create_access_token(subject=str(user.id))}"}
+
+
+@pytest.fixture
+def full_course(db, student_user):
+    """A one-seat course taken by ``student_user``."""
+    course = crud_course.create(db, obj_in=CourseCreate(title="Tiny", code="TINY1", capacity=1))
+    enrollment_crud.enroll(db, user_id=student_user.id, course_id=course.id)
+    return course
+
+
+def test_join_waitlist_when_full(client, db, full_course):
+    course_id = str(full_course.id)
+    first, second = _students(db, 2)
+
+    response = client.post("/waitlist/", json={"course_id": course_id}, headers=_auth(first))
+    assert response.status_code == 201
+    assert response.json()["position"] == 1
+
+    response = client.post("/waitlist/", json={"course_id": course_id}, headers=_auth(second))
+    assert response.json()["position"] == 2
+
+    response = client.post("/waitlist/", json={"course_id": course_id}, headers=_auth(second))
+    assert response.status_code == 400
+    assert "Already on the waitlist" in response.json()["detail"]
+
+
+def test_join_waitlist_with_free_seats(student_client, test_course):
+    response = student_client.post("/waitlist/", json={"course_id": str(test_course.id)})
+    assert response.status_code == 400
+    assert "free seats" in response.json()["detail"]
+
+
+def test_join_waitlist_when_enrolled(client, student_user, full_course):
+    response = client.post(
+        "/waitlist/", json={"course_id": str(full_course.id)}, headers=_auth(student_user)
+    )
+    assert response.status_code == 400
+    assert "already enrolled" in response.json()["detail"]
+
+
+def test_deregister_promotes_head_of_waitlist(client, db, student_user, full_course):
+    course_id = str(full_course.id)
+    first, second = _students(db, 2)
+    for user in (first, second):
+        client.post("/waitlist/", json={"course_id": course_id}, headers=_auth(user))
+
+    enrollment = client.get("/enrollments/me", headers=_auth(student_user)).json()[0]
+    response = client.patch(f"/enrollments/{enrollment['id']}", headers=_auth(student_user))
+    assert response.status_code == 204
+
+    enrolled = client.get("/enrollments/me", headers=_auth(first)).json()
+    assert [item["course_id"] for item in enrolled] == [course_id]
+    assert client.get("/waitlist/me", headers=_auth(first)).json() == []
+    assert client.get("/waitlist/me", headers=_auth(second)).json()[0]["position"] == 1
+
+
+def test_capacity_increase_promotes_in_bulk(admin_client, db, full_course):
+    course_id = full_course.id
+    students = _students(db, 3)
+    for user in students:
+        admin_client.post("/waitlist/", json={"course_id": str(course_id)}, headers=_auth(user))
+
+    response = admin_client.put(f"/courses/{course_id}", json={"capacity": 3})
+    assert response.status_code == 200
+
+    assert enrollment_crud.active_count(db, course_id) == 3
+    assert admin_client.get("/waitlist/me", headers=_auth(students[0])).json() == []
+    assert admin_client.get("/waitlist/me", headers=_auth(students[1])).json() == []
+    assert admin_client.get("/waitlist/me", headers=_auth(students[2])).json()[0]["position"] == 1
+
+
+def test_leave_waitlist_closes_gap(client, db, full_course):
+    course_id = str(full_course.id)
+    first, second, third = _students(db, 3)
+    for user in (first, second, third):
+        client.post("/waitlist/", json={"course_id": course_id}, headers=_auth(user))
+
+    response = client.delete(f"/waitlist/{course_id}", headers=_auth(second))
+    assert response.status_code == 204
+    assert client.get("/waitlist/me", headers=_auth(third)).json()[0]["position"] == 2
+
+    response = client.delete(f"/waitlist/{course_id}", headers=_auth(second))
+    assert response.status_code == 404
+
+
+def test_promotion_skips_deactivated_students(client, db, student_user, full_course):
+    course_id = str(full_course.id)
+    first, second = _students(db, 2)
+    for user in (first, second):
+        client.post("/waitlist/", json={"course_id": course_id}, headers=_auth(user))
+    crud_user.update_status(db, user=first, is_active=False)
+
+    enrollment = client.get("/enrollments/me", headers=_auth(student_user)).json()[0]
+    client.patch(f"/enrollments/{enrollment['id']}", headers=_auth(student_user))
+
+    assert enrollment_crud.get_by_user(db, user_id=first.id) == []
+    enrolled = client.get("/enrollments/me", headers=_auth(second)).json()
+    assert [item["course_id"] for item in enrolled] == [course_id]
+    assert waitlist_crud.get_by_user(db, user_id=first.id) == []
+
+
+def test_enroll_with_waitlist_queues_when_full(client, db, full_course):
+    (student,) = _students(db, 1)
+    payload = {"course_id": str(full_course.id)}
+
+    response = client.post("/enrollments/", json=payload, headers=_auth(student))
+    assert response.status_code == 400
+
+    response = client.post("/enrollments/", json={**payload, "waitlist": True}, headers=_auth(student))
+    assert response.status_code == 202
+    assert response.json()["position"] == 1
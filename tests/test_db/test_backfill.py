@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy import text
+
+from app.db.backfill import PROGRESS_TABLE, create_index_online, run_backfill, run_move
+from tests.conftest import engine
+
+
+@pytest.fixture
+def autocommit():
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("CREATE TABLE backfill_scratch (id INTEGER PRIMARY KEY, touched INTEGER)"))
+        conn.execute(text("INSERT INTO backfill_scratch (id) SELECT generate_series(1, 25)"))
+        yield conn
+        conn.execute(text("DROP TABLE IF EXISTS backfill_scratch"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {PROGRESS_TABLE}"))
+
+
+def test_backfill_updates_all_rows_in_batches(autocommit):
+    batches = []
+
+    updated = run_backfill(
+        autocommit,
+        "backfill_scratch",
+        "touched = coalesce(touched, 0) + 1",
+        name="scratch",
+        batch_size=10,
+        pause=0,
+        progress=lambda batch, total: batches.append((batch, total)),
+    )
+
+    assert updated == 25
+    assert batches == [(10, 10), (10, 20), (5, 25)]
+    assert autocommit.execute(text("SELECT count(*) FROM backfill_scratch WHERE touched = 1")).scalar() == 25
+    assert run_backfill(autocommit, "backfill_scratch", "touched = touched + 1", name="scratch") == 0
+
+
+def test_backfill_resumes_after_interruption(autocommit):
+    def interrupt(batch, total):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        run_backfill(
+            autocommit,
+            "backfill_scratch",
+            "touched = coalesce(touched, 0) + 1",
+            name="scratch",
+            batch_size=10,
+            pause=0,
+            progress=interrupt,
+        )
+
+    updated = run_backfill(
+        autocommit,
+        "backfill_scratch",
+        "touched = coalesce(touched, 0) + 1",
+        name="scratch",
+        batch_size=10,
+        pause=0,
+    )
+
+    assert updated == 15
+    assert autocommit.execute(text("SELECT count(*) FROM backfill_scratch WHERE touched = 1")).scalar() == 25
+    assert autocommit.execute(
+        text(f"SELECT rows_done FROM {PROGRESS_TABLE} WHERE name = 'scratch'")
+    ).scalar() == 25
+
+
+def test_move_sets_rows_aside_in_batches(autocommit):
+    autocommit.execute(text("CREATE TABLE backfill_aside (id INTEGER PRIMARY KEY, touched INTEGER, moved BOOLEAN)"))
+    try:
+        def interrupt(batch, total):
+            raise KeyboardInterrupt
+
+        arguments = ("backfill_scratch", "backfill_aside", {"id": "id", "touched": "touched", "moved": "true"})
+        with pytest.raises(KeyboardInterrupt):
+            run_move(autocommit, *arguments, name="aside", where="id % 2 = 0", batch_size=5, pause=0, progress=interrupt)
+        moved = run_move(autocommit, *arguments, name="aside", where="id % 2 = 0", batch_size=5, pause=0)
+
+        assert moved == 7
+        assert autocommit.execute(text("SELECT count(*) FROM backfill_scratch")).scalar() == 13
+        assert autocommit.execute(text("SELECT count(*) FROM backfill_aside WHERE moved")).scalar() == 12
+    finally:
+        autocommit.execute(text("DROP TABLE backfill_aside"))
+
+
+def test_create_index_online_on_partitioned_table(autocommit):
+    autocommit.execute(text("CREATE TABLE backfill_parts (id INTEGER, part INTEGER) PARTITION BY LIST (part)"))
+    try:
+        autocommit.execute(text("CREATE TABLE backfill_parts_1 PARTITION OF backfill_parts FOR VALUES IN (1)"))
+        autocommit.execute(text("CREATE TABLE backfill_parts_2 PARTITION OF backfill_parts FOR VALUES IN (2)"))
+
+        create_index_online(autocommit, "ix_backfill_parts_id", "backfill_parts", ["id"])
+        create_index_online(autocommit, "ix_backfill_parts_id", "backfill_parts", ["id"])
+
+        valid = autocommit.execute(
+            text("SELECT indisvalid FROM pg_index WHERE indexrelid = 'ix_backfill_parts_id'::regclass")
+        ).scalar()
+        assert valid is True
+    finally:
+        autocommit.execute(text("DROP TABLE backfill_parts"))
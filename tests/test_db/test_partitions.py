@@ -0,0 +1,73 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+
+from app.crud.enrollment import enrollment_crud, pair_lock_key
+from app.db.partitions import archive_enrollments, ensure_partitions
+from app.models.enrollment import Enrollment, EnrollmentArchive
+from tests.conftest import engine
+
+
+def test_archive_moves_cold_enrollments_and_reads_still_find_them(db, student_user, test_course, other_student):
+    cold = enrollment_crud.enroll(db, user_id=student_user.id, course_id=test_course.id)
+    hot = enrollment_crud.enroll(db, user_id=other_student.id, course_id=test_course.id)
+    cold.created_at = datetime.utcnow() - timedelta(days=400)
+    cold.is_active = False
+    hot.created_at = datetime.utcnow() - timedelta(days=400)
+    db.commit()
+    cold_id, hot_id = cold.id, hot.id
+
+    moved = archive_enrollments(db, before=datetime.utcnow() - timedelta(days=365), batch_size=1)
+
+    assert moved == 1
+    assert db.query(Enrollment).filter(Enrollment.id == cold_id).count() == 0
+    assert db.query(Enrollment).filter(Enrollment.id == hot_id).count() == 1
+    assert isinstance(enrollment_crud.get(db, cold_id), EnrollmentArchive)
+    assert enrollment_crud.get_by_user(db, user_id=student_user.id) == []
+    assert [e.id for e in enrollment_crud.get_by_user(db, user_id=student_user.id, include_archived=True)] == [cold_id]
+
+
+def test_enroll_restores_archived_enrollment(db, student_user, test_course):
+    enrollment = enrollment_crud.enroll(db, user_id=student_user.id, course_id=test_course.id)
+    enrollment.is_active = False
+    db.commit()
+    enrollment_id = enrollment.id
+    archive_enrollments(db, before=datetime.utcnow() + timedelta(days=1))
+    db.expunge(enrollment)
+
+    restored = enrollment_crud.enroll(db, user_id=student_user.id, course_id=test_course.id)
+
+    assert restored.id == enrollment_id
+    assert restored.is_active is True
+    assert db.query(EnrollmentArchive).filter(EnrollmentArchive.id == enrollment_id).count() == 0
+
+
+def test_enroll_locks_pair_until_commit(db, student_user, test_course):
+    # The unique index cannot see a restored row in an old partition, so a
+    # concurrent enroll of the same pair must wait for this transaction.
+    enrollment_crud.enroll(db, user_id=student_user.id, course_id=test_course.id)
+    key = pair_lock_key(student_user.id, test_course.id)
+    with engine.connect() as other:
+        assert other.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": key}).scalar() is False
+
+def test_ensure_partitions_is_a_noop_on_plain_table(db):
+    assert ensure_partitions(db) == []
+
+
+def test_ensure_partitions_moves_rows_out_of_default_partition(db, student_user, test_course):
+    db.execute(text("CREATE TABLE scratch (LIKE enrollments) PARTITION BY RANGE (created_at)"))
+    db.execute(text("CREATE TABLE scratch_default PARTITION OF scratch DEFAULT"))
+    db.execute(
+        text(
+            "INSERT INTO scratch (id, user_id, course_id, created_at, updated_at, completed, is_active, "
+            "course_suspended, user_suspended, reactivation_count) "
+            "VALUES (gen_random_uuid(), :user_id, :course_id, '2030-02-10', '2030-02-10', false, true, false, false, 0)"
+        ),
+        {"user_id": student_user.id, "course_id": test_course.id},
+    )
+
+    created = ensure_partitions(db, months_ahead=1, today=date(2030, 1, 15), table="scratch")
+
+    assert created == ["scratch_p203001", "scratch_p203002"]
+    assert db.execute(text("SELECT count(*) FROM scratch_default")).scalar() == 0
+    assert db.execute(text("SELECT count(*) FROM scratch_p203002")).scalar() == 1
@@ -0,0 +1,80 @@
+from sqlalchemy import text
+
+from app.crud.course import crud_course
+from app.crud.enrollment import enrollment_crud
+from app.crud.user import crud_user
+from app.models.course import Course
+from app.models.user import User
+from tests.utils import assert_no_seq_scans, capture_statements
+
+USERS = 5000
+COURSES = 2000
+ENROLLMENTS_PER_USER = 10
+
+
+def seed(db):
+    # Big enough that the planner prefers an index whenever one fits; every
+    # 20th course is active and each user holds ENROLLMENTS_PER_USER courses.
+    db.execute(
+        text(
+            "INSERT INTO users (id, name, email, hashed_password, role, is_active) "
+            "SELECT gen_random_uuid(), 'User ' || n, 'plan' || n || '@example.com', 'x', 'student', true "
+            "FROM generate_series(0, :users - 1) AS n"
+        ),
+        {"users": USERS},
+    )
+    db.execute(
+        text(
+            "INSERT INTO courses (id, title, code, capacity, is_active) "
+            "SELECT gen_random_uuid(), 'Course ' || n, 'PLAN' || lpad(n::text, 4, '0'), 1000, n % 20 = 0 "
+            "FROM generate_series(0, :courses - 1) AS n"
+        ),
+        {"courses": COURSES},
+    )
+    db.execute(
+        text(
+            "WITH u AS (SELECT id, row_number() OVER (ORDER BY email) AS n FROM users WHERE email LIKE 'plan%'), "
+            "c AS (SELECT id, row_number() OVER (ORDER BY code) - 1 AS n FROM courses WHERE code LIKE 'PLAN%') "
+            "INSERT INTO enrollments (id, user_id, course_id, created_at, completed, is_active) "
+            "SELECT gen_random_uuid(), u.id, c.id, now() - (k || ' days')::interval, k % 4 = 0, k % 5 <> 0 "
+            "FROM u CROSS JOIN generate_series(0, :per_user - 1) AS k "
+            "JOIN c ON c.n = (u.n * 13 + k * 197) % :courses"
+        ),
+        {"per_user": ENROLLMENTS_PER_USER, "courses": COURSES},
+    )
+    db.execute(
+        text(
+            "INSERT INTO enrollments_archive (id, user_id, course_id, created_at, completed, is_active, archived_at) "
+            "SELECT gen_random_uuid(), user_id, course_id, created_at, true, false, now() "
+            "FROM enrollments WHERE completed LIMIT 5000"
+        )
+    )
+    db.execute(text("ANALYZE users, courses, enrollments, enrollments_archive"))
+
+
+def test_crud_hot_paths_do_not_seq_scan(db):
+    seed(db)
+    user = db.query(User).filter(User.email == "plan42@example.com").one()
+    course = db.query(Course).filter(Course.code == "PLAN0040").one()
+    enrolled = enrollment_crud.get_by_user(db, user_id=user.id)[0]
+
+    calls = {
+        "enroll": lambda: enrollment_crud.enroll(db, user_id=user.id, course_id=course.id),
+        "course_is_full": lambda: enrollment_crud.course_is_full(db, course.id),
+        "get_by_user": lambda: enrollment_crud.get_by_user(db, user_id=user.id, include_archived=True),
+        "get_by_course_id": lambda: enrollment_crud.get_by_course_id(db, course_id=course.id),
+        "enrollment get": lambda: enrollment_crud.get(db, enrolled.id),
+        "course get": lambda: crud_course.get(db, course.id),
+        "get_active_paginated": lambda: crud_course.get_active_paginated(db, skip=20, limit=10),
+        "get_by_code": lambda: crud_course.get_by_code(db, "PLAN1234"),
+        "user get": lambda: crud_user.get(db, user.id),
+        "get_by_email": lambda: crud_user.get_by_email(db, email="plan4242@example.com"),
+    }
+    for name, call in calls.items():
+        db.expire_all()
+        with capture_statements(db) as statements:
+            call()
+        try:
+            assert_no_seq_scans(db, statements)
+        except AssertionError as exc:
+            raise AssertionError(f"{name}: {exc}") from None
@@ -0,0 +1,112 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+from app.crud.enrollment import enrollment_crud
+from app.crud.user import crud_user
+from app.db import shards
+from app.db.shards import ShardMap, close_shard_sessions
+from app.models.enrollment import Enrollment
+from app.schemas.user import UserCreate
+from tests.conftest import SQLALCHEMY_DATABASE_URL
+
+SHARD_COUNT = 2
+
+
+@pytest.fixture(scope="module")
+def shard_urls():
+    # Every shard is a separate database on the test Postgres instance.
+    base_url = make_url(SQLALCHEMY_DATABASE_URL)
+    names = [f"{base_url.database}_shard_{index}" for index in range(SHARD_COUNT)]
+    admin = create_engine(base_url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        for name in names:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+            conn.execute(text(f'CREATE DATABASE "{name}"'))
+
+    yield [base_url.set(database=name).render_as_string(hide_password=False) for name in names]
+
+    with admin.connect() as conn:
+        for name in names:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+    admin.dispose()
+
+
+@pytest.fixture
+def sharded(shard_urls, db, monkeypatch):
+    shard_map = ShardMap(shard_urls)
+    shard_map.create_schema()
+    monkeypatch.setattr(shards, "shard_map", shard_map)
+    monkeypatch.setattr("app.crud.enrollment.shard_map", shard_map)
+
+    yield shard_map
+
+    close_shard_sessions(db)
+    for engine in shard_map.engines:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM enrollments"))
+        engine.dispose()
+
+
+@pytest.fixture
+def students(db, test_password):
+    return [
+        crud_user.create(
+            db=db,
+            obj_in=UserCreate(
+                email=f"sharded{index}@example.com",
+                password=test_password,
+                name=f"Sharded {index}",
+            ),
+        )
+        for index in range(6)
+    ]
+
+
+def test_enrollments_are_routed_by_user_id(sharded, db, students, test_course):
+    for student in students:
+        enrollment_crud.enroll(db, user_id=student.id, course_id=test_course.id)
+
+    for student in students:
+        home = sharded.engines[sharded.index_for(student.id)]
+        with home.connect() as conn:
+            count = conn.execute(
+                text("SELECT count(*) FROM enrollments WHERE user_id = :user_id"),
+                {"user_id": student.id},
+            ).scalar()
+        assert count == 1
+
+    assert db.query(Enrollment).count() == 0
+    assert len(enrollment_crud.get_by_user(db, user_id=students[0].id)) == 1
+
+
+def test_per_course_queries_scatter_and_gather(sharded, db, students, test_course):
+    test_course.capacity = len(students)
+    db.commit()
+
+    for student in students:
+        enrollment_crud.enroll(db, user_id=student.id, course_id=test_course.id)
+
+    roster = enrollment_crud.get_by_course_id(db, course_id=test_course.id)
+    assert {enrollment.user_id for enrollment in roster} == {student.id for student in students}
+    assert enrollment_crud.course_is_full(db, test_course.id)
+
+    page = enrollment_crud.get_multi(db, skip=2, limit=3)
+    assert [enrollment.id for enrollment in page] == [
+        enrollment.id
+        for enrollment in sorted(roster, key=lambda e: (e.created_at, e.id))[2:5]
+    ]
+    assert [e.id for e in enrollment_crud.get_multi(db, skip=2, limit=3, fields=("id",))] == [e.id for e in page]
+
+    # Expansions come from the primary since shards hold no courses/users.
+    expanded = enrollment_crud.get_by_course_id(db, course_id=test_course.id, expand=frozenset({"course", "user"}))
+    assert {enrollment.expanded_course.id for enrollment in expanded} == {test_course.id}
+    assert {enrollment.expanded_user.id for enrollment in expanded} == {student.id for student in students}
+
+
+def test_admin_deregister_finds_enrollment_on_any_shard(sharded, db, students, admin_user, test_course):
+    enrollment = enrollment_crud.enroll(db, user_id=students[1].id, course_id=test_course.id)
+
+    enrollment_crud.deregister(db, enrollment_id=enrollment.id, user=admin_user)
+
+    assert enrollment_crud.get(db, enrollment.id).is_active is False
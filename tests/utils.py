@@ -0,0 +1,48 @@
+import json
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+@contextmanager
+def capture_statements(db: Session):
+    """Record every (statement, parameters) pair ``db`` sends to the database."""
+    statements = []
+    connection = db.connection()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+
+
+def _plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def seq_scans(db: Session, statement: str, parameters) -> list[str]:
+    """Relations ``statement`` would read with a sequential scan."""
+    plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return [
+        node.get("Relation Name", "?")
+        for node in _plan_nodes(plan[0]["Plan"])
+        if node["Node Type"] == "Seq Scan"
+    ]
+
+
+def assert_no_seq_scans(db: Session, statements) -> None:
+    """EXPLAIN each captured SELECT and fail if any plan contains a Seq Scan."""
+    selects = [(s, p) for s, p in statements if s.lstrip().upper().startswith("SELECT")]
+    assert selects, "no SELECT statements were captured"
+    for statement, parameters in selects:
+        scanned = seq_scans(db, statement, parameters)
+        assert not scanned, f"Seq Scan on {', '.join(scanned)} for:\n{statement}"